@@ -3,17 +3,22 @@
 from __future__ import print_function
 
 import datetime
+import logging
 
 import pandas as pd
 import numpy as np
 
 from backtester.strategy import Strategy
-from backtester.event import SignalEvent
+from backtester.event import (SignalEvent, MARKET, LONG, SHORT, LONG_STOP_EXIT, LONG_TAKE_PROFIT_EXIT,
+                              SHORT_STOP_EXIT, SHORT_TAKE_PROFIT_EXIT)
 from backtester.backtest import Backtest
 from backtester.data import HistoricCSVDataHandler
 from backtester.execution import SimulatedExecutionHandler
 from backtester.portfolio import Portfolio
 from backtester.TICKER_VALUE import s_tick_amount
+from backtester.progress import setup_logging
+
+logger = logging.getLogger('backtester.signals')
 
 class COTAndPriceTriggerSrategy():
     '''
@@ -31,6 +36,8 @@ class COTAndPriceTriggerSrategy():
         self.bars_momentum = bars_momentum + 1
         self.cross_bar = cross_bar
 
+        # Largest window asked from the data handler
+        self.max_lookback = self.lookback(sma_window=sma_window, bars_momentum=bars_momentum)
 
 
         # Set to True if a symbol is in the market
@@ -45,6 +52,13 @@ class COTAndPriceTriggerSrategy():
         self.cross_bar_long = self._calculate_cross_bar_long_condition()
         self.cross_bar_short = self._calculate_cross_bar_short_condition()
 
+    @staticmethod
+    def lookback(sma_window=18, bars_momentum=3, **params):
+        '''
+        :return: The largest window asked from the data handler for the keyword arguments of the strategy.
+        '''
+        return max(sma_window, bars_momentum + 1)
+
     def _calculate_initial_bought(self):
         '''
         Adds keys to the bought dictionary for all symbols and sets them to 'OUT'.
@@ -114,40 +128,28 @@ class COTAndPriceTriggerSrategy():
 
     def calculate_signals(self, event):
 
-        if event.type == 'MARKET':
+        if event.type == MARKET:
             for s in self.symbol_dict.keys():
-                bars = self.bars.get_latest_bars_values(
-                    s, 'Settle', N=self.sma_window
-                )
-                bars_close = self.bars.get_latest_bars_values(
-                    s, 'Settle', N=self.bars_momentum
-                )
-                bars_high = self.bars.get_latest_bars_values(
-                    s, 'High', N=self.bars_momentum
-                )
-                bars_low = self.bars.get_latest_bars_values(
-                    s, 'Low', N=self.bars_momentum
+                settle, high, low, opn, cot = self.bars.window(
+                    s, ('Settle', 'High', 'Low', 'Open', 'Commercial Index'),
+                    N=max(self.sma_window, self.bars_momentum)
                 )
+                bars = settle[-self.sma_window:]
+                bars_close = settle[-self.bars_momentum:]
+                bars_high = high[-self.bars_momentum:]
+                bars_low = low[-self.bars_momentum:]
                 latest_bar_date = self.bars.get_latest_bar_datetime(s)
-                latest_bar_high = self.bars.get_latest_bar_value(
-                    s, 'High'
-                )
-                latest_bar_low = self.bars.get_latest_bar_value(
-                    s, 'Low'
-                )
-                latest_bar_open = self.bars.get_latest_bar_value(
-                    s, 'Open'
-                )
-                cot_idx = self.bars.get_latest_bar_value(
-                    s, 'Commercial Index'
-                )
+                latest_bar_high = high[-1]
+                latest_bar_low = low[-1]
+                latest_bar_open = opn[-1]
+                cot_idx = cot[-1]
 
                 if bars is not None and bars is not [] and pd.notnull(cot_idx):
                     sma_trigger = np.mean(bars[-self.sma_window:])
 
                     symbol = s
                     dt = datetime.datetime.utcnow()
-                    sig_dir = ''
+                    sig_dir = None
 
 
                     # Define Cross bars
@@ -173,29 +175,29 @@ class COTAndPriceTriggerSrategy():
                             and mom_long_cond \
                             and cot_long_cond \
                             and self.bought[s] == 'OUT':
-                        print(f'{s} LONG: {latest_bar_date} at {max(bars_high[:-1])}')
+                        logger.debug('%s LONG: %s at %s', s, latest_bar_date, max(bars_high[:-1]))
                         self.stop[s] = self.cross_bar_low[s]
                         self.take_profit[s] = max(bars_high[:-1]) + \
                                     (max(bars_high[:-1]) / s_tick_amount[s]  - self.stop[s] / s_tick_amount[s]) * \
                                     s_tick_amount[s]
-                        sig_dir = 'LONG'
-                        signal = SignalEvent('cot', symbol, dt, sig_dir, max(bars_high[:-1]), 1.0)
+                        sig_dir = LONG
+                        signal = SignalEvent.acquire('cot', symbol, dt, sig_dir, max(bars_high[:-1]), 1.0)
                         self.events.put(signal)
                         self.bought[s] = 'LONG'
 
                     # Define Long Stop Exit Signal
                     if latest_bar_low <= self.stop[s] and self.bought[s] == 'LONG':
-                        print(f'{s} LONG STOP EXIT: {latest_bar_date} at {self.stop[s]}')
-                        sig_dir = 'LONG STOP EXIT'
-                        signal = SignalEvent('cot', symbol, dt, sig_dir, self.stop[s], 1.0)
+                        logger.debug('%s LONG STOP EXIT: %s at %s', s, latest_bar_date, self.stop[s])
+                        sig_dir = LONG_STOP_EXIT
+                        signal = SignalEvent.acquire('cot', symbol, dt, sig_dir, self.stop[s], 1.0)
                         self.events.put(signal)
                         self.bought[s] = 'OUT'
 
                     # Define Long Take Profit Exit Signal
                     if latest_bar_high >= self.take_profit[s] and self.bought[s] == 'LONG':
-                        print(f'{s} LONG TAKE PROFIT EXIT: {latest_bar_date} at {self.take_profit[s]}')
-                        sig_dir = 'LONG TAKE PROFIT EXIT'
-                        signal = SignalEvent('cot', symbol, dt, sig_dir, self.take_profit[s], 1.0)
+                        logger.debug('%s LONG TAKE PROFIT EXIT: %s at %s', s, latest_bar_date, self.take_profit[s])
+                        sig_dir = LONG_TAKE_PROFIT_EXIT
+                        signal = SignalEvent.acquire('cot', symbol, dt, sig_dir, self.take_profit[s], 1.0)
                         self.events.put(signal)
                         self.bought[s] = 'OUT'
 
@@ -207,34 +209,35 @@ class COTAndPriceTriggerSrategy():
                             and mom_short_cond \
                             and cot_short_cond \
                             and self.bought[s] == 'OUT':
-                        print(f'{s} SHORT: {latest_bar_date} at {min(bars_low[:-1])}')
+                        logger.debug('%s SHORT: %s at %s', s, latest_bar_date, min(bars_low[:-1]))
                         self.stop[s] = self.cross_bar_high[s]
                         self.take_profit[s] = min(bars_low[:-1]) + \
                                 (min(bars_low[:-1]) / s_tick_amount[s]  - self.stop[s] / s_tick_amount[s]) * \
                                 s_tick_amount[s]
-                        sig_dir = 'SHORT'
-                        signal = SignalEvent('cot', symbol, dt, sig_dir, min(bars_low[:-1]), 1.0)
+                        sig_dir = SHORT
+                        signal = SignalEvent.acquire('cot', symbol, dt, sig_dir, min(bars_low[:-1]), 1.0)
                         self.events.put(signal)
                         self.bought[s] = 'SHORT'
 
                     # Define Short Stop Exit Signal
                     if latest_bar_high >= self.stop[s] and self.bought[s] == 'SHORT':
-                        print(f'{s} SHORT STOP EXIT: {latest_bar_date} at {self.stop[s]}')
-                        sig_dir = 'SHORT STOP EXIT'
-                        signal = SignalEvent('cot', symbol, dt, sig_dir, self.stop[s], 1.0)
+                        logger.debug('%s SHORT STOP EXIT: %s at %s', s, latest_bar_date, self.stop[s])
+                        sig_dir = SHORT_STOP_EXIT
+                        signal = SignalEvent.acquire('cot', symbol, dt, sig_dir, self.stop[s], 1.0)
                         self.events.put(signal)
                         self.bought[s] = 'OUT'
 
                     # Define Short Take Profit Exit Signal
                     if latest_bar_low <= self.take_profit[s] and self.bought[s] == 'SHORT':
-                        print(f'{s} SHORT TAKE PROFIT EXIT: {latest_bar_date} at {self.take_profit[s]}')
-                        sig_dir = 'SHORT TAKE PROFIT EXIT'
-                        signal = SignalEvent('cot', symbol, dt, sig_dir, self.take_profit[s], 1.0)
+                        logger.debug('%s SHORT TAKE PROFIT EXIT: %s at %s', s, latest_bar_date, self.take_profit[s])
+                        sig_dir = SHORT_TAKE_PROFIT_EXIT
+                        signal = SignalEvent.acquire('cot', symbol, dt, sig_dir, self.take_profit[s], 1.0)
                         self.events.put(signal)
                         self.bought[s] = 'OUT'
 
 
 if __name__ == "__main__":
+    setup_logging()
     csv_dir = 'data\\'
     # import and merge dictionaries from TICKER_SYMBOLS.py
     import backtester.TICKER_SYMBOLS as symbols
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester.cache import cache_path, source_key, write_npz
+
+
+def to_int64_dates(index):
+    '''
+    :param index: DatetimeIndex or array like of dates.
+    :return: Nanoseconds since epoch as int64 numpy array.
+    '''
+    return np.asarray(pd.DatetimeIndex(index).values.astype('datetime64[ns]').astype(np.int64))
+
+
+def union_calendar(dates_list):
+    '''
+    Merges the sorted date arrays of all symbols into one sorted calendar without duplicates.
+    :param dates_list: List of sorted int64 date arrays, one per symbol.
+    :return: int64 numpy array
+    '''
+    return np.unique(np.concatenate(dates_list))
+
+
+def resolve_calendar(dates_list, calendar=None, symbols=None):
+    '''
+    Creates the calendar all symbols are aligned on.
+    :param dates_list: List of sorted int64 date arrays, one per symbol.
+    :param calendar: None for the union of all dates, a symbol (string) to follow the dates of that
+    symbol, or an array like of dates, i.e. an exchange calendar.
+    :param symbols: Symbols in the order of dates_list, needed if calendar is a symbol.
+    :return: int64 numpy array
+    '''
+    if calendar is None:
+        return union_calendar(dates_list)
+    if isinstance(calendar, str):
+        return dates_list[list(symbols).index(calendar)]
+    return np.unique(to_int64_dates(calendar))
+
+
+def ffill_index_maps(calendar, dates_list):
+    '''
+    For every symbol and calendar date the position of the last own bar at or before that date, i.e.
+    the bar a forward fill (pad) would use. Dates before the first bar of a symbol map to -1.
+    :param calendar: Sorted int64 calendar.
+    :param dates_list: List of sorted int64 date arrays, one per symbol.
+    :return: int64 numpy array of shape (symbols, calendar)
+    '''
+    maps = np.empty((len(dates_list), len(calendar)), dtype=np.int64)
+    for k, dates in enumerate(dates_list):
+        maps[k] = np.searchsorted(dates, calendar, side='right') - 1
+    return maps
+
+
+def align_values(values_list, maps):
+    '''
+    Aligns the values of all symbols onto the calendar in one vectorized gather.
+    :param values_list: List of float64 arrays of shape (fields, bars of the symbol).
+    :param maps: Index maps from ffill_index_maps.
+    :return: float64 numpy array of shape (symbols, fields, calendar), NaN before a symbol starts.
+    '''
+    lengths = np.array([v.shape[1] for v in values_list], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    n_fields = values_list[0].shape[0]
+
+    # One NaN column at the end serves all dates before the first bar of a symbol
+    stacked = np.concatenate(list(values_list) + [np.full((n_fields, 1), np.nan)], axis=1)
+    gather = np.where(maps >= 0, maps + offsets[:, None], lengths.sum())
+    return np.ascontiguousarray(stacked[:, gather].transpose(1, 0, 2))
+
+
+def cached_index_maps(paths, dates_list, calendar=None, symbols=None, cache_dir=None):
+    '''
+    Same as resolve_calendar and ffill_index_maps, but keeps the result in the binary cache next to the
+    source files. The cache is keyed on the mtime and size of every source and on the calendar, thus
+    repeated runs over the same universe reuse the maps.
+    :param paths: Source files of the symbols, in the order of dates_list.
+    :param dates_list: List of sorted int64 date arrays, one per symbol.
+    :param calendar: See resolve_calendar.
+    :param symbols: Symbols in the order of dates_list.
+    :param cache_dir: Optional directory for the cache files.
+    :return: calendar, maps
+    '''
+    token = hashlib.md5()
+    token.update('|'.join(paths).encode())
+    if calendar is None or isinstance(calendar, str):
+        token.update(repr(calendar).encode())
+    else:
+        token.update(to_int64_dates(calendar).tobytes())
+    key = source_key(paths)
+    path = cache_path(os.path.join(os.path.dirname(paths[0]), f'align_{token.hexdigest()}'), cache_dir)
+
+    if os.path.exists(path):
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                if np.array_equal(npz['key'], key):
+                    return npz['calendar'], npz['maps']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    cal = resolve_calendar(dates_list, calendar, symbols)
+    maps = ffill_index_maps(cal, dates_list)
+    try:
+        write_npz(path, key=key, calendar=cal, maps=maps)
+    except OSError:
+        # The cache can not be written, i.e. a read-only checkout
+        pass
+    return cal, maps
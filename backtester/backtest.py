@@ -3,6 +3,7 @@
 from __future__ import print_function
 
 import datetime
+import os
 import pprint
 try:
     import Queue as queue
@@ -10,6 +11,11 @@ except ImportError:
     import queue
 import time
 
+from backtester.checkpoint import component_state, read_checkpoint, restore_component, write_checkpoint
+from backtester.event import MARKET, SIGNAL, ORDER, FILL, SIGNAL_TYPE_NAMES, DIRECTION_NAMES
+from backtester.eventqueue import EventDeque
+from backtester.progress import ProgressReporter, SignalLog
+
 class Backtest(object):
     '''
     Encapsulates the settings and components out an event-driven backtest.
@@ -17,7 +23,9 @@ class Backtest(object):
 
     def __init__(self, csv_dir, symbol_dict, initial_capital,
                  heartbeat, start_date, data_handler,
-                 execution_handler, portfolio, strategy
+                 execution_handler, portfolio, strategy, live=False,
+                 signal_log=None, progress_interval=5.0, strategy_params=None,
+                 checkpoint=None, checkpoint_interval=None
                  ):
         '''
         Initialises the backtest.
@@ -30,6 +38,13 @@ class Backtest(object):
         :param execution_handler: (Class) Handles the orders/fills for trades.
         :param portfolio: (Class) Keeps track of portfolio current and prior positions.
         :param strategy: (Class) Generates signals based on market data.
+        :param live: Use a thread safe queue.Queue for the events, i.e. with the IB handler. Else a lock free
+        EventDeque is used.
+        :param signal_log: Optional path of a CSV file all signals are written to.
+        :param progress_interval: Seconds between two progress lines on the 'backtester.progress' logger.
+        :param strategy_params: Optional dict of keyword arguments of the strategy, i.e. its windows and bounds.
+        :param checkpoint: Optional path of a checkpoint file, see save_checkpoint.
+        :param checkpoint_interval: Number of bars between two checkpoints.
         '''
         self.csv_dir = csv_dir
         self.symbol_dict = symbol_dict
@@ -41,15 +56,25 @@ class Backtest(object):
         self.execution_handler_cls = execution_handler
         self.portfolio_cls = portfolio
         self.strategy_cls = strategy
+        self.live = live
+        self.signal_log_path = signal_log
+        self.progress_interval = progress_interval
+        self.strategy_params = strategy_params or {}
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
 
-        self.events = queue.Queue()
+        self.events = queue.Queue() if live else EventDeque()
 
         self.signals = 0
+        self.signal_log = None
         self.orders = 0
         self.fills = 0
+        self.bars = 0
         self.num_strats = 1
 
         self._generate_trading_instances()
+        if checkpoint is not None and not callable(getattr(self.data_handler, 'get_state', None)):
+            raise ValueError(f'{type(self.data_handler).__name__} can not be checkpointed, it has no get_state()')
 
     def _generate_trading_instances(self):
         '''
@@ -57,14 +82,87 @@ class Backtest(object):
         (Data-Handler, Strategy, Portfolio and ExecutionHandler) to various internal members.
         '''
         print('Creating DataHandler, Strategy, Portfolio and ExecutionHandler')
-        self.data_handler = self.data_handler_cls(self.events, self.csv_dir, self.symbol_dict)
-        self.strategy = self.strategy_cls(self.data_handler, self.events)
+        # Bound the bar history of the data handler to the largest window the strategy asks for, the ring
+        # buffer is allocated once if the strategy tells its window up front
+        lookback = getattr(self.strategy_cls, 'lookback', None)
+        max_lookback = lookback(**self.strategy_params) if lookback is not None else None
+        self.data_handler = self.data_handler_cls(self.events, self.csv_dir, self.symbol_dict,
+                                                  max_lookback=max_lookback)
+        self.strategy = self.strategy_cls(self.data_handler, self.events, **self.strategy_params)
+        if max_lookback is None and getattr(self.strategy, 'max_lookback', None) is not None:
+            self.data_handler.set_max_lookback(self.strategy.max_lookback)
         self.portfolio = self.portfolio_cls(self.data_handler, self.events,
                                             self.start_date, self.initial_capital)
         self.execution_handler = self.execution_handler_cls(self.events, self.data_handler)
 
+        # Dispatch table of the event loop, indexed by the event type code
+        self.event_handlers = [None] * 4
+        self.event_handlers[MARKET] = self._on_market
+        self.event_handlers[SIGNAL] = self._on_signal
+        self.event_handlers[ORDER] = self._on_order
+        self.event_handlers[FILL] = self._on_fill
+
+    def _on_market(self, event):
+        '''
+        Matches the resting orders against the new bar, recalculates the signals and reindexes the time of the
+        portfolio. The fills of resting orders are queued ahead of the signals of the bar.
+        '''
+        self.execution_handler.on_market(event)
+        self.strategy.calculate_signals(event)
+        self.portfolio.update_timeindex(event)
+
+    def _on_signal(self, event):
+        '''
+        Converts a signal into orders.
+        '''
+        self.signals += 1
+        if self.signal_log is not None:
+            self.signal_log.append(self.data_handler.get_latest_bar_datetime(event.symbol), event)
+        self.portfolio.update_signal(event)
+
+    def _on_order(self, event):
+        '''
+        Sends an order to the execution handler.
+        '''
+        self.orders += 1
+        self.execution_handler.execute_order(event)
 
-    def _run_backtest(self):
+    def _on_fill(self, event):
+        '''
+        Updates the portfolio with a fill.
+        '''
+        self.fills += 1
+        self.portfolio.update_fill(event)
+
+    def _drain_queue(self):
+        '''
+        Handles all events of a queue.Queue until it is empty.
+        '''
+        handlers = self.event_handlers
+        while True:
+            try:
+                event = self.events.get(False)
+            except queue.Empty:
+                break
+            else:
+                if event is not None:
+                    handlers[event.type](event)
+
+    def _drain_deque(self):
+        '''
+        Handles all events of an EventDeque until it is empty, without locks or exceptions.
+        Every event is released after it has been dispatched, thus recyclable events go back to their pool.
+        '''
+        handlers = self.event_handlers
+        events = self.events
+        popleft = events.popleft
+        while events:
+            event = popleft()
+            if event is not None:
+                handlers[event.type](event)
+                event.release()
+
+    def _run_backtest(self, replay_last_bar=True):
         '''
         Executes the backtest.
 
@@ -77,43 +175,123 @@ class Backtest(object):
         If an OrderEvent is received the ExecutionHandler is sent the order to be transmitted to the broker(if live)
 
         Finally, if a FillEvent is received, the Portfolio will update itself to be aware of the new positions.
-        '''
-        i = 0
-        while True:
-            i += 1
-            print(i)
-            # Update the market bars
-            if self.data_handler.continue_backtest == True:
-                self.data_handler.update_bars()
-            else:
-                break
 
-            # Handle the events
+        Once the data is exhausted the last bar is handled once more, unless replay_last_bar is False.
+        :param replay_last_bar: Handle the MarketEvent of the exhausted data handler.
+        '''
+        drain = self._drain_queue if self.live else self._drain_deque
+        dates = getattr(self.data_handler, 'dates', None)
+        progress = ProgressReporter(len(dates) if dates is not None else None, self.progress_interval,
+                                    first=self.bars)
+        self.signal_log = SignalLog(self.signal_log_path) if self.signal_log_path else None
+        checkpoint_interval = self.checkpoint_interval if self.checkpoint else None
+        try:
             while True:
-                try:
-                    event = self.events.get(False)
-                except queue.Empty:
-                    break
+                # Update the market bars
+                if self.data_handler.continue_backtest == True:
+                    self.data_handler.update_bars()
                 else:
-                    if event is not None:
-                        if event.type == 'MARKET':
-                            self.strategy.calculate_signals(event)
-                            self.portfolio.update_timeindex(event)
+                    break
+                if self.data_handler.continue_backtest:
+                    self.bars += 1
+                elif not replay_last_bar:
+                    break
+
+                # Handle the events
+                drain()
+
+                progress.update(self.bars)
+                if checkpoint_interval and self.data_handler.continue_backtest \
+                        and self.bars % checkpoint_interval == 0:
+                    self.save_checkpoint(self.checkpoint)
+                if self.heartbeat:
+                    time.sleep(self.heartbeat)
+        finally:
+            progress.report()
+            if self.signal_log is not None:
+                self.signal_log.close()
+
+
+    def save_checkpoint(self, path):
+        '''
+        Writes the state of the backtest after the last handled bar to a binary checkpoint: the cursor and
+        latest bars of the data handler, the state dicts of the strategy, the current and accumulated
+        positions and holdings of the portfolio, the execution handler and the event counts.
+        Should only be called between bars, i.e. with an empty event queue.
+        :param path: Path of the checkpoint file.
+        '''
+        shared = (self.data_handler, self.events)
+        write_checkpoint(path, dict(
+            data_handler=self.data_handler.get_state(),
+            strategy=component_state(self.strategy, shared),
+            portfolio=component_state(self.portfolio, shared),
+            execution_handler=component_state(self.execution_handler, shared),
+            counts=dict(bars=self.bars, signals=self.signals, orders=self.orders, fills=self.fills),
+        ))
+
+    def load_checkpoint(self, path):
+        '''
+        Restores the state of save_checkpoint. The backtest has to be constructed with the same settings.
+        :param path: Path of the checkpoint file.
+        '''
+        state = read_checkpoint(path)
+        self.data_handler.set_state(state['data_handler'])
+        restore_component(self.strategy, state['strategy'])
+        restore_component(self.portfolio, state['portfolio'])
+        restore_component(self.execution_handler, state['execution_handler'])
+        for name, value in state['counts'].items():
+            setattr(self, name, value)
 
-                        elif event.type == 'SIGNAL':
-                            self.signals += 1
-                            self.portfolio.update_signal(event)
+    def resume(self, path):
+        '''
+        Continues a backtest from a checkpoint instead of bar zero and outputs the performance.
+        :param path: Path of the checkpoint file.
+        '''
+        self.load_checkpoint(path)
+        self.simulate_trading()
+
+    def run_incremental(self, path):
+        '''
+        Daily mode of the live signal run. The state of the previous run is loaded from the checkpoint at
+        path, only the bars after its last date are handled and the new state is written back, thus the
+        runtime depends on the number of new bars instead of the whole history. Without a checkpoint the
+        whole history is run once to create it.
+
+        The state is saved after the last bar without handling it a second time, thus a chain of daily
+        runs ends in the same state as one run over the same bars.
+        :param path: Path of the checkpoint file.
+        :return: The signals and orders of the new bars, as lists of tuples
+        (datetime, symbol, signal type, price, strength) and (datetime, symbol, order type, direction,
+        quantity, price).
+        '''
+        if os.path.exists(path):
+            self.load_checkpoint(path)
+            self.data_handler.continue_backtest = True
 
-                        elif event.type == 'ORDER':
-                            self.orders += 1
-                            self.execution_handler.execute_order(event)
+        signals = []
+        orders = []
+        latest_datetime = self.data_handler.get_latest_bar_datetime
 
-                        elif event.type == 'FILL':
-                            self.fills += 1
-                            self.portfolio.update_fill(event)
+        def on_signal(event):
+            signals.append((latest_datetime(event.symbol), event.symbol, SIGNAL_TYPE_NAMES[event.signal_type],
+                            event.price, event.strength))
+            self._on_signal(event)
 
-            time.sleep(self.heartbeat)
+        def on_order(event):
+            orders.append((latest_datetime(event.symbol), event.symbol, event.order_type,
+                           DIRECTION_NAMES[event.direction], event.quantity, event.price))
+            self._on_order(event)
 
+        handlers = self.event_handlers
+        self.event_handlers = list(handlers)
+        self.event_handlers[SIGNAL] = on_signal
+        self.event_handlers[ORDER] = on_order
+        try:
+            self._run_backtest(replay_last_bar=False)
+        finally:
+            self.event_handlers = handlers
+        self.save_checkpoint(path)
+        return signals, orders
 
     def _output_performance(self):
         '''
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+import gc
+import sys
+import time
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler
+from backtester.event import (MarketEvent, SignalEvent, OrderEvent, FillEvent, MARKET_EVENT, MARKET, SIGNAL, ORDER,
+                              FILL, LONG, BUY)
+from backtester.eventqueue import EventDeque
+from backtester.execution import SimulatedExecutionHandler
+from backtester.portfolio import Portfolio
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+from backtester.vectorized import VectorizedBacktest
+import backtester.TICKER_SYMBOLS as symbols
+
+
+def events_per_second(csv_dir, symbol_dict, repeat=3):
+    '''
+    Runs the event loop of a COT strategy backtest and measures the throughput of the event dispatch,
+    i.e. Market, Signal, Order and Fill events per second. The best of repeat runs is reported.
+    :param csv_dir: Directory of the CSV files.
+    :param symbol_dict: Dictionary of symbol strings.
+    :param repeat: Number of runs.
+    :return: events/sec, number of events, seconds
+    '''
+    best = None
+    for _ in range(repeat):
+        backtest = Backtest(
+            csv_dir, symbol_dict, 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+            HistoricCSVDataHandler, SimulatedExecutionHandler, Portfolio,
+            COTAndPriceTriggerSrategy
+        )
+        start = time.perf_counter()
+        backtest._run_backtest()
+        elapsed = time.perf_counter() - start
+        n_events = backtest.data_handler.bar_index + backtest.signals + backtest.orders + backtest.fills
+        if best is None or elapsed < best[2]:
+            best = (n_events / elapsed, n_events, elapsed)
+    return best
+
+
+def vectorized_seconds(csv_dir, symbol_dict, repeat=3):
+    '''
+    Runs the same COT strategy with the VectorizedBacktest, without the loading of the data.
+    :param csv_dir: Directory of the CSV files.
+    :param symbol_dict: Dictionary of symbol strings.
+    :param repeat: Number of runs.
+    :return: Best seconds of a run, number of fills
+    '''
+    backtest = VectorizedBacktest(csv_dir, symbol_dict, 100000.0, datetime.datetime(1990, 1, 1))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fills = backtest.run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(fills)
+
+
+def dispatch_events_per_second(n=100000, pooled=True):
+    '''
+    Measures the raw cost of the events: n rounds of creating one Market, Signal, Order and Fill event,
+    putting them on an EventDeque and dispatching them through a type table to no-op handlers.
+    :param n: Number of rounds.
+    :param pooled: Use the shared MARKET_EVENT and recycle the other events, as the backtest loop does.
+    :return: events/sec, number of garbage collections during the run
+    '''
+    handlers = [None] * 4
+    handlers[MARKET] = handlers[SIGNAL] = handlers[ORDER] = handlers[FILL] = lambda event: None
+    events = EventDeque()
+    put, popleft = events.put, events.popleft
+    now = datetime.datetime.utcnow()
+    if pooled:
+        market, signal, order, fill = (lambda: MARKET_EVENT, SignalEvent.acquire,
+                                        OrderEvent.acquire, FillEvent.acquire)
+    else:
+        market, signal, order, fill = MarketEvent, SignalEvent, OrderEvent, FillEvent
+
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+    start = time.perf_counter()
+    for _ in range(n):
+        put(market())
+        put(signal('cot', 'ES', now, LONG, 1000.0, 1.0))
+        put(order('ES', 'MKT', 1000.0, 1, BUY))
+        put(fill(now, 'ES', 'CME', 1, BUY, 1000.0, None))
+        while events:
+            event = popleft()
+            handlers[event.type](event)
+            if pooled:
+                event.release()
+    elapsed = time.perf_counter() - start
+    return 4 * n / elapsed, sum(stat['collections'] for stat in gc.get_stats()) - collections
+
+
+if __name__ == "__main__":
+    # python -m backtester.benchmark data/ [ES,CL,...]
+    csv_dir = sys.argv[1] if len(sys.argv) > 1 else 'data\\'
+    if len(sys.argv) > 2:
+        symbol_dict = dict((s, s) for s in sys.argv[2].split(','))
+    else:
+        symbol_dict = {**symbols.quandl_cme_futures_map, **symbols.quandl_ice_futures_map}
+    rate, n_events, elapsed = events_per_second(csv_dir, symbol_dict)
+    for pooled in (False, True):
+        dispatch_rate, collections = dispatch_events_per_second(pooled=pooled)
+        print(f'Event dispatch (pooled={pooled}): {dispatch_rate:,.0f} events/sec, {collections} gc collections')
+    print(f'Backtest: {n_events} events in {elapsed:.2f}s: {rate:,.0f} events/sec')
+    vectorized_elapsed, n_fills = vectorized_seconds(csv_dir, symbol_dict)
+    print(f'VectorizedBacktest: {n_fills} fills in {vectorized_elapsed * 1000.0:.0f}ms')
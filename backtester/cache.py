@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+CACHE_DIR = '.cache'
+
+
+def cache_path(path, cache_dir=None, suffix='.npz'):
+    '''
+    Creates the path of the binary cache file that belongs to a source file. By default the cache lives
+    in a '.cache' folder next to the source, i.e. data/.cache/ES.csv.npz for data/ES.csv.
+    :param path: Path of the source file.
+    :param cache_dir: Optional directory for the cache files.
+    :param suffix: File ending of the cache file.
+    :return: string
+    '''
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), CACHE_DIR)
+    return os.path.join(cache_dir, os.path.basename(path) + suffix)
+
+
+def source_key(paths):
+    '''
+    The key a cache is valid for: modification time (ns) and size of every source file. Any rewrite of
+    a source, e.g. by get_data.py, changes the key and thus invalidates the cache.
+    :param paths: A path or a list of paths.
+    :return: int64 numpy array
+    '''
+    if isinstance(paths, str):
+        paths = [paths]
+    key = []
+    for p in paths:
+        st = os.stat(p)
+        key.extend([st.st_mtime_ns, st.st_size])
+    return np.array(key, dtype=np.int64)
+
+
+def write_npz(path, **arrays):
+    '''
+    Writes a npz file next to its final name first and moves it in place afterwards, thus concurrent
+    readers never see half written caches. The temporary file is removed if the write fails, i.e. on a
+    read-only or full disk, and the OSError is raised.
+    '''
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_csv_cached(path, usecols=None, cache_dir=None):
+    '''
+    Drop in for pd.read_csv(path, index_col='Date', parse_dates=True) on the Quandl files in data/.
+
+    On first use the CSV is parsed and stored as a binary columnar file (one float64 row per column
+    plus an int64 date array). Later calls load the binary file as long as the mtime and size of the
+    source are unchanged. Files with non numeric columns are read from CSV without caching, as are all
+    files if the cache can not be written.
+    :param path: Path of the CSV file, i.e. data/ES.csv or data/ES_cot.csv
+    :param usecols: Optional list of columns to return (the Date column is always the index).
+    :param cache_dir: Optional directory for the cache files.
+    :return: DataFrame indexed by Date
+    '''
+    cpath = cache_path(path, cache_dir)
+    key = source_key(path)
+
+    df = None
+    if os.path.exists(cpath):
+        try:
+            with np.load(cpath, allow_pickle=False) as npz:
+                if np.array_equal(npz['key'], key):
+                    df = pd.DataFrame(npz['values'].T, columns=list(npz['columns']),
+                                      index=pd.DatetimeIndex(npz['dates'].view('datetime64[ns]'), name='Date'))
+        except (OSError, ValueError, KeyError):
+            # Broken or foreign cache file, rebuild it below
+            df = None
+
+    if df is None:
+        df = pd.read_csv(path, index_col='Date', parse_dates=True)
+        try:
+            values = np.ascontiguousarray(df.values.T, dtype=np.float64)
+            dates = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        except (TypeError, ValueError):
+            pass
+        else:
+            try:
+                write_npz(cpath, key=key, dates=dates, values=values,
+                          columns=np.array(df.columns, dtype=str))
+            except OSError:
+                # Read-only checkout or full disk, the parsed frame is still good
+                pass
+            # Same nanosecond index as a read from the cache
+            df.index = pd.DatetimeIndex(dates.view('datetime64[ns]'), name='Date')
+
+    if usecols is not None:
+        missing = [c for c in usecols if c != 'Date' and c not in df.columns]
+        if missing:
+            raise ValueError(f'Usecols do not match columns, columns expected but not found: {missing}')
+        df = df[[c for c in usecols if c != 'Date']]
+    return df
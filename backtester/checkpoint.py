@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+import pickle
+
+
+CHECKPOINT_VERSION = 3
+
+
+def component_state(component, shared):
+    '''
+    :param component: A strategy, portfolio or execution handler.
+    :param shared: Objects the component refers to but that are restored on their own, i.e. the data
+    handler and the event queue.
+    :return: Dictionary of the attributes of the component, without the shared objects.
+    '''
+    return dict((k, v) for k, v in vars(component).items() if not any(v is obj for obj in shared))
+
+
+def restore_component(component, state):
+    '''
+    Sets the attributes of component_state back on a freshly constructed component.
+    :param component: A strategy, portfolio or execution handler.
+    :param state: Dictionary of component_state.
+    '''
+    vars(component).update(state)
+
+
+def write_checkpoint(path, state):
+    '''
+    Pickles the state into a binary file. It is written to a temporary file first and then moved into
+    place, thus a process killed while writing leaves the previous checkpoint intact.
+    :param path: Path of the checkpoint.
+    :param state: Dictionary of the states of the backtest components.
+    '''
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(dict(state, version=CHECKPOINT_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def read_checkpoint(path):
+    '''
+    :param path: Path of the checkpoint.
+    :return: Dictionary of the states of the backtest components.
+    '''
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f'Unsupported checkpoint version {state.get("version")} in {path}')
+    return state
@@ -3,11 +3,18 @@
 from __future__ import print_function
 
 from abc import ABCMeta, abstractmethod
+from collections.abc import Mapping
 
 import numpy as np
 import pandas as pd
 
-from backtester.event import MarketEvent
+from backtester.alignment import align_values, cached_index_maps, resolve_calendar, to_int64_dates
+from backtester.cache import cache_path, read_csv_cached
+from backtester.event import MARKET_EVENT
+from backtester.panel import open_panel
+from backtester.ringbuffer import BarRingBuffer
+from backtester.streaming import (SymbolStream, binary_chunks, binary_is_current, convert_csv_to_binary,
+                                  csv_chunks)
 
 class DataHandler(object):
     '''
@@ -62,6 +69,13 @@ class DataHandler(object):
         :return: Returns one of the Open, High, Low, Close, Volume or OI from the last bar.
         '''
         raise NotImplementedError('Should implement get_latest_bar_value()')
+
+    @abstractmethod
+    def get_latest_bar_vector(self, val_type):
+        '''
+        :return: Returns one of the Open, High, Low, Close, Volume or OI from the last bar of every symbol.
+        '''
+        raise NotImplementedError('Should implement get_latest_bar_vector()')
     
     @abstractmethod
     def get_latest_bar_values(self, symbol, val_type, N=1):
@@ -70,6 +84,14 @@ class DataHandler(object):
         '''
         raise NotImplementedError('Should implement get_latest_bar_values()')
     
+    @abstractmethod
+    def window(self, symbol, fields, N=1):
+        '''
+        :return: Returns read-only views over the last N values of one field (str) or a tuple of views
+        for several fields, or N-k if less available.
+        '''
+        raise NotImplementedError('Should implement window()')
+
     @abstractmethod
     def update_bars(self):
         '''
@@ -85,10 +107,18 @@ class HistoricCSVDataHandler(DataHandler):
     and provide and interface to obtain the 'latest' bar in a manner identical to a live trading interface.
     
     Specifically it is designed to process multiple CSV files, one for each traded symbol, and convert
-    these into a dictionary of pandas DataFrames that can be accessed by the bar methods from DataHandler(ABC).
+    these into a columnar store: one contiguous float64 array per field and symbol plus a shared int64
+    date array. A cursor (bar_index) is moved forward by update_bars, which copies the bar of every symbol
+    into a fixed-size ring buffer (latest_symbol_data) that the bar methods from DataHandler(ABC) read from.
     '''
+
+    fields = ('Open', 'High', 'Low', 'Settle', 'Volume', 'Commercial Index')
+    # Bars per year, i.e. the periods of the Sharpe ratio
+    periods = 252
+    # Bars kept in latest_symbol_data if the strategy does not tell its lookback
+    default_max_lookback = 1000
     
-    def __init__(self, events, csv_dir, symbol_dict):
+    def __init__(self, events, csv_dir, symbol_dict, max_lookback=None, calendar=None):
         '''Initiates the historic data handler by requesting the location of the CSV files 
         and a list/dict of symbols.
         
@@ -97,93 +127,128 @@ class HistoricCSVDataHandler(DataHandler):
         :param events: The Event Queue.
         :param csv_dir: Absolute directory path to the CSV files.
         :param symbol_dict: A dict of symbol strings
+        :param max_lookback: Number of bars kept in latest_symbol_data, default_max_lookback if None.
+        :param calendar: Calendar all symbols are aligned on. None for the union of all dates, a symbol
+        to follow its dates or an array like of dates, i.e. an exchange calendar.
         '''
         
         self.events = events
         self.csv_dir = csv_dir
         self.symbol_dict = symbol_dict
+        self.calendar = calendar
         
         self.symbol_data = {}
-        self.latest_symbol_data = {}
+        self.symbol_index = dict((s, k) for k, s in enumerate(self.symbol_dict.keys()))
+        self.field_index = dict((f, j) for j, f in enumerate(self.fields))
+        self.dates = None
+        self.bar_index = 0
         self.continue_backtest = True
         
         self._open_convert_csv_files()
+        self.set_max_lookback(max_lookback)
         
     
     def _open_convert_csv_files(self):
         '''
-        Opens the CSV files from the data directory, converting them into pandas DataFrame
-        within a symbol dictionary.
+        Opens the CSV files from the data directory (through the binary cache of backtester.cache),
+        converting them into contiguous float64 arrays (one per field) within a symbol dictionary.
         
         fro this handler it will be assumed that the data is taken from Quandl. Thus its 
         format will be respected.
         '''
         
-        comb_index = None
+        paths = []
+        dates_list = []
+        values_list = []
         #todo integrate a generator to generate paths
         for s in self.symbol_dict.keys():
             path = f'{self.csv_dir}{s}.csv'
-            self.symbol_data[s] = (pd.read_csv(path,
-                                              usecols=['Date', 'Open', 'High', 'Low', 'Settle',
-                                                       'Volume', 'Commercial Index'],
-                                              index_col='Date',
-                                              parse_dates=True)
-                                   .sort_index()
-                                   .ffill())
-            # Combine the index to pad forward values
-            if comb_index is None:
-                comb_index = self.symbol_data[s].index
-            else:
-                comb_index.union(self.symbol_data[s].index)
-
-            # Set the latest symbol_data to None
-            self.latest_symbol_data[s] = []
+            df = (read_csv_cached(path, usecols=list(self.fields))
+                  .sort_index()
+                  .ffill())
+            paths.append(path)
+            dates_list.append(to_int64_dates(df.index))
+            values_list.append(np.ascontiguousarray(df.values.T, dtype=np.float64))
 
-        # Reindex the DataFrames
-        for s in self.symbol_dict:
-            self.symbol_data[s] = self.symbol_data[s].\
-                reindex(index=comb_index, method='pad').iterrows()
+        # Align all symbols on one calendar (the union of all dates by default) and pad forward values.
+        # The result is one (symbols, fields, bars) block, thus every field of every symbol is a
+        # contiguous row and the bar of all symbols can be copied in one go
+        self.dates, maps = cached_index_maps(paths, dates_list, self.calendar, list(self.symbol_index))
+        self._data = align_values(values_list, maps)
+        # Windows handed out to strategies may be views, so protect the backing arrays
+        self._data.setflags(write=False)
+        for s, k in self.symbol_index.items():
+            self.symbol_data[s] = dict((f, self._data[k, j]) for f, j in self.field_index.items())
 
+        # Timestamps matching the int64 dates for O(1) datetime lookups
+        self._datetimes = np.array(list(pd.DatetimeIndex(self.dates.view('datetime64[ns]'))), dtype=object)
 
-    def _get_new_bar(self, symbol):
+    def set_max_lookback(self, max_lookback):
         '''
-        Creates a generator to provide a new bar until the end of the symbol data is reached.
-        :param symbol: takes Symbol as String.
-        :return: The latest bar from the data feed.
+        Allocates the ring buffer holding the latest bars. Should be called before the first bar, usually
+        with the largest window the strategy asks for. Windows longer than the buffer raise a ValueError.
+        :param max_lookback: Number of bars kept per symbol, default_max_lookback if None.
         '''
+        self.max_lookback = max_lookback
+        self.latest_symbol_data = BarRingBuffer(max_lookback or self.default_max_lookback,
+                                                (len(self.symbol_index), len(self.fields)))
 
-        for b in self.symbol_data[symbol]:
-            yield b
+    def get_state(self):
+        '''
+        :return: The cursor and the latest bars, i.e. what a checkpoint needs to continue after the last bar.
+        '''
+        return dict(
+            last_date=self.dates[self.bar_index - 1] if self.bar_index else None,
+            continue_backtest=self.continue_backtest,
+            max_lookback=self.max_lookback,
+            latest_symbol_data=self.latest_symbol_data,
+        )
 
+    def set_state(self, state):
+        '''
+        Restores the state of get_state. The cursor is placed behind the last date of the state, not at
+        its position, thus bars appended to the CSV files since then follow directly.
+        :param state: Dictionary of get_state.
+        '''
+        last_date = state['last_date']
+        self.bar_index = 0 if last_date is None else int(np.searchsorted(self.dates, last_date, side='right'))
+        self.continue_backtest = state['continue_backtest']
+        self.max_lookback = state['max_lookback']
+        self.latest_symbol_data = state['latest_symbol_data']
 
-    def get_latest_bar(self, symbol):
+    def _get_symbol_index(self, symbol):
         '''
         :param symbol: takes symbol as string.
-        :return: The last bar from the latest_symbol list.
+        :return: The position of the symbol within latest_symbol_data.
         '''
 
         try:
-            bars_list = self.latest_symbol_data[symbol]
+            return self.symbol_index[symbol]
         except KeyError:
             print('That symbol is not available in the historical data set.')
             raise
-        else:
-            return bars_list[-1]
+
+    def get_latest_bar(self, symbol):
+        '''
+        :param symbol: takes symbol as string.
+        :return: The last bar as a tuple (datetime, open, high, low, settle, volume, commercial index).
+        '''
+
+        k = self._get_symbol_index(symbol)
+        ring = self.latest_symbol_data
+        return (ring.last_datetime(),) + tuple(ring.last((k, j)) for j in range(len(self.fields)))
 
     def get_latest_bars(self, symbol, N=1):
         '''
         :param symbol: takes symbol as string.
         :param N: takes N latest bars.
-        :return: The last N bars form the latest_symbol list, or N-k if less available.
+        :return: The last N bars as tuples in the format of get_latest_bar, or N-k if less available.
         '''
 
-        try:
-            bars_list = self.latest_symbol_data[symbol]
-        except KeyError:
-            print('That symbol is not available in the historical data set.')
-            raise
-        else:
-            return bars_list[-N:]
+        k = self._get_symbol_index(symbol)
+        ring = self.latest_symbol_data
+        return list(zip(ring.window_datetimes(N),
+                        *(ring.window((k, j), N) for j in range(len(self.fields)))))
 
     def get_latest_bar_datetime(self, symbol):
         '''
@@ -192,81 +257,323 @@ class HistoricCSVDataHandler(DataHandler):
         :return: A Python datetime object for the last bar.
         '''
 
-        try:
-            bars_list = self.latest_symbol_data[symbol]
-        except KeyError:
-            print('That symbol is not available in the historical data set.')
-            raise
-        else:
-            return bars_list[-1][0]
+        self._get_symbol_index(symbol)
+        return self.latest_symbol_data.last_datetime()
 
     def get_latest_bars_datetime(self, symbol, N=1):
         '''
-        Queries the latest bar for a datetime object representing the "latest market price".
+        Queries the latest N bars for datetime objects representing the "latest market price".
         :param symbol: takes symbol as string.
-        :return: A Python datetime object for the last bar.
+        :return: An array of Python datetime objects for the last N bars, or N-k if less available.
         '''
 
-        try:
-            bars_list = self.latest_symbol_data[symbol]
-        except KeyError:
-            print('That symbol is not available in the historical data set.')
-            raise
-        else:
-            return bars_list[-N:][0]
+        self._get_symbol_index(symbol)
+        return self.latest_symbol_data.window_datetimes(N)
 
     def get_latest_bar_value(self, symbol, val_type):
         '''
-        Makes use of Python getattr function, which queries an object to see if a particular attribute
-        exist on an object. Thus we can pass a string such as 'Open' or 'Close' to getattr to obtain
-        the value direct from the bar.
+        Reads the latest value straight from the ring buffer, thus we can pass a string such as 'Open'
+        or 'Settle' to obtain the value direct from the bar.
         :param symbol: Takes symbol as string.
         :param val_type: Takes arguments regarding a bar i.e. 'High', 'Low' etc.
-        :return: One of the Open, High, Low, Close, Volume or OI values from the pandas Bar series object.
+        :return: One of the Open, High, Low, Settle, Volume or Commercial Index values as a scalar.
         '''
 
-        try:
-            bars_list = self.latest_symbol_data[symbol]
-        except KeyError:
-            print('That symbol is not available in the historical data set.')
-            raise
-        else:
-            return getattr(bars_list[-1][1], val_type)
+        return self.latest_symbol_data.last((self._get_symbol_index(symbol), self.field_index[val_type]))
+
+    def get_latest_bar_vector(self, val_type):
+        '''
+        Reads the latest value of all symbols at once, i.e. the Settle of the whole universe for the
+        valuation of the portfolio.
+        :param val_type: Takes arguments regarding a bar i.e. 'High', 'Low' etc.
+        :return: A numpy view with one value per symbol in the order of symbol_dict, valid until the next
+        call of update_bars.
+        '''
+
+        return self.latest_symbol_data.last((slice(None), self.field_index[val_type]))
 
     def get_latest_bars_values(self, symbol, val_type, N=1):
         '''
-        Makes use of Python getattr function, which queries an object to see if a particular attribute
-        exist on an object. Thus we can pass a string such as 'Open' or 'Close' to getattr to obtain
-        the value direct from N bars.
+        Slices the ring buffer of the symbol. Thus we can pass a string such as 'Open' or 'Settle' to
+        obtain the values direct from N bars.
         :param symbol: Takes symbol as string.
         :param val_type: Takes arguments regarding a bar i.e. 'High', 'Low' etc.
         :param N: takes N latest bars.
-        :return: The last N bar values from the latest_symbol list, or N-k if less available.
+        :return: The last N bar values as a numpy array, or N-k if less available.
         '''
 
-        try:
-            bars_list = self.get_latest_bars(symbol, N)
-        except KeyError:
-            print('That symbol is not available in the historical data set.')
-            raise
+        return self.window(symbol, val_type, N)
+
+    def window(self, symbol, fields, N=1):
+        '''
+        Returns read-only views over the ring buffer, without copying and without any per-element
+        Python work. Several fields can be requested in one call, e.g.
+        bars.window('ES', ('Settle', 'High', 'Low'), 4)
+        The views are valid until the next call of update_bars.
+        :param symbol: Takes symbol as string.
+        :param fields: A field name i.e. 'Settle' or a sequence of field names.
+        :param N: takes N latest bars, at most max_lookback, else a ValueError is raised.
+        :return: A numpy view for a single field, else a tuple of views in the order of fields.
+        '''
+
+        k = self._get_symbol_index(symbol)
+        ring = self.latest_symbol_data
+        if isinstance(fields, str):
+            return ring.window((k, self.field_index[fields]), N)
+        return tuple(ring.window((k, self.field_index[f]), N) for f in fields)
+
+    def update_bars(self):
+        '''
+        Generates a MarketEvent that gets added to the queue as it moves the cursor to the next bar
+        and pushes that bar of all symbols into the latest_symbol_data ring buffer.
+        '''
+        i = self.bar_index
+        if i < len(self.dates):
+            self.latest_symbol_data.append(self._datetimes[i], self._data[:, :, i])
+            self.bar_index = i + 1
         else:
-            return np.array([getattr(b[1], val_type) for b in bars_list])
+            self.continue_backtest = False
+        self.events.put(MARKET_EVENT)
+
+
+class _PanelColumns(Mapping):
+    '''
+    The fields of one symbol of MMapPanelDataHandler on a calendar other than the one of the panel. A field
+    is gathered from the memory map on its first access only, i.e. by the vectorized engine, since
+    update_bars reads the rows of the panel directly.
+    '''
+
+    def __init__(self, values, rows, k, field_columns):
+        '''
+        :param values: The [time, symbol, field] values of the panel.
+        :param rows: Panel row of every calendar date, -1 before the panel starts.
+        :param k: Column of the symbol in the panel.
+        :param field_columns: Dictionary of field -> column in the panel.
+        '''
+        self.values = values
+        self.rows = rows
+        self.k = k
+        self.field_columns = field_columns
+        self.columns = {}
+
+    def __getitem__(self, field):
+        column = self.columns.get(field)
+        if column is None:
+            column = np.where(self.rows >= 0, self.values[self.rows, self.k, self.field_columns[field]], np.nan)
+            column.setflags(write=False)
+            self.columns[field] = column
+        return column
+
+    def __iter__(self):
+        return iter(self.field_columns)
+
+    def __len__(self):
+        return len(self.field_columns)
+
+
+class MMapPanelDataHandler(HistoricCSVDataHandler):
+    '''
+    MMapPanelDataHandler serves the bars from the memory-mapped [time, symbol, field] panel of
+    backtester.panel instead of parsing one CSV file per symbol. The panel is opened read-only, thus many
+    backtest processes share the same pages of one file. It is (re)built from the CSV files if it does not
+    exist yet or if its sources changed.
+
+    The requested symbols are aligned on the same calendar as with HistoricCSVDataHandler, i.e. the union
+    of their own dates by default, by selecting the matching rows of the panel. Thus a panel that holds
+    more symbols gives the same bars as the CSV files.
+    '''
+
+    def __init__(self, events, csv_dir, symbol_dict, max_lookback=None, calendar=None, panel_path=None):
+        '''
+        Initiates the handler the same way as HistoricCSVDataHandler.
+        :param events: The Event Queue.
+        :param csv_dir: Absolute directory path to the CSV files.
+        :param symbol_dict: A dict of symbol strings
+        :param max_lookback: Number of bars kept in latest_symbol_data, default_max_lookback if None.
+        :param calendar: Calendar all symbols are aligned on. None for the union of their dates, a symbol
+        to follow its dates or an array like of dates, i.e. an exchange calendar.
+        :param panel_path: Optional path of the panel file, defaults to the cache folder of csv_dir.
+        '''
+        self.panel_path = panel_path
+        super().__init__(events, csv_dir, symbol_dict, max_lookback, calendar)
+
+    def _open_convert_csv_files(self):
+        '''
+        Opens the panel and maps the requested symbols and fields onto it. Raises a ValueError if the file
+        of a symbol lacks one of the fields, as read_csv_cached does for HistoricCSVDataHandler.
+        '''
+        symbols = list(self.symbol_index.keys())
+        self.panel = panel = open_panel(self.csv_dir, symbols, self.panel_path, self.fields)
+
+        cols = [panel.symbol_index[s] for s in symbols]
+        fcols = [panel.field_index[f] for f in self.fields]
+        for s, k in zip(symbols, cols):
+            missing = [f for f, j in zip(self.fields, fcols) if not panel.has_field[k, j]]
+            if missing:
+                raise ValueError(f'Usecols do not match columns, columns expected but not found: {missing} '
+                                 f'in {s}.csv')
+        self._bar_selector = np.ix_(cols, fcols)
+
+        # The panel row of every calendar date is the last row at or before it, i.e. a forward fill.
+        # -1 marks the dates before the panel starts
+        self.dates = resolve_calendar([panel.symbol_dates(s) for s in symbols], self.calendar, symbols)
+        self._rows = np.searchsorted(panel.dates, self.dates, side='right') - 1
+        self._nan_bar = np.full((len(cols), len(fcols)), np.nan)
+        if np.array_equal(self.dates, panel.dates):
+            # The calendar is the one of the panel, thus the fields are views into the memory map
+            for s, k in zip(symbols, cols):
+                self.symbol_data[s] = dict((f, panel.values[:, k, j]) for f, j in zip(self.fields, fcols))
+        else:
+            field_columns = dict(zip(self.fields, fcols))
+            for s, k in zip(symbols, cols):
+                self.symbol_data[s] = _PanelColumns(panel.values, self._rows, k, field_columns)
+
+        self._datetimes = np.array(list(pd.DatetimeIndex(self.dates.view('datetime64[ns]'))), dtype=object)
 
     def update_bars(self):
         '''
-        Generates a MarketEvent that gets added to the queue as it appends the latest bars to
-        the latest_symbol_data dictionary.
+        Generates a MarketEvent that gets added to the queue as it moves the cursor to the next bar
+        and pushes that bar of all symbols into the latest_symbol_data ring buffer.
+        '''
+        i = self.bar_index
+        if i < len(self.dates):
+            row = self._rows[i]
+            bar = self.panel.values[row][self._bar_selector] if row >= 0 else self._nan_bar
+            self.latest_symbol_data.append(self._datetimes[i], bar)
+            self.bar_index = i + 1
+        else:
+            self.continue_backtest = False
+        self.events.put(MARKET_EVENT)
+
+
+class StreamingCSVDataHandler(HistoricCSVDataHandler):
+    '''
+    StreamingCSVDataHandler is the lazy counterpart of HistoricCSVDataHandler. Instead of loading all CSV
+    files up front, every symbol is read in chunks as the backtest cursor moves forward, while a background
+    thread per symbol prefetches the next chunks. Time to first bar is small and, together with the ring
+    buffer, peak memory stays bounded for very long or intraday histories.
+
+    The files have to be sorted by date. Symbols are aligned on the union of their dates on the fly.
+    '''
+
+    def __init__(self, events, csv_dir, symbol_dict, max_lookback=None, chunksize=10000, prefetch=2):
+        '''
+        Initiates the streaming data handler.
+        :param events: The Event Queue.
+        :param csv_dir: Absolute directory path to the CSV files.
+        :param symbol_dict: A dict of symbol strings
+        :param max_lookback: Number of bars kept in latest_symbol_data, default_max_lookback if None.
+        :param chunksize: Number of rows read per chunk.
+        :param prefetch: Number of chunks read ahead per symbol.
+        '''
+        self.chunksize = chunksize
+        self.prefetch = prefetch
+        super().__init__(events, csv_dir, symbol_dict, max_lookback)
 
-        Pushes the latest bar to the latest_symbol_data structure for all symbols in the symbol list.
+    def _open_chunks(self, s):
         '''
-        for s in self.symbol_dict.keys():
-            try:
-                bar = next(self._get_new_bar(s))
-            except StopIteration:
-                self.continue_backtest = False
-            else:
-                if bar is not None:
-                    self.latest_symbol_data[s].append(bar)
-        self.events.put(MarketEvent())
+        :param s: takes symbol as string.
+        :return: Iterable of (int64 dates, values of shape (fields, rows)) of the symbol.
+        '''
+        return csv_chunks(f'{self.csv_dir}{s}.csv', self.fields, self.chunksize)
+
+    def get_state(self):
+        '''
+        :return: The date of the last bar and the latest bars, i.e. what a checkpoint needs to continue after
+        the last bar.
+        '''
+        return dict(
+            last_date=self._last_date,
+            bar_index=self.bar_index,
+            continue_backtest=self.continue_backtest,
+            max_lookback=self.max_lookback,
+            latest_symbol_data=self.latest_symbol_data,
+        )
 
+    def set_state(self, state):
+        '''
+        Restores the state of get_state. The streams skip the bars up to the last date of the state, thus
+        bars appended to the CSV files since then follow directly.
+        :param state: Dictionary of get_state.
+        '''
+        self._last_date = state['last_date']
+        if self._last_date is not None:
+            for st in self.streams:
+                st.skip_to(self._last_date)
+        self.bar_index = state['bar_index']
+        self.continue_backtest = state['continue_backtest']
+        self.max_lookback = state['max_lookback']
+        self.latest_symbol_data = state['latest_symbol_data']
 
+    def _open_convert_csv_files(self):
+        '''
+        Opens one prefetching stream per symbol. No data is loaded besides the first chunks.
+        '''
+        self.streams = [SymbolStream(self._open_chunks(s), len(self.fields), self.prefetch)
+                        for s in self.symbol_index]
+        self._bar = np.full((len(self.symbol_index), len(self.fields)), np.nan)
+        self._last_date = None
+
+    def update_bars(self):
+        '''
+        Generates a MarketEvent that gets added to the queue as it moves all streams to the next date
+        of the union calendar and pushes that bar of all symbols into the latest_symbol_data ring buffer.
+        '''
+        next_dates = [d for d in (st.next_date() for st in self.streams) if d is not None]
+        if next_dates:
+            date = min(next_dates)
+            for k, st in enumerate(self.streams):
+                self._bar[k] = st.advance(date)
+            self.latest_symbol_data.append(pd.Timestamp(date), self._bar)
+            self.bar_index += 1
+            self._last_date = date
+        else:
+            self.continue_backtest = False
+            for st in self.streams:
+                st.close()
+        self.events.put(MARKET_EVENT)
+
+
+class IntradayDataHandler(StreamingCSVDataHandler):
+    '''
+    IntradayDataHandler streams intraday bars, i.e. minutely or 5-min, of tens of millions of rows per symbol.
+    On first use (or after the CSV changed) every CSV file is converted chunk by chunk into raw binary files
+    in the cache folder of csv_dir. The backtest then streams those through memory maps, thus only the
+    current chunks and the lookback window of the ring buffer are held in memory.
+
+    It plugs into the same Backtest loop as the daily handlers.
+    '''
+
+    def __init__(self, events, csv_dir, symbol_dict, max_lookback=None, chunksize=100000, prefetch=2,
+                 bar_minutes=5, datetime_cols=('Date', 'Time'), binary=True):
+        '''
+        Initiates the intraday data handler.
+        :param events: The Event Queue.
+        :param csv_dir: Absolute directory path to the CSV files.
+        :param symbol_dict: A dict of symbol strings
+        :param max_lookback: Number of bars kept in latest_symbol_data, default_max_lookback if None.
+        :param chunksize: Number of rows read per chunk.
+        :param prefetch: Number of chunks read ahead per symbol.
+        :param bar_minutes: Bar size in minutes, sets the periods of the Sharpe ratio.
+        :param datetime_cols: Column(s) holding the timestamp of a bar, joined by a blank.
+        :param binary: Stream from the binary conversion (True) or straight from the CSV files (False).
+        '''
+        self.bar_minutes = bar_minutes
+        self.periods = 252 * 6.5 * 60 / bar_minutes
+        self.datetime_cols = tuple(datetime_cols)
+        self.binary = binary
+        super().__init__(events, csv_dir, symbol_dict, max_lookback, chunksize, prefetch)
+
+    def _open_chunks(self, s):
+        '''
+        :param s: takes symbol as string.
+        :return: Iterable of (int64 dates, values of shape (fields, rows)) of the symbol.
+        '''
+        path = f'{self.csv_dir}{s}.csv'
+        if not self.binary:
+            return csv_chunks(path, self.fields, self.chunksize, self.datetime_cols)
+
+        prefix = cache_path(path, suffix='')
+        if not binary_is_current(path, prefix, self.fields):
+            convert_csv_to_binary(path, prefix, self.fields, self.chunksize, self.datetime_cols)
+        return binary_chunks(prefix, len(self.fields), self.chunksize)
@@ -3,30 +3,93 @@
 from __future__ import print_function
 
 
+# Event type codes, the event loop dispatches on them through a table
+MARKET, SIGNAL, ORDER, FILL = 0, 1, 2, 3
+EVENT_TYPE_NAMES = ('MARKET', 'SIGNAL', 'ORDER', 'FILL')
+
+# Signal type codes
+LONG, SHORT, EXIT, LONG_STOP_EXIT, LONG_TAKE_PROFIT_EXIT, SHORT_STOP_EXIT, SHORT_TAKE_PROFIT_EXIT = range(7)
+SIGNAL_TYPE_NAMES = ('LONG', 'SHORT', 'EXIT', 'LONG STOP EXIT', 'LONG TAKE PROFIT EXIT',
+                     'SHORT STOP EXIT', 'SHORT TAKE PROFIT EXIT')
+SIGNAL_TYPE_CODES = dict((name, code) for code, name in enumerate(SIGNAL_TYPE_NAMES))
+
+# Order/fill direction codes, the sign of a position change
+BUY, SELL = 1, -1
+DIRECTION_NAMES = {BUY: 'BUY', SELL: 'SELL'}
+DIRECTION_CODES = {'BUY': BUY, 'SELL': SELL}
+
+
 class Event(object):
     '''
     Event is base class providing an interface for all subsequent(inherited) events,
     that will trigger further events in the trading infrastructure.
+
+    Events use __slots__, thus they carry no __dict__, and the type is a class level integer code.
+    '''
+    __slots__ = ()
+
+    def __repr__(self):
+        return f'{type(self).__name__}(' + \
+               ', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__) + ')'
+
+    def release(self):
+        '''
+        Hands the event back once it has been dispatched. Plain events are left to the garbage collector.
+        '''
+        pass
+
+class RecyclableEvent(Event):
     '''
-    pass
+    Base class of events that are recycled through a per class free list. acquire() hands out a released
+    object re-initialised with the given arguments (or a new one if the pool is empty) and release()
+    puts it back, thus the event loop allocates almost nothing in steady state.
+
+    The backtest event loop releases every event after it has been dispatched, thus handlers must not
+    keep a reference to an event after returning and an event must not be released twice.
+    '''
+    __slots__ = ()
+    pool_size = 1024
+
+    @classmethod
+    def acquire(cls, *args, **kwargs):
+        '''
+        Same arguments as the constructor of the event class.
+        :return: An initialised event from the pool.
+        '''
+        pool = cls._pool
+        if pool:
+            event = pool.pop()
+            event.__init__(*args, **kwargs)
+            return event
+        return cls(*args, **kwargs)
+
+    def release(self):
+        '''
+        Puts the event back into the pool of its class.
+        '''
+        pool = self._pool
+        if len(pool) < self.pool_size:
+            pool.append(self)
 
 class MarketEvent(Event):
     '''
     MarketEvent occurs when the DataHandler object receives a new update of market data, for any symbols.
     It is used to trigger the Strategy object generating new signals.
     '''
+    __slots__ = ()
+    type = MARKET
 
-    def __init__(self):
-        '''
-        Initialises MarketEvent.
-        '''
-        self.type = 'MARKET'
+# MarketEvent carries no payload, thus all data handlers share one immutable instance
+MARKET_EVENT = MarketEvent()
 
-class SignalEvent(Event):
+class SignalEvent(RecyclableEvent):
     '''
     The Strategy object utilizes data to create new SignalEvents.
     Those are utilized by the Portfolio object as advice for how to trade.
     '''
+    __slots__ = ('strategy_id', 'symbol', 'datetime', 'signal_type', 'price', 'strength')
+    type = SIGNAL
+    _pool = []
 
     def __init__(self, strategy_id, symbol, datetime, signal_type, price, strength):
         '''
@@ -34,40 +97,43 @@ class SignalEvent(Event):
         :param strategy_id: The unique identifier for the strategy that generated the signal.
         :param symbol: The ticker symbol, e.g. 'GOOG'.
         :param datetime: The timestamp at which the signal was generated.
-        :param signal_type: 'Long' ot 'Short'.
+        :param signal_type: Signal type code, i.e. LONG or SHORT. The names of SIGNAL_TYPE_NAMES are accepted too.
         :param strength: An adjustment factor 'suggestion' used to scale quantity at the portfolio level. Useful for pairs strategies.
         '''
 
-        self.type = 'SIGNAL'
         self.strategy_id = strategy_id
         self.symbol = symbol
         self.datetime = datetime
-        self.signal_type = signal_type
+        self.signal_type = SIGNAL_TYPE_CODES.get(signal_type, signal_type)
         self.strength = strength
         self.price = price
 
-class OrderEvent(Event):
+class OrderEvent(RecyclableEvent):
     '''
     Handles the event of sending an Order to an execution system.
     The order contains a symbol (e.g. GOOG), a type (market of limit), quantity and a direction.
     '''
+    __slots__ = ('symbol', 'order_type', 'price', 'quantity', 'direction', 'signal_type')
+    type = ORDER
+    _pool = []
 
-    def __init__(self, symbol, order_type, price, quantity, direction):
+    def __init__(self, symbol, order_type, price, quantity, direction, signal_type=None):
         '''
         Initiates the order type, setting whether it is a Market order ('MKT') or
-        Limit order ('LMT'), has quantity (integral) and its direction ('BUY') or ('SELL').
+        Limit order ('LMT'), has quantity (integral) and its direction (BUY) or (SELL).
         :param symbol: The instrument to trade.
         :param order_type: 'MKT' or 'LMT' for Market or Limit.
         :param quantity: Non-negative integer for quantity.
-        :param direction: 'BUY' or 'SELL' for long or short.
+        :param direction: BUY (1) or SELL (-1) for long or short, 'BUY' and 'SELL' are accepted too.
+        :param signal_type: Optional code of the signal the order was generated from, i.e. the exit reason.
         '''
 
-        self.type = 'ORDER'
         self.symbol = symbol
         self.order_type = order_type
         self.price = price
         self.quantity = quantity
-        self.direction = direction
+        self.direction = DIRECTION_CODES.get(direction, direction)
+        self.signal_type = signal_type
 
     def print_order(self):
         '''
@@ -76,18 +142,23 @@ class OrderEvent(Event):
         print(
             f'Order: Symbol={self.symbol}, Type={self.order_type}, Price={self.price}'
             f'Quantity={self.quantity}, '
-            f'Direction={self.direction}'
+            f'Direction={DIRECTION_NAMES[self.direction]}'
         )
 
 
-class FillEvent(Event):
+class FillEvent(RecyclableEvent):
     '''
     When an ExecutionHandler receives an OrderEvent it must transact the order. Once an order
     has been transacted it generates a FillEvent, which describes the cost of purchase or sale
     as well as the transaction costs, such as fees or slippage.
     '''
+    __slots__ = ('timeindex', 'symbol', 'exchange', 'quantity', 'direction', 'fill_cost', 'price', 'commission',
+                 'signal_type')
+    type = FILL
+    _pool = []
 
-    def __init__(self, timeindex, symbol, exchange, quantity, direction, price, fill_cost, commission=None):
+    def __init__(self, timeindex, symbol, exchange, quantity, direction, price, fill_cost, commission=None,
+                 signal_type=None):
         '''
         Initialises the FillEvent object. Sets the symbol, exchange, quantity, direction,
         fill_cost and an optional commission.
@@ -98,20 +169,21 @@ class FillEvent(Event):
         :param symbol: The instrument which was filled.
         :param exchange: The exchange where the order was filled.
         :param quantity: The filled quantity.
-        :param direction: The direction of fill ('BUY' or 'SELL')
+        :param direction: The direction of fill, BUY (1) or SELL (-1), 'BUY' and 'SELL' are accepted too.
         :param fill_cost: The holdings value in dollars.
         :param commission: An optional commission sent from IB.
+        :param signal_type: Optional code of the signal of the order, i.e. the exit reason.
         '''
 
-        self.type = 'FILL'
         self.timeindex = timeindex
         self.symbol = symbol
         self.exchange =exchange
         self.quantity = quantity
-        self.direction = direction
+        self.direction = DIRECTION_CODES.get(direction, direction)
         self.fill_cost = fill_cost
         self.price  = price
         self.commission = commission
+        self.signal_type = signal_type
 
         # Calculate commission
         if commission is None:
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+from collections import deque
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+class EventDeque(deque):
+    '''
+    EventDeque is a FIFO of events for single threaded backtests. It offers the put/get interface of
+    queue.Queue, thus the DataHandler, Strategy, Portfolio and ExecutionHandler objects work with either,
+    but it takes no lock and the event loop can drain it without raising queue.Empty on every bar.
+
+    It is a collections.deque, thus put, popleft and truth testing run without extra Python calls.
+    A live system, where the broker API puts fills from another thread, should stay with queue.Queue.
+    '''
+
+    put = deque.append
+    put_nowait = deque.append
+
+    def get(self, block=True, timeout=None):
+        '''
+        Same as queue.Queue.get, but never blocks.
+        :return: The oldest event.
+        '''
+        try:
+            return self.popleft()
+        except IndexError:
+            raise queue.Empty
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def empty(self):
+        return not self
+
+    def qsize(self):
+        return len(self)
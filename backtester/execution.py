@@ -9,8 +9,11 @@ try:
 except ImportError:
     import queue
 
-from backtester.event import FillEvent
+import operator
+
+from backtester.event import FillEvent, ORDER, BUY, SELL
 from backtester.data import HistoricCSVDataHandler
+from backtester.orderbook import OrderBook, CXL, RESTING_ORDER_TYPES, TRIGGER_FIELDS
 
 
 class ExecutionHandler(object):
@@ -32,6 +35,13 @@ class ExecutionHandler(object):
         '''
         raise NotImplementedError('Should implement execute_order()')
 
+    def on_market(self, event):
+        '''
+        Called with every MarketEvent before the strategy, i.e. to match resting orders against the new bar.
+        :param event: The MarketEvent.
+        '''
+        pass
+
 #todo in the future, as it comes with live trading, need to generate more sophisticated execution handler
 class SimulatedExecutionHandler(ExecutionHandler):
     '''
@@ -40,6 +50,10 @@ class SimulatedExecutionHandler(ExecutionHandler):
 
     This allows a straightforward 'first go' test of any strategy, before implementation with more
     sophisticated execution handler.
+
+    Market orders are filled or dropped on the bar they arrive. Stop ('STP') and limit ('LMT') orders that
+    the bar does not trigger rest in an OrderBook and are matched against the following bars, a 'CXL'
+    order cancels the resting orders of its symbol.
     '''
 
     def __init__(self, events, bars):
@@ -50,6 +64,20 @@ class SimulatedExecutionHandler(ExecutionHandler):
         self.events = events
         self.bars = bars
 
+        # Bar field -> trigger, an order triggered by the High fills once the High reaches the price, an order
+        # triggered by the Low once the Low does
+        self.triggers = {
+            'High': operator.ge,
+            'Low': operator.le,
+        }
+        self.book = OrderBook()
+
+    def _fill(self, symbol, quantity, direction, price, signal_type):
+        fill_event = FillEvent.acquire(
+            datetime.datetime.utcnow(), symbol, 'CME', quantity, direction, price, None, signal_type=signal_type
+        )
+        self.events.put(fill_event)
+
     def execute_order(self, event):
         '''
         Simply converts Order objects into Fill objects once the order Price is triggered,
@@ -57,22 +85,27 @@ class SimulatedExecutionHandler(ExecutionHandler):
         or fill ratio problems.
         :param event: Contains an Event object with order information.
         '''
-        if event.type == 'ORDER':
-            bar_high = self.bars.get_latest_bar_value(
-                event.symbol, 'High'
-            )
-            bar_low = self.bars.get_latest_bar_value(
-                event.symbol, 'Low'
-            )
-            if event.direction == 'BUY' and bar_high >= event.price:
-                fill_event = FillEvent(
-                    datetime.datetime.utcnow(), event.symbol, 'CME', event.quantity, event.direction,
-                    event.price, None
-                )
-                self.events.put(fill_event)
-            if event.direction == 'SELL' and bar_low <= event.price:
-                fill_event = FillEvent(
-                    datetime.datetime.utcnow(), event.symbol, 'CME', event.quantity, event.direction,
-                    event.price, None
-                )
-                self.events.put(fill_event)
\ No newline at end of file
+        if event.type == ORDER:
+            if event.order_type == CXL:
+                self.book.cancel_symbol(event.symbol)
+                return
+            field = TRIGGER_FIELDS[(event.direction, event.order_type)]
+            if self.triggers[field](self.bars.get_latest_bar_value(event.symbol, field), event.price):
+                self._fill(event.symbol, event.quantity, event.direction, event.price, event.signal_type)
+            elif event.order_type in RESTING_ORDER_TYPES:
+                self.book.add(event.symbol, event.order_type, event.price, event.quantity, event.direction,
+                              event.signal_type)
+
+    def on_market(self, event):
+        '''
+        Fills the resting orders the new bar triggers, only the symbols with resting orders are looked at.
+        :param event: The MarketEvent.
+        '''
+        book = self.book
+        if not book.books:
+            return
+        bar_value = self.bars.get_latest_bar_value
+        for symbol in book.symbols():
+            fills = book.match(symbol, bar_value(symbol, 'Open'), bar_value(symbol, 'High'), bar_value(symbol, 'Low'))
+            for (_, _, _, _, quantity, direction, signal_type), price in fills:
+                self._fill(symbol, quantity, direction, price, signal_type)
@@ -13,7 +13,7 @@ from ib.ext.Contract import Contract
 from ib.ext.Order import Order
 from ib.opt import ibConnection
 
-from backtester.event import FillEvent
+from backtester.event import FillEvent, ORDER, DIRECTION_CODES, DIRECTION_NAMES
 from backtester.execution import ExecutionHandler
 
 
@@ -137,7 +137,7 @@ class IBExecutionHandler(ExecutionHandler):
         self.fill_dict[msg.orderId] = {
             'symbol': msg.contract.m_symbol,
             'exchange': msg.contract.m_exchange,
-            'direction': msg.order.m_action,
+            'direction': DIRECTION_CODES[msg.order.m_action],
             'filled': False
         }
 
@@ -173,13 +173,13 @@ class IBExecutionHandler(ExecutionHandler):
         placed back on the event queue.
         :param event: Contains an Event object with order information.
         '''
-        if event.type == 'ORDER':
+        if event.type == ORDER:
             # Prepare the parameters for the asset order
             asset = event.symbol
             asset_type = 'STK'
             order_type = event.order_type
             quantity = event.quantity
-            direction = event.direction
+            direction = DIRECTION_NAMES[event.direction]
 
             # Create the Interactive Brokers contract vie the passed Order Event
             ib_contract = self.create_contract(
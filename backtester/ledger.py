@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+
+
+class Ledger(object):
+    '''
+    Ledger is a preallocated table of float64 values with one datetime per row, i.e. the positions or the
+    holdings of a Portfolio per bar. Rows are written in place by index instead of appending one dict per
+    bar, and the filled rows are exposed as a DataFrame over the same memory.
+
+    The capacity doubles once it is exhausted, thus a ledger also works if the number of bars is not known
+    up front, i.e. with the streaming data handlers.
+    '''
+
+    def __init__(self, columns, capacity=1024):
+        '''
+        Allocates the ledger.
+        :param columns: Column names, i.e. the symbols followed by 'cash', 'commission' and 'total'.
+        :param capacity: Number of rows allocated up front, usually the number of bars plus one.
+        '''
+        self.columns = list(columns)
+        self.column_index = dict((c, j) for j, c in enumerate(self.columns))
+        capacity = max(int(capacity), 1)
+        self.values = np.zeros((capacity, len(self.columns)), dtype=np.float64)
+        self.dates = np.zeros(capacity, dtype='datetime64[ns]')
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def __getstate__(self):
+        # Only the filled rows are pickled, i.e. into a checkpoint
+        state = self.__dict__.copy()
+        state['values'] = self.values[:self.rows].copy()
+        state['dates'] = self.dates[:self.rows].copy()
+        return state
+
+    def _grow(self):
+        capacity = max(2 * len(self.values), 1024)
+        values = np.zeros((capacity, len(self.columns)), dtype=np.float64)
+        values[:self.rows] = self.values[:self.rows]
+        dates = np.zeros(capacity, dtype='datetime64[ns]')
+        dates[:self.rows] = self.dates[:self.rows]
+        self.values, self.dates = values, dates
+
+    def append(self, dt):
+        '''
+        Adds a zeroed row.
+        :param dt: The datetime of the row.
+        :return: The index of the row in values.
+        '''
+        row = self.rows
+        if row == len(self.values):
+            self._grow()
+        self.dates[row] = dt
+        self.rows = row + 1
+        return row
+
+    def frame(self):
+        '''
+        :return: A DataFrame of the filled rows indexed by datetime. It shares the memory of the ledger, thus it
+        is a snapshot that is not extended by later rows.
+        '''
+        return pd.DataFrame(self.values[:self.rows], index=pd.DatetimeIndex(self.dates[:self.rows], name='datetime'),
+                            columns=self.columns, copy=False)
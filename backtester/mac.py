@@ -3,15 +3,19 @@
 from __future__ import print_function
 
 import datetime
+import logging
 
 import numpy as np
 
 from backtester.strategy import Strategy
-from backtester.event import SignalEvent
+from backtester.event import SignalEvent, MARKET, LONG, EXIT
 from backtester.backtest import Backtest
 from backtester.data import HistoricCSVDataHandler
 from backtester.execution import SimulatedExecutionHandler
 from backtester.portfolio import Portfolio
+from backtester.progress import setup_logging
+
+logger = logging.getLogger('backtester.signals')
 
 class MovingAvarageCrossStrategy(Strategy):
     '''
@@ -34,9 +38,19 @@ class MovingAvarageCrossStrategy(Strategy):
         self.short_window = short_window
         self.long_window = long_window
 
+        # Largest window asked from the data handler
+        self.max_lookback = self.lookback(long_window=long_window)
+
         # Set to True if a symbol is in the market
         self.bought = self._calculate_initial_bought()
 
+    @staticmethod
+    def lookback(long_window=100, **params):
+        '''
+        :return: The largest window asked from the data handler for the keyword arguments of the strategy.
+        '''
+        return long_window
+
     def _calculate_initial_bought(self):
         '''
         Adds keys to the bought dictionary for all symbols and sets them to 'OUT'.
@@ -53,11 +67,9 @@ class MovingAvarageCrossStrategy(Strategy):
         meaning a long entry and vice versa for a shot entry.
         :param event: A MarketEvent object
         '''
-        if event.type == 'MARKET':
+        if event.type == MARKET:
             for s in self.symbol_dict.keys():
-                bars = self.bars.get_latest_bars_values(
-                    s, 'Settle', N=self.long_window
-                )
+                bars = self.bars.window(s, 'Settle', N=self.long_window)
                 bar_date = self.bars.get_latest_bar_datetime(s)
                 if bars is not None and bars is not []:
                     short_sma = np.mean(bars[-self.short_window:])
@@ -65,22 +77,23 @@ class MovingAvarageCrossStrategy(Strategy):
 
                     symbol = s
                     dt = datetime.datetime.utcnow()
-                    sig_dir = ''
+                    sig_dir = None
 
                     if short_sma > long_sma and self.bought[s] == 'OUT':
-                        print(f'LONG: {bar_date}')
-                        sig_dir = 'LONG'
-                        signal = SignalEvent(1, symbol, dt, sig_dir, bars[-1], 1.0)
+                        logger.debug('%s LONG: %s', s, bar_date)
+                        sig_dir = LONG
+                        signal = SignalEvent.acquire(1, symbol, dt, sig_dir, bars[-1], 1.0)
                         self.events.put(signal)
                         self.bought[s] = 'LONG'
                     elif short_sma < long_sma and self.bought[s] == 'LONG':
-                        print(f'SHORT: {bar_date}')
-                        sig_dir = 'EXIT'
-                        signal = SignalEvent(1, symbol, dt, sig_dir, bars[-1], 1.0)
+                        logger.debug('%s EXIT: %s', s, bar_date)
+                        sig_dir = EXIT
+                        signal = SignalEvent.acquire(1, symbol, dt, sig_dir, bars[-1], 1.0)
                         self.events.put(signal)
                         self.bought[s] = 'OUT'
 
 if __name__ == "__main__":
+    setup_logging()
     csv_dir = 'data\\'
     # Import and merge dictionaries from TICKER_SYMBOLS.py
     # symbol_dict = {**gd.quandl_cme_futures_map, **gd.quandl_ice_futures_map}
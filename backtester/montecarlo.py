@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester.performance import BATCH_SUMMARY_STATS, create_batch_summary_stats
+
+
+RETURNS = 'returns'
+TRADES = 'trades'
+
+
+def _resample_paths(kind, data, initial_capital, length, block_size, seeds):
+    '''
+    Generates resampled equity paths, every path draws from a random generator of its own.
+    :param seeds: One SeedSequence per path.
+    :return: A [length + 1, paths] array of the totals, the first row is the initial capital.
+    '''
+    n = len(data)
+    n_paths = len(seeds)
+    equity = np.empty((length + 1, n_paths))
+    if kind == RETURNS:
+        # Circular block bootstrap, the blocks keep the autocorrelation of the returns
+        n_blocks = -(-length // block_size)
+        starts = np.empty((n_blocks, 1, n_paths), dtype=np.int64)
+        for p, seed in enumerate(seeds):
+            starts[:, 0, p] = np.random.default_rng(seed).integers(0, n, n_blocks)
+        index = (starts + np.arange(block_size)[None, :, None]) % n
+        returns = data[index.reshape(n_blocks * block_size, n_paths)[:length]]
+        equity[0] = 1.0
+        np.cumprod(1.0 + returns, axis=0, out=equity[1:])
+        equity *= initial_capital
+    else:
+        # The trades are drawn with replacement, i.e. in a random order and mix
+        index = np.empty((length, n_paths), dtype=np.int64)
+        for p, seed in enumerate(seeds):
+            index[:, p] = np.random.default_rng(seed).integers(0, n, length)
+        equity[0] = 0.0
+        np.cumsum(data[index], axis=0, out=equity[1:])
+        equity += initial_capital
+    return equity
+
+
+def _simulate_chunk(args):
+    '''
+    Generates one chunk of resampled equity paths and reduces them to their summary statistics, thus only
+    the statistics leave the worker.
+    :return: A [paths, statistics] array.
+    '''
+    kind, data, initial_capital, first, n_paths, length, block_size, periods, entropy = args
+    # The seed of a path is the one SeedSequence(entropy).spawn() hands out at its position
+    seeds = [np.random.SeedSequence(entropy, spawn_key=(p,)) for p in range(first, first + n_paths)]
+    equity = _resample_paths(kind, data, initial_capital, length, block_size, seeds)
+    return create_batch_summary_stats(equity, periods=periods).values
+
+
+class MonteCarlo(object):
+    '''
+    Monte Carlo robustness test of a backtest. The daily returns of an equity curve are block bootstrapped,
+    or the profits of its trades are resampled, into many alternative equity paths. Their summary statistics,
+    i.e. the max drawdown and the Sharpe ratio, give percentile bands instead of the single values of the
+    backtest.
+
+    The paths are generated in chunks of a bounded size, every chunk is reduced to its statistics right
+    away, thus the memory does not grow with the number of paths. The chunks run in a process pool. Every
+    path has its own seed derived from seed, thus the result depends neither on the number of workers nor on
+    the chunk size.
+    '''
+
+    def __init__(self, initial_capital, n_paths=10000, chunk=256, periods=252, max_workers=None, seed=None):
+        '''
+        Initialises the simulation.
+        :param initial_capital: The starting capital of every path.
+        :param n_paths: Number of resampled paths.
+        :param chunk: Number of paths generated at once, [length, chunk] arrays are held per worker.
+        :param periods: Daily (252), Hourly (252 * 6.5), Minutely (252*6.5*60) etc.
+        :param max_workers: Number of processes, the number of CPUs by default. 1 runs in this process.
+        :param seed: Seed of the random generator, None for a random one.
+        '''
+        self.initial_capital = initial_capital
+        self.n_paths = n_paths
+        self.chunk = chunk
+        self.periods = periods
+        self.max_workers = max_workers
+        self.seed = seed
+
+        self.stats = None
+
+    def _run(self, kind, data, length, block_size, periods):
+        '''
+        Simulates all chunks.
+        :return: DataFrame with the summary statistics of every path.
+        '''
+        entropy = np.random.SeedSequence(self.seed).entropy
+        args = [(kind, data, self.initial_capital, first, min(self.chunk, self.n_paths - first), length,
+                 block_size, periods, entropy) for first in range(0, self.n_paths, self.chunk)]
+
+        max_workers = min(self.max_workers or os.cpu_count() or 1, max(len(args), 1))
+        if max_workers == 1:
+            results = list(map(_simulate_chunk, args))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_simulate_chunk, args))
+
+        self.stats = pd.DataFrame(np.concatenate(results), columns=BATCH_SUMMARY_STATS)
+        return self.stats
+
+    def bootstrap_returns(self, returns, block_size=20, length=None):
+        '''
+        Block bootstraps the returns of an equity curve, i.e. Portfolio.equity_curve['returns'].
+        :param returns: The period returns, missing values are dropped.
+        :param block_size: Number of consecutive returns drawn at once.
+        :param length: Number of returns of every path, the number of returns by default.
+        :return: DataFrame with the summary statistics of every path.
+        '''
+        returns = np.asarray(returns, dtype=np.float64)
+        returns = returns[~np.isnan(returns)]
+        return self._run(RETURNS, returns, length or len(returns), block_size, self.periods)
+
+    def resample_trades(self, pnl, length=None, periods=None):
+        '''
+        Resamples the profits of the trades of a backtest with replacement.
+        :param pnl: The profit or loss of every trade in USD.
+        :param length: Number of trades of every path, the number of trades by default.
+        :param periods: Number of trades per year for the Sharpe ratio and CAGR, periods of the simulation
+        by default.
+        :return: DataFrame with the summary statistics of every path.
+        '''
+        pnl = np.asarray(pnl, dtype=np.float64)
+        return self._run(TRADES, pnl, length or len(pnl), 1, periods or self.periods)
+
+    def percentile_bands(self, percentiles=(5, 25, 50, 75, 95)):
+        '''
+        :param percentiles: The percentiles of the bands.
+        :return: DataFrame with one row per percentile and one column per summary statistic of the paths.
+        '''
+        bands = self.stats.quantile(np.asarray(percentiles) / 100.0)
+        bands.index = pd.Index(percentiles, name='percentile')
+        return bands
+
+
+if __name__ == "__main__":
+    equity_curve = pd.read_csv('backtester\\equity.csv', index_col=0, parse_dates=True)
+    monte_carlo = MonteCarlo(equity_curve['total'].iloc[0])
+    monte_carlo.bootstrap_returns(equity_curve['returns'])
+    print(monte_carlo.percentile_bands().to_string())
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import heapq
+
+from backtester.event import BUY, SELL
+
+
+# Order types, market orders are filled or dropped on the bar they arrive, stops and limits rest until
+# they are triggered. A cancel order removes the resting orders of its symbol.
+MKT, STP, LMT, CXL = 'MKT', 'STP', 'LMT', 'CXL'
+RESTING_ORDER_TYPES = (STP, LMT)
+
+# (direction, order type) -> bar field that triggers the order. A buy stop and a sell limit are triggered
+# once the High reaches the price, a sell stop and a buy limit once the Low does.
+TRIGGER_FIELDS = {
+    (BUY, MKT): 'High',
+    (SELL, MKT): 'Low',
+    (BUY, STP): 'High',
+    (SELL, STP): 'Low',
+    (BUY, LMT): 'Low',
+    (SELL, LMT): 'High',
+}
+
+
+class OrderBook(object):
+    '''
+    OrderBook keeps the resting stop and limit orders of a simulated broker. Every symbol has two heaps:
+    the orders triggered by the High, sorted by ascending price, and the orders triggered by the Low,
+    sorted by descending price. A bar only pops the orders from the top of the heaps that it triggers,
+    thus matching a bar costs O(log n) per triggered order plus one look at every symbol with resting
+    orders, instead of a check of every resting order.
+
+    Orders are stored as plain tuples (id, symbol, order type, price, quantity, direction, signal type),
+    since the OrderEvents are recycled once they have been handled. Cancelled orders are removed from the
+    heaps lazily, once they reach the top.
+    '''
+
+    def __init__(self):
+        # Symbol -> (orders triggered by the High, orders triggered by the Low)
+        self.books = {}
+        # Id -> symbol of the resting orders
+        self.orders = {}
+        self.cancelled = set()
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, symbol, order_type, price, quantity, direction, signal_type=None):
+        '''
+        Rests a stop or limit order.
+        :return: The id of the order, to cancel it.
+        '''
+        order_id = self.next_id
+        self.next_id += 1
+        order = (order_id, symbol, order_type, price, quantity, direction, signal_type)
+        high, low = self.books.setdefault(symbol, ([], []))
+        if TRIGGER_FIELDS[(direction, order_type)] == 'High':
+            heapq.heappush(high, (price, order_id, order))
+        else:
+            heapq.heappush(low, (-price, order_id, order))
+        self.orders[order_id] = symbol
+        return order_id
+
+    def cancel(self, order_id):
+        '''
+        Cancels one resting order.
+        :param order_id: The id of add.
+        '''
+        if self.orders.pop(order_id, None) is not None:
+            self.cancelled.add(order_id)
+
+    def cancel_symbol(self, symbol):
+        '''
+        Cancels all resting orders of a symbol.
+        :param symbol: Takes symbol as string.
+        '''
+        book = self.books.pop(symbol, None)
+        if book is not None:
+            for heap in book:
+                for entry in heap:
+                    self.cancelled.discard(entry[1])
+                    self.orders.pop(entry[1], None)
+
+    def symbols(self):
+        '''
+        :return: The symbols with resting orders.
+        '''
+        return list(self.books)
+
+    def match(self, symbol, open_, high, low):
+        '''
+        Removes the orders of a symbol that a bar triggers. An order is filled at its price, or at the Open
+        if the bar gapped through the price.
+        :param symbol: Takes symbol as string.
+        :param open_: Open of the bar.
+        :param high: High of the bar.
+        :param low: Low of the bar.
+        :return: List of (order, fill price), in the order of the heaps.
+        '''
+        book = self.books.get(symbol)
+        if book is None:
+            return []
+        high_heap, low_heap = book
+        cancelled = self.cancelled
+        orders = self.orders
+        fills = []
+        # Comparisons with a missing (NaN) High or Low are False, thus a bar without data triggers nothing
+        while high_heap and high_heap[0][0] <= high:
+            price, order_id, order = heapq.heappop(high_heap)
+            if order_id in cancelled:
+                cancelled.discard(order_id)
+                continue
+            del orders[order_id]
+            fills.append((order, open_ if open_ > price else price))
+        while low_heap and -low_heap[0][0] >= low:
+            price, order_id, order = heapq.heappop(low_heap)
+            if order_id in cancelled:
+                cancelled.discard(order_id)
+                continue
+            del orders[order_id]
+            fills.append((order, open_ if open_ < -price else -price))
+        if not high_heap and not low_heap:
+            del self.books[symbol]
+        return fills
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester.alignment import align_values, ffill_index_maps, resolve_calendar, to_int64_dates
+from backtester.cache import cache_path, read_csv_cached, source_key, write_npz
+from backtester.TICKER_SYMBOLS import quandl_cme_futures_map, quandl_ice_futures_map
+
+
+PANEL_FIELDS = ('Open', 'High', 'Low', 'Settle', 'Volume', 'Commercial Index')
+
+
+def universe():
+    '''
+    :return: All symbols of the futures universe, CME and ICE.
+    '''
+    return list({**quandl_cme_futures_map, **quandl_ice_futures_map}.keys())
+
+
+class MMapPanel(object):
+    '''
+    MMapPanel holds all symbols of the universe in one float64 array of shape [time, symbol, field],
+    aligned on a shared trading calendar. The array lives in a .npy file that is opened read-only as
+    a memory map, thus many backtest processes share the same pages instead of each parsing the CSVs.
+
+    The calendar, symbols, fields and the key of the source files are kept in a small npz next to it,
+    together with two masks: present marks the dates on which a symbol has a bar of its own (the other
+    rows are forward filled), has_field marks the fields that the file of a symbol holds (the others are NaN).
+    Thus a data handler can align a subset of the symbols on their own calendar.
+    '''
+
+    def __init__(self, values_path, meta_path):
+        '''
+        Opens an existing panel read-only.
+        :param values_path: Path of the [time, symbol, field] .npy file.
+        :param meta_path: Path of the npz file with dates, symbols, fields, key and the masks.
+        '''
+        self.values_path = values_path
+        self.meta_path = meta_path
+        with np.load(meta_path, allow_pickle=False) as meta:
+            self.dates = meta['dates']
+            self.symbols = list(meta['symbols'])
+            self.fields = list(meta['fields'])
+            self.key = meta['key']
+            # Panels written before the masks existed are rebuilt by open_panel
+            self.present = meta['present'] if 'present' in meta.files else None
+            self.has_field = meta['has_field'] if 'has_field' in meta.files else None
+        self.values = np.load(values_path, mmap_mode='r')
+        self.symbol_index = dict((s, k) for k, s in enumerate(self.symbols))
+        self.field_index = dict((f, j) for j, f in enumerate(self.fields))
+
+    def datetimes(self):
+        '''
+        :return: The shared calendar as a DatetimeIndex.
+        '''
+        return pd.DatetimeIndex(self.dates.view('datetime64[ns]'), name='Date')
+
+    def symbol_dates(self, symbol):
+        '''
+        :param symbol: Takes symbol as string.
+        :return: The int64 dates on which the symbol has a bar of its own.
+        '''
+        return self.dates[self.present[:, self.symbol_index[symbol]]]
+
+
+def panel_paths(csv_dir, path=None):
+    '''
+    :param csv_dir: Directory of the CSV files.
+    :param path: Optional path of the panel file, defaults to the cache folder of csv_dir.
+    :return: Paths of the values file and the meta file.
+    '''
+    if path is None:
+        path = cache_path(os.path.join(csv_dir, 'panel'), suffix='.npy')
+    return path, os.path.splitext(path)[0] + '_meta.npz'
+
+
+def _source_paths(csv_dir, symbols):
+    return [os.path.join(csv_dir, f'{s}.csv') for s in symbols]
+
+
+def build_panel(csv_dir, symbols=None, path=None, fields=PANEL_FIELDS, calendar=None):
+    '''
+    Reads the CSV file of every symbol, aligns them on the calendar of backtester.alignment.resolve_calendar
+    with the forward fill maps (NaN before a symbol starts) and writes the [time, symbol, field] panel to disk.
+    Fields missing in a file, i.e. the Commercial Index before get_data.py merged it, are NaN and marked
+    in has_field.
+    :param csv_dir: Directory of the CSV files.
+    :param symbols: Symbols to include, defaults to the whole futures universe.
+    :param path: Optional path of the panel file.
+    :param fields: Fields to include.
+    :param calendar: None for the union of the dates of symbols, a symbol to follow its dates or an array
+    like of dates.
+    :return: MMapPanel
+    '''
+    if symbols is None:
+        symbols = universe()
+    symbols = list(symbols)
+    values_path, meta_path = panel_paths(csv_dir, path)
+    sources = _source_paths(csv_dir, symbols)
+    key = source_key(sources)
+
+    frames = [read_csv_cached(p).sort_index().ffill() for p in sources]
+    has_field = np.array([[f in df.columns for f in fields] for df in frames], dtype=bool)
+    frames = [df.reindex(columns=list(fields)) for df in frames]
+    dates_list = [to_int64_dates(df.index) for df in frames]
+    calendar = resolve_calendar(dates_list, calendar, symbols)
+    present = np.stack([np.isin(calendar, dates) for dates in dates_list], axis=1)
+    aligned = align_values([np.ascontiguousarray(df.values.T, dtype=np.float64) for df in frames],
+                           ffill_index_maps(calendar, dates_list))
+
+    os.makedirs(os.path.dirname(values_path) or '.', exist_ok=True)
+    tmp = f'{values_path}.{os.getpid()}.tmp'
+    out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float64,
+                                    shape=(len(calendar), len(symbols), len(fields)))
+    out[:] = aligned.transpose(2, 0, 1)
+    out.flush()
+    del out
+    os.replace(tmp, values_path)
+
+    write_npz(meta_path, key=key, dates=calendar, symbols=np.array(symbols, dtype=str),
+              fields=np.array(fields, dtype=str), present=present, has_field=has_field)
+    return MMapPanel(values_path, meta_path)
+
+
+def open_panel(csv_dir, symbols=None, path=None, fields=PANEL_FIELDS):
+    '''
+    Opens the panel of csv_dir read-only, (re)building it first if it does not exist, misses one of
+    the requested symbols or fields, or if any of its source files changed since it was written.
+    A rebuilt panel holds the requested symbols and those of the previous panel, on the union of their
+    dates. The handlers select the rows of their own symbols through present.
+    :param csv_dir: Directory of the CSV files.
+    :param symbols: Symbols that have to be in the panel, defaults to the whole futures universe.
+    :param path: Optional path of the panel file.
+    :param fields: Fields that have to be in the panel.
+    :return: MMapPanel
+    '''
+    values_path, meta_path = panel_paths(csv_dir, path)
+    required = universe() if symbols is None else list(symbols)
+    wanted = []
+    if os.path.exists(values_path) and os.path.exists(meta_path):
+        panel = MMapPanel(values_path, meta_path)
+        if panel.present is not None \
+                and all(s in panel.symbol_index for s in required) \
+                and all(f in panel.field_index for f in fields) \
+                and np.array_equal(panel.key, source_key(_source_paths(csv_dir, panel.symbols))):
+            return panel
+        # Keep the symbols of the previous panel whose files still exist, for the other processes
+        wanted = [s for s in panel.symbols if os.path.exists(os.path.join(csv_dir, f'{s}.csv'))]
+    wanted = list(dict.fromkeys(wanted + required))
+    return build_panel(csv_dir, wanted, path, fields)
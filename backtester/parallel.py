@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import os
+
+from backtester.backtest import Backtest
+from backtester.data import MMapPanelDataHandler
+from backtester.event import FillEvent, MARKET_EVENT, SIGNAL, ORDER, SIGNAL_TYPE_NAMES, DIRECTION_NAMES
+from backtester.progress import ProgressReporter
+
+
+class FillRecorder(object):
+    '''
+    Mixin for the Portfolio of a worker. It keeps the positions, thus orders are sized as in a serial run,
+    but instead of the holdings it records every fill.
+    '''
+
+    def update_timeindex(self, event):
+        pass
+
+    def update_fill(self, event):
+        self.update_positions_from_fill(event)
+        self.fill_log.append((event.symbol, event.timeindex, event.exchange, event.quantity, event.direction,
+                              event.price, event.fill_cost, event.commission, event.signal_type))
+
+
+class EmissionRecorder(object):
+    '''
+    Mixin for the SimulatedExecutionHandler of a worker. It counts the market events and gives every fill
+    a key that sorts the fills of all workers in the order the serial event loop emits them: within a market
+    event the resting orders are matched first, one symbol after the other in the order their books were
+    opened in the OrderBook, then the orders of the signals follow in the order of the symbols.
+    '''
+
+    def on_market(self, event):
+        self.step += 1
+        self.matching = True
+        try:
+            super().on_market(event)
+        finally:
+            self.matching = False
+
+    def execute_order(self, event):
+        symbol = event.symbol
+        books = self.book.books
+        opened = symbol in books
+        super().execute_order(event)
+        if not opened and symbol in books:
+            self.opened[symbol] = (self.step, self.symbol_positions[symbol])
+
+    def _fill(self, symbol, quantity, direction, price, signal_type):
+        if self.matching:
+            self.fill_keys.append((self.step, 0) + self.opened[symbol])
+        else:
+            self.fill_keys.append((self.step, 1, 0, self.symbol_positions[symbol]))
+        super()._fill(symbol, quantity, direction, price, signal_type)
+
+
+def _worker_backtest(csv_dir, symbol_dict, initial_capital, start_date, data_handler, execution_handler,
+                     portfolio, strategy, strategy_params, checkpoint=None, bar_index=0):
+    '''
+    Constructs the Backtest of a worker, continued from its checkpoint if that was saved after the same bar
+    as the checkpoint of the ParallelBacktest and for the same symbols.
+    :param checkpoint: Optional path of the checkpoint of the worker.
+    :param bar_index: Cursor of the data handler of the ParallelBacktest, 0 without a checkpoint.
+    :return: The Backtest and whether it was continued from the checkpoint.
+    '''
+    backtest = Backtest(
+        csv_dir, symbol_dict, initial_capital, 0.0, start_date,
+        data_handler, execution_handler, portfolio, strategy,
+        strategy_params=strategy_params
+    )
+    if not bar_index or checkpoint is None or not os.path.exists(checkpoint):
+        return backtest, False
+    backtest.load_checkpoint(checkpoint)
+    if backtest.data_handler.bar_index == bar_index and list(backtest.portfolio.symbols) == list(symbol_dict):
+        backtest.data_handler.continue_backtest = True
+        return backtest, True
+    # Another grouping or an older checkpoint, the worker runs the whole history
+    return _worker_backtest(csv_dir, symbol_dict, initial_capital, start_date, data_handler, execution_handler,
+                            portfolio, strategy, strategy_params)
+
+
+def _simulate_symbols(args):
+    '''
+    Runs the signal and execution stages of a subset of the symbols. With a checkpoint, the worker continues
+    from it and saves its state after the last bar.
+    :return: The fills as (sort key, sequence, fill fields...), the signals and orders as (step, symbol position,
+    sequence, fields of Backtest.run_incremental...) and the event counts.
+    '''
+    (csv_dir, symbol_dict, symbol_positions, initial_capital, start_date, data_handler,
+     execution_handler, portfolio, strategy, strategy_params, replay_last_bar, checkpoint, bar_index) = args
+    recorder = type(f'Recording{portfolio.__name__}', (FillRecorder, portfolio), {})
+    emitter = type(f'Recording{execution_handler.__name__}', (EmissionRecorder, execution_handler),
+                   {'symbol_positions': symbol_positions})
+    backtest, resumed = _worker_backtest(csv_dir, symbol_dict, initial_capital, start_date, data_handler, emitter,
+                                         recorder, strategy, strategy_params, checkpoint, bar_index)
+    backtest.portfolio.fill_log = []
+    execution = backtest.execution_handler
+    execution.fill_keys = []
+    if not resumed:
+        execution.step = 0
+        execution.matching = False
+        execution.opened = {}
+
+    # The signals and orders as Backtest.run_incremental collects them, they are emitted in the order of the
+    # symbols within a market event
+    signals = []
+    orders = []
+    latest_datetime = backtest.data_handler.get_latest_bar_datetime
+    on_signal = backtest.event_handlers[SIGNAL]
+    on_order = backtest.event_handlers[ORDER]
+
+    def record_signal(event):
+        signals.append((execution.step, symbol_positions[event.symbol], len(signals),
+                        latest_datetime(event.symbol), event.symbol, SIGNAL_TYPE_NAMES[event.signal_type],
+                        event.price, event.strength))
+        on_signal(event)
+
+    def record_order(event):
+        orders.append((execution.step, symbol_positions[event.symbol], len(orders),
+                       latest_datetime(event.symbol), event.symbol, event.order_type,
+                       DIRECTION_NAMES[event.direction], event.quantity, event.price))
+        on_order(event)
+
+    backtest.event_handlers[SIGNAL] = record_signal
+    backtest.event_handlers[ORDER] = record_order
+    backtest._run_backtest(replay_last_bar=replay_last_bar)
+
+    fills = [key + (seq,) + fill
+             for seq, (key, fill) in enumerate(zip(execution.fill_keys, backtest.portfolio.fill_log))]
+    if checkpoint is not None:
+        backtest.portfolio.fill_log = []
+        execution.fill_keys = []
+        backtest.save_checkpoint(checkpoint)
+    return fills, signals, orders, backtest.signals, backtest.orders, backtest.fills
+
+
+class ParallelBacktest(Backtest):
+    '''
+    Runs the strategy of every symbol in worker processes and merges the fills into one Portfolio.
+
+    The signal state of COTAndPriceTriggerSrategy and the naive sizing of Portfolio only depend on the
+    symbol itself, thus the universe is split into max_workers groups that each run their own event loop
+    on the shared calendar. The fills are then replayed bar by bar into the Portfolio of this process,
+    in the order the serial event loop emits them (market event, resting orders before new orders, sequence),
+    thus the positions, holdings, trades and equity curve are the same as a serial run.
+
+    In run_incremental every worker keeps a checkpoint of its own next to the one of the ParallelBacktest,
+    thus the workers only simulate the new bars. Without a matching worker checkpoint, i.e. after resume(), a
+    worker simulates the whole history and only the fills of the bars behind the checkpoint are handed to the
+    Portfolio.
+
+    Strategies whose symbols depend on each other, i.e. portfolio level sizing, can not be split.
+    '''
+
+    def __init__(self, csv_dir, symbol_dict, initial_capital,
+                 heartbeat, start_date, data_handler,
+                 execution_handler, portfolio, strategy, strategy_params=None, max_workers=None):
+        '''
+        Initialises the backtest, see Backtest.
+        :param data_handler: (Class) Handles the market data feed. Either MMapPanelDataHandler or a handler
+        that takes a calendar like HistoricCSVDataHandler.
+        :param execution_handler: (Class) A SimulatedExecutionHandler, its fills are recorded in the workers.
+        :param max_workers: Number of processes, the number of CPUs by default.
+        '''
+        self.max_workers = max_workers
+        super().__init__(csv_dir, symbol_dict, initial_capital, heartbeat, start_date, data_handler,
+                         execution_handler, portfolio, strategy, strategy_params=strategy_params)
+
+    def _worker_data_handler(self):
+        '''
+        :return: The data handler class of the workers, aligned on the calendar of the whole universe.
+        '''
+        return functools.partial(self.data_handler_cls, calendar=self.data_handler.dates)
+
+    def _simulate(self, replay_last_bar=True, checkpoint=None):
+        '''
+        Runs the symbol groups across the process pool.
+        :param replay_last_bar: Handle the MarketEvent of the exhausted data handler.
+        :param checkpoint: Optional path of the checkpoint of the ParallelBacktest, the worker of the k-th group
+        continues from and saves to the path with the suffix .k.
+        :return: All fills, signals and orders sorted in the order of the serial event loop.
+        '''
+        symbols = list(self.symbol_dict.keys())
+        symbol_positions = dict((s, k) for k, s in enumerate(symbols))
+        max_workers = min(self.max_workers or os.cpu_count() or 1, max(len(symbols), 1))
+        size = -(-len(symbols) // max_workers)
+        groups = [symbols[k:k + size] for k in range(0, len(symbols), size)]
+
+        data_handler = self._worker_data_handler()
+        args = [(self.csv_dir, dict((s, self.symbol_dict[s]) for s in group), symbol_positions,
+                 self.initial_capital, self.start_date, data_handler, self.execution_handler_cls,
+                 self.portfolio_cls, self.strategy_cls, self.strategy_params, replay_last_bar,
+                 None if checkpoint is None else f'{checkpoint}.{k}', self.data_handler.bar_index)
+                for k, group in enumerate(groups)]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_simulate_symbols, args))
+
+        # The counts of the workers are totals, they are restored from their checkpoints
+        fills, signals, orders = [], [], []
+        self.signals = self.orders = self.fills = 0
+        for group_fills, group_signals, group_orders, n_signals, n_orders, n_fills in results:
+            fills.extend(group_fills)
+            signals.extend(group_signals)
+            orders.extend(group_orders)
+            self.signals += n_signals
+            self.orders += n_orders
+            self.fills += n_fills
+        fills.sort(key=lambda fill: fill[:5])
+        signals.sort(key=lambda signal: signal[:3])
+        orders.sort(key=lambda order: order[:3])
+        return fills, signals, orders
+
+    def _run_backtest(self, replay_last_bar=True, checkpoint=None):
+        '''
+        Simulates the symbol groups in parallel, then moves the data handler through the bars of the whole
+        universe and hands the Portfolio the market events and fills in the order of a serial run. The
+        signals and orders of the handled bars are kept in new_signals and new_orders.
+        :param replay_last_bar: Handle the MarketEvent of the exhausted data handler.
+        :param checkpoint: Optional path of the checkpoint of the ParallelBacktest, see _simulate.
+        '''
+        fills, signals, orders = self._simulate(replay_last_bar, checkpoint)
+
+        # The bars up to the cursor of the data handler were handled before a checkpoint
+        step = self.data_handler.bar_index
+        k = bisect_right([fill[0] for fill in fills], step)
+        self.new_signals = [signal[3:] for signal in signals if signal[0] > step]
+        self.new_orders = [order[3:] for order in orders if order[0] > step]
+
+        dates = getattr(self.data_handler, 'dates', None)
+        progress = ProgressReporter(len(dates) if dates is not None else None, self.progress_interval,
+                                    first=self.bars)
+        portfolio = self.portfolio
+        try:
+            while self.data_handler.continue_backtest:
+                self.data_handler.update_bars()
+                if self.data_handler.continue_backtest:
+                    self.bars += 1
+                elif not replay_last_bar:
+                    break
+                self.events.clear()
+                step += 1
+                portfolio.update_timeindex(MARKET_EVENT)
+                while k < len(fills) and fills[k][0] == step:
+                    (symbol, timeindex, exchange, quantity, direction, price, fill_cost, commission,
+                     signal_type) = fills[k][5:]
+                    portfolio.update_fill(FillEvent(timeindex, symbol, exchange, quantity, direction, price,
+                                                    fill_cost, commission, signal_type))
+                    k += 1
+                progress.update(self.bars)
+        finally:
+            progress.report()
+
+    def run_incremental(self, path):
+        '''
+        Same as Backtest.run_incremental, the signals and orders of the new bars are collected by the workers.
+        The workers continue from their own checkpoints, the files path.0, path.1, ... next to path.
+        :param path: Path of the checkpoint file.
+        :return: The signals and orders of the new bars, see Backtest.run_incremental.
+        '''
+        if os.path.exists(path):
+            self.load_checkpoint(path)
+            self.data_handler.continue_backtest = True
+        self._run_backtest(replay_last_bar=False, checkpoint=path)
+        self.save_checkpoint(path)
+        return self.new_signals, self.new_orders
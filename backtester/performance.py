@@ -18,22 +18,203 @@ def create_sharpe_ratio(returns, periods=252):
 def create_drawdowns(pnl):
     '''
     Calculate the largest peak-to-through drawdown of the PnL curve as well as the duration of the drawdown.
-    Requires that the pnl_returns is a pandas Series.
+    Requires that the pnl_returns is a pandas Series. The first value is skipped, as it is the start row
+    of the equity curve.
     :param pnl: A pandas Series representing period percentage returns.
     :return: drawdown, duration - Highest peak-to-trough drawdown and duration.
     '''
 
-    # Calculate the cumulative returns curve and set up the High Water Mark
-    hwm = [0]
+    # High Water Mark starting at 0, NaN values of the curve keep the previous mark
+    values = pnl.values.astype(np.float64)
+    hwm = np.fmax.accumulate(np.concatenate(([0.0], values[1:])))
+    drawdown = hwm - values
+    drawdown[0] = np.nan
 
-    # Create the drawdown and duration series
-    idx = pnl.index
-    drawdown = pd.Series(index=idx)
-    duration = pd.Series(index=idx)
+    # The duration counts the bars since the last bar at the High Water Mark
+    t = np.arange(len(values))
+    at_hwm = np.where(drawdown == 0, t, -1)
+    last = np.maximum.accumulate(at_hwm) if len(values) else at_hwm
+    duration = np.where(last >= 0, t - last, np.nan)
+    duration[:1] = np.nan
 
-    # Loop over the index range
-    for t in range(1, len(idx)):
-        hwm.append(max(hwm[t-1], pnl[t]))
-        drawdown[t] = (hwm[t] - pnl[t])
-        duration[t] = (0 if drawdown[t] == 0 else duration[t-1]+1)
+    drawdown = pd.Series(drawdown, index=pnl.index)
+    duration = pd.Series(duration, index=pnl.index)
     return drawdown, drawdown.max(), duration.max()
+
+
+
+# Columns of create_batch_summary_stats
+BATCH_SUMMARY_STATS = ['Total Return', 'CAGR', 'Sharpe Ratio', 'Sortino Ratio', 'Max Drawdown', 'Drawdown',
+                       'Calmar Ratio', 'Hit Rate']
+
+
+def create_batch_summary_stats(equity, periods=252, block=256):
+    '''
+    Computes the summary statistics of many equity curves at once, i.e. of the runs of a parameter sweep over
+    the same bars, to rank them. The curves are handled in blocks of runs, thus the temporary arrays stay
+    small. The drawdowns are measured on the curves divided by their first row, as create_drawdowns on the
+    equity_curve column of a Portfolio.
+
+    Missing (NaN) totals are handled as by PerformanceTracker: the return of the next bar is measured against
+    the last known total and the missing bar counts as a bar below the High Water Mark.
+    :param equity: A [time, run] numpy array or DataFrame of the portfolio totals. The first row is the start
+    row, i.e. the initial capital, and must not be missing.
+    :param periods: Daily (252), Hourly (252 * 6.5), Minutely (252*6.5*60) etc.
+    :param block: Number of runs handled at once.
+    :return: DataFrame with one row per run, indexed by the columns of a DataFrame: Total Return, CAGR,
+    Sharpe Ratio, Sortino Ratio, Max Drawdown, Drawdown (the longest duration in bars), Calmar Ratio and
+    Hit Rate (the share of the bars with a positive return among those with any return).
+    '''
+    index = equity.columns if isinstance(equity, pd.DataFrame) else None
+    equity = np.asarray(equity, dtype=np.float64)
+    if equity.ndim == 1:
+        equity = equity[:, None]
+    n, runs = equity.shape
+
+    stats = np.full((runs, len(BATCH_SUMMARY_STATS)), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j in range(0, runs, block):
+            total = equity[:, j:j + block]
+            missing = np.isnan(total)
+            if missing.any():
+                # The last known total of every row, the first row is never missing
+                last = np.where(missing, 0, np.arange(n)[:, None])
+                np.maximum.accumulate(last, axis=0, out=last)
+                known = np.take_along_axis(total, last, axis=0)
+            else:
+                known = total
+            returns = np.divide(total[1:], known[:-1])
+            returns -= 1.0
+            m = len(returns)
+
+            # Sharpe and Sortino ratios from the sums of the (downside) squared returns of the known totals
+            valid = ~missing[1:]
+            count = valid.sum(axis=0)
+            returns[~valid] = 0.0
+            mean = returns.sum(axis=0) / count
+            std = np.sqrt(np.maximum(np.einsum('ij,ij->j', returns, returns) / count - mean ** 2, 0.0))
+            downside = np.minimum(returns, 0.0)
+            downside = np.sqrt(np.einsum('ij,ij->j', downside, downside) / count)
+            hit_rate = (returns > 0).sum(axis=0) / (returns != 0).sum(axis=0)
+
+            # High Water Mark starting at 0 of the curve divided by the start row, missing rows keep the mark
+            curve = np.divide(total[1:], total[0], out=returns)
+            drawdown = np.fmax.accumulate(curve, axis=0)
+            np.fmax(drawdown, 0.0, out=drawdown)
+            drawdown -= curve
+            max_dd = np.nanmax(drawdown, axis=0)
+            end = known[-1] / total[0]
+            total_return = end - 1.0
+            cagr = np.power(end, periods / m) - 1.0
+
+            # The longest duration is the largest gap between two bars at the High Water Mark of a run, or
+            # between the last one and the end
+            run, t = np.nonzero(drawdown.T == 0)
+            duration = np.zeros(total.shape[1])
+            if len(t):
+                same = run[1:] == run[:-1]
+                np.maximum.at(duration, run[1:][same], (t[1:] - t[:-1] - 1)[same])
+                last = np.append(~same, True)
+                np.maximum.at(duration, run[last], m - 1 - t[last])
+
+            stats[j:j + block] = np.column_stack((
+                total_return, cagr, np.sqrt(periods) * mean / std, np.sqrt(periods) * mean / downside, max_dd,
+                duration, cagr / max_dd, hit_rate
+            ))
+    return pd.DataFrame(stats, index=index, columns=BATCH_SUMMARY_STATS)
+
+
+class PerformanceTracker(object):
+    '''
+    PerformanceTracker keeps the summary statistics of an equity curve up to date while it is written, at a
+    constant cost per bar: the High Water Mark, the drawdown and its duration, the mean and variance of the
+    returns for the Sharpe ratio (Welford's algorithm) and the share of bars with open positions.
+
+    The values equal create_sharpe_ratio and create_drawdowns over the finished equity curve, thus the
+    statistics are available during the backtest and the final report needs no pass over the curve.
+    '''
+
+    def __init__(self, initial_total, periods=252):
+        '''
+        :param initial_total: Total of the start row of the equity curve.
+        :param periods: Daily (252), Hourly (252 * 6.5), Minutely (252*6.5*60) etc.
+        '''
+        self.periods = periods
+        self.last_total = initial_total
+        self.bars = 0
+        self.bars_in_market = 0
+
+        # Welford's running mean and sum of squared deviations of the returns
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        self.equity = 1.0
+        self.high_water_mark = 0.0
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.duration = 0
+        self.max_duration = 0
+
+    def update(self, total, in_market=False):
+        '''
+        Adds the next row of the equity curve. A missing (NaN) total counts as a bar in the drawdown, the
+        return of the next bar is measured against the last known total.
+        :param total: Total of the portfolio at the bar.
+        :param in_market: Whether any position is open at the bar.
+        '''
+        self.bars += 1
+        if in_market:
+            self.bars_in_market += 1
+
+        returns = total / self.last_total - 1.0
+        if total == total:
+            self.last_total = total
+        if returns == returns:
+            self.count += 1
+            delta = returns - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (returns - self.mean)
+            self.equity *= 1.0 + returns
+            equity = self.equity
+        else:
+            equity = np.nan
+
+        if equity > self.high_water_mark:
+            self.high_water_mark = equity
+        self.drawdown = self.high_water_mark - equity
+        if self.drawdown > self.max_drawdown:
+            self.max_drawdown = self.drawdown
+        self.duration = 0 if self.drawdown == 0 else self.duration + 1
+        if self.duration > self.max_duration:
+            self.max_duration = self.duration
+
+    @property
+    def total_return(self):
+        return self.equity - 1.0
+
+    @property
+    def sharpe_ratio(self):
+        '''
+        :return: Sharpe ratio of the returns so far, as create_sharpe_ratio.
+        '''
+        return np.sqrt(self.periods) * self.mean / np.sqrt(self.m2 / self.count) if self.count else np.nan
+
+    @property
+    def exposure(self):
+        '''
+        :return: Share of the bars with open positions.
+        '''
+        return self.bars_in_market / self.bars if self.bars else 0.0
+
+    def summary_stats(self):
+        '''
+        :return: a list of (name, value) pairs as Portfolio.summary_stats: total return, Sharpe ratio, max
+        drawdown and its duration.
+        '''
+        return [
+            ('Total Return', self.total_return),
+            ('Sharpe Ratio', self.sharpe_ratio),
+            ('Max Drawdown', self.max_drawdown),
+            ('Drawdown', self.max_duration)
+        ]
@@ -7,22 +7,61 @@ try:
 except ImportError:
     import queue
 
-import pandas as pd
+import numpy as np
 
-from backtester.event import OrderEvent
-from backtester.performance import create_sharpe_ratio, create_drawdowns
+from backtester.event import (OrderEvent, BUY, SELL, FILL, SIGNAL, EXIT, LONG, SHORT, LONG_STOP_EXIT,
+                              LONG_TAKE_PROFIT_EXIT, SHORT_STOP_EXIT, SHORT_TAKE_PROFIT_EXIT)
+from backtester.ledger import Ledger
+from backtester.orderbook import MKT, STP, LMT, CXL
+from backtester.performance import PerformanceTracker
 from backtester.TICKER_VALUE import s_tick_amount, s_tick_value
+from backtester.trades import TradeLedger
+
+# Signal type -> (sign of the position the signal acts on, direction of the order).
+# Entries act on a flat position with the constant order size, exits close the whole position.
+ORDER_RULES = {
+    LONG: (0, BUY),
+    SHORT: (0, SELL),
+    EXIT: (1, SELL),
+    LONG_STOP_EXIT: (1, SELL),
+    LONG_TAKE_PROFIT_EXIT: (1, SELL),
+    SHORT_STOP_EXIT: (-1, BUY),
+    SHORT_TAKE_PROFIT_EXIT: (-1, BUY),
+}
+
+# Signal type -> order type of the resting orders of SimulatedExecutionHandler: the entries are stops at the
+# breakout price, the stop exits stops and the take profit exits limits.
+RESTING_ORDER_TYPES = {
+    LONG: STP,
+    SHORT: STP,
+    EXIT: MKT,
+    LONG_STOP_EXIT: STP,
+    LONG_TAKE_PROFIT_EXIT: LMT,
+    SHORT_STOP_EXIT: STP,
+    SHORT_TAKE_PROFIT_EXIT: LMT,
+}
 
 class Portfolio(object):
     '''
     The Portfolio class handles the position and market value of all instruments at a resolution of a bar
     i.e. secondly, minutely, 5-min, 30-min, 60-min or EOD.
 
-    The positions DataFrame stores a time-index of the quantity of positions held.
+    The positions ledger stores a time-index of the quantity of positions held.
 
-    The holdings DataFrame stores the cash and total market holdings value of each symbol for particular
+    The holdings ledger stores the cash and total market holdings value of each symbol for particular
     time-index as well as the percentage change in portfolio total across bars.
+
+    Both are preallocated [bars, columns] arrays (backtester.ledger) written row by row.
+
+    Open positions are marked to market against the average entry price of their fills, closed quantities
+    book their profit or loss into cash.
+
+    The summary statistics are updated with every bar by a PerformanceTracker, the drawdown is recorded in
+    the holdings. The round trips are recorded by a TradeLedger.
+
+    order_types maps signal types to the order type of their orders, all orders are market orders by default.
     '''
+    order_types = {}
 
     def __init__(self, bars, events, start_date, initial_capital=100000.0):
         '''
@@ -40,32 +79,45 @@ class Portfolio(object):
         self.initial_capital = initial_capital
         self.slippage = 2
 
+        self.symbols = list(self.symbol_dict.keys())
+        # One row per bar plus the start row and the replay of the last bar
+        dates = getattr(self.bars, 'dates', None)
+        self.capacity = len(dates) + 2 if dates is not None else 1024
+
         self.all_positions = self.construct_all_positions()
         self.current_positions = dict( (k,v) for k,v in [(s,0) for s in self.symbol_dict.keys()] )
 
+        # Arrays in the order of the symbols for the valuation: the positions as in current_positions,
+        # the average entry price of the open positions and the USD value of one point of price
+        self.symbol_index = dict((s, k) for k, s in enumerate(self.symbols))
+        self.positions = np.zeros(len(self.symbols))
+        self.entry_price = np.zeros(len(self.symbols))
+        self.multiplier = np.array([s_tick_value[s] / s_tick_amount[s] for s in self.symbols])
+
         self.all_holdings = self.construct_all_holdings()
         self.current_holdings = self.construct_current_holdings()
+        self.performance = PerformanceTracker(self.initial_capital, getattr(self.bars, 'periods', 252))
+        self.trades = TradeLedger(self.symbols, s_tick_amount, s_tick_value)
 
     def construct_all_positions(self):
         '''
-        Construct the positions list using the start_date to determine when the time index will begin.
-        :return: Dictionary
+        Construct the positions ledger using the start_date to determine when the time index will begin.
+        :return: Ledger
         '''
-        d = dict( (k,v) for k,v in [(s,0) for s in self.symbol_dict.keys()] )
-        d['datetime'] = self.start_date
-        return [d]
+        ledger = Ledger(self.symbols, self.capacity)
+        ledger.append(self.start_date)
+        return ledger
 
     def construct_all_holdings(self):
         '''
-        Construct the holdings list using the start_date to determine when the time index will begin.
-        :return: Dictionary
+        Construct the holdings ledger using the start_date to determine when the time index will begin.
+        :return: Ledger
         '''
-        d = dict((k, v) for k, v in [(s, 0) for s in self.symbol_dict.keys()])
-        d['datetime'] = self.start_date
-        d['cash'] = self.initial_capital
-        d['commission'] = 0.0
-        d['total'] = self.initial_capital
-        return [d]
+        ledger = Ledger(self.symbols + ['cash', 'commission', 'total', 'drawdown'], self.capacity)
+        row = ledger.append(self.start_date)
+        ledger.values[row, ledger.column_index['cash']] = self.initial_capital
+        ledger.values[row, ledger.column_index['total']] = self.initial_capital
+        return ledger
 
     def construct_current_holdings(self):
         '''
@@ -84,45 +136,31 @@ class Portfolio(object):
         i.e. all current market data at this stage is known (OHLCV).
         :param event: Makes use of a MarketEvent from the events queue.
         '''
-        latest_datetime = self.bars.get_latest_bar_datetime(
-            list(self.symbol_dict.keys())[0]
-        )
+        latest_datetime = self.bars.get_latest_bar_datetime(self.symbols[0])
 
         # Update positions
         # ================
-        dp = dict((k, v) for k, v in [(s, 0) for s in self.symbol_dict.keys()] )
-        dp['datetime'] = latest_datetime
-
-        for s in self.symbol_dict.keys():
-            dp[s] = self.current_positions[s]
-
-        #Append the current positions
-        self.all_positions.append(dp)
+        positions = self.positions
+        row = self.all_positions.append(latest_datetime)
+        self.all_positions.values[row] = positions
 
         # Update holdings
         # ===============
-        dh = dict((k, v) for k, v in [(s, 0) for s in self.symbol_dict.keys()])
-        dh['datetime'] = latest_datetime
-        dh['cash'] = self.current_holdings['cash']
-        dh['commission'] = self.current_holdings['commission']
-        dh['total'] = self.current_holdings['cash']
-
-        self.fill_price = {}
-        for s in self.symbol_dict.keys():
-            # Approximation to the real value for each future symbol
-            if event.type == 'FILL':
-                self.fill_price[s] = event.price
-            try:
-                market_value = self.current_positions[s] * \
-                               (self.bars.get_latest_bar_value(s, 'Settle') - self.fill_price[s] ) / \
-                               s_tick_amount[s] * s_tick_value[s]
-                dh[s] = market_value
-                dh['total'] += market_value
-            except:
-                pass
-
-        # Append the current holdings
-        self.all_holdings.append(dh)
+        holdings = self.all_holdings
+        row = holdings.append(latest_datetime)
+        dh = holdings.values[row]
+        columns = holdings.column_index
+
+        # Mark the open positions to the latest Settle of all symbols at once, flat symbols are worth 0
+        settle = self.bars.get_latest_bar_vector('Settle')
+        market_value = np.where(positions != 0, positions * (settle - self.entry_price) * self.multiplier, 0.0)
+        dh[:len(positions)] = market_value
+        dh[columns['cash']] = self.current_holdings['cash']
+        dh[columns['commission']] = self.current_holdings['commission']
+        dh[columns['total']] = self.current_holdings['cash'] + market_value.sum()
+
+        self.performance.update(dh[columns['total']], positions.any())
+        dh[columns['drawdown']] = self.performance.drawdown
 
     def update_positions_from_fill(self, fill):
         '''
@@ -130,31 +168,46 @@ class Portfolio(object):
         :param fill: Takes the Fill object and updates the position matrix.
         '''
 
-        # Check whether the fill is a buy or sell
-        fill_dir = 0
-        if fill.direction == 'BUY':
-            fill_dir = 1
-        if fill.direction == 'SELL':
-            fill_dir = -1
-
+        # The direction code of the fill is the sign of the position change (BUY 1, SELL -1)
         # Update positions list with new quantities
-        self.current_positions[fill.symbol] += fill_dir*fill.quantity
+        self.current_positions[fill.symbol] += fill.direction*fill.quantity
+        self.positions[self.symbol_index[fill.symbol]] = self.current_positions[fill.symbol]
 
     def update_holdings_from_fill(self, fill):
         '''
         This method determines whether a FillEvent is a Buy or Sell and then updates the current_holdings dictionary.
         Essentially adding up fill cost associated with trading in general. (SLIPPAGE,COMMISSION)
+        The quantity the fill closes books its profit or loss against the entry price into cash and is recorded
+        as a trade, the quantity it opens moves the entry price. Expects the positions to be updated by the
+        fill already.
         :param fill: Takes the Fill object and updates the holdings matrix to reflect the holding value.
         '''
 
-        # Check whether the fill is a buy or sell
+        # Realised profit or loss and the new average entry price
+        k = self.symbol_index[fill.symbol]
+        quantity = fill.direction * fill.quantity
+        position = self.positions[k]
+        previous = position - quantity
+        realised = 0.0
+        dt = self.bars.get_latest_bar_datetime(fill.symbol)
+        if previous * quantity < 0:
+            closed = min(abs(previous), abs(quantity))
+            realised = np.sign(previous) * closed * (fill.price - self.entry_price[k]) * self.multiplier[k]
+            self.trades.close(k, np.sign(previous), closed, self.entry_price[k], fill.price, dt,
+                              self.performance.bars, fill.signal_type)
+        if position == 0:
+            self.entry_price[k] = 0.0
+        elif previous * position <= 0:
+            # Opened from flat or reversed
+            self.entry_price[k] = fill.price
+            self.trades.open(k, dt, self.performance.bars, fill.signal_type)
+        elif abs(position) > abs(previous):
+            self.entry_price[k] = (self.entry_price[k] * abs(previous) + fill.price * abs(quantity)) / abs(position)
+        self.current_holdings['cash'] += realised
+
+        # The direction code of the fill is the sign (BUY 1, SELL -1)
         # And calculate fill cost with 2 tick slippage
-        fill_dir = 0
-        if fill.direction == 'BUY':
-            fill_dir = 1
-        if fill.direction == 'SELL':
-            fill_dir = -1
-
+        fill_dir = fill.direction
 
         # Update holdings list with new quantities
         cost = fill_dir * (self.bars.get_latest_bar_value(fill.symbol, 'Settle') - fill.price) / \
@@ -170,7 +223,7 @@ class Portfolio(object):
         upon receipt of a fill event.
         :param event: Takes FillEvent
         '''
-        if event.type == 'FILL':
+        if event.type == FILL:
             self.update_positions_from_fill(event)
             self.update_holdings_from_fill(event)
 
@@ -181,70 +234,83 @@ class Portfolio(object):
         :param signal: The tuple containing signal information.
         :return: Order
         '''
-        order = None
-
         symbol = signal.symbol
-        signal_type = signal.signal_type
         price = signal.price
         strength = signal.strength
 
         mkt_quantity = 1
         cur_quantity = self.current_positions[symbol]
-        order_type = 'MKT'
-
-        if signal_type == 'LONG' and cur_quantity == 0:
-            order = OrderEvent(symbol,order_type,price,mkt_quantity,'BUY')
-        if signal_type == 'SHORT' and cur_quantity == 0:
-            order = OrderEvent(symbol,order_type,price,mkt_quantity,'SELL')
-
-        if signal_type == 'LONG STOP EXIT' and cur_quantity > 0:
-            order = OrderEvent(symbol,order_type,price, abs(cur_quantity), 'SELL')
-        if signal_type == 'LONG TAKE PROFIT EXIT' and cur_quantity > 0:
-            order = OrderEvent(symbol,order_type,price, abs(cur_quantity), 'SELL')
-
-        if signal_type == 'SHORT STOP EXIT' and cur_quantity < 0:
-            order = OrderEvent(symbol,order_type,price, abs(cur_quantity), 'BUY')
-        if signal_type == 'SHORT TAKE PROFIT EXIT' and cur_quantity < 0:
-            order = OrderEvent(symbol,order_type,price, abs(cur_quantity), 'BUY')
-
-        return order
+        order_type = self.order_types.get(signal.signal_type, MKT)
+
+        rule = ORDER_RULES.get(signal.signal_type)
+        if rule is None:
+            return None
+        position_sign, direction = rule
+        if position_sign == 0:
+            if cur_quantity == 0:
+                return OrderEvent.acquire(symbol, order_type, price, mkt_quantity, direction, signal.signal_type)
+        elif cur_quantity * position_sign > 0:
+            return OrderEvent.acquire(symbol, order_type, price, abs(cur_quantity), direction, signal.signal_type)
+        return None
 
     def update_signal(self, event):
         '''
         This method simply calls the above method and adds the generated order to events queue.
         Acts on SignalEvent to generate new orders based on the portfolio logic.
         '''
-        if event.type == 'SIGNAL':
+        if event.type == SIGNAL:
             order_event = self.generate_naive_order(event)
             self.events.put(order_event)
 
     def create_equity_curve_dataframe(self):
         '''
-        :return: a pandas DataFrame from the all_holdings list of dictionaries.
+        :return: a pandas DataFrame over the rows of the all_holdings ledger.
         '''
-        curve = pd.DataFrame(self.all_holdings)
-        curve.set_index('datetime', inplace=True)
+        curve = self.all_holdings.frame()
         curve['returns'] = curve['total'].pct_change()
         curve['equity_curve'] = (1.0+curve['returns']).cumprod()
         self.equity_curve = curve
 
-    def output_summary_stats(self):
+    def summary_stats(self):
         '''
-        :return: a list of summary statistics for the Portfolio.
+        The summary statistics of the equity curve as numbers, as kept up to date by the PerformanceTracker.
+        :return: a list of (name, value) pairs: total return, Sharpe ratio, max drawdown and its duration.
         '''
-        total_return = self.equity_curve['equity_curve'][-1]
-        returns = self.equity_curve['returns']
-        pnl = self.equity_curve['equity_curve']
+        return self.performance.summary_stats()
 
-        sharpe_ratio = create_sharpe_ratio(returns, periods=252)
-        drawdown, max_dd, dd_duration = create_drawdowns(pnl)
-        self.equity_curve['drawdown'] = drawdown
+    def output_summary_stats(self, equity_path='backtester\\equity.csv'):
+        '''
+        :param equity_path: The equity curve is written to this CSV file, None to skip it.
+        :return: a list of summary statistics for the Portfolio.
+        '''
+        (_, total_return), (_, sharpe_ratio), (_, max_dd), (_, dd_duration) = self.summary_stats()
 
         stats = [
-            ('Total Return', f'{round((total_return - 1.0) * 100.0,2)}%'),
+            ('Total Return', f'{round(total_return * 100.0,2)}%'),
             ('Sharpe Ratio', f'{round(sharpe_ratio,2)}'),
             ('Max Drawdown', f'{round(max_dd * 100.0,2)}%'),
             ('Drawdown', f'{dd_duration}')
         ]
-        self.equity_curve.to_csv('backtester\\equity.csv')
+        if equity_path is not None:
+            self.equity_curve.to_csv(equity_path)
         return stats
+
+
+class RestingOrderPortfolio(Portfolio):
+    '''
+    Portfolio with the stop and limit orders of RESTING_ORDER_TYPES, thus an entry that the bar of its signal
+    does not trigger rests in the order book of SimulatedExecutionHandler instead of being dropped. An exit
+    signal while the entry still rests, i.e. the position is flat, cancels it.
+    '''
+    order_types = RESTING_ORDER_TYPES
+
+    def generate_naive_order(self, signal):
+        '''
+        :param signal: The tuple containing signal information.
+        :return: Order, or a cancel order for an exit signal without a position.
+        '''
+        order = super().generate_naive_order(signal)
+        rule = ORDER_RULES.get(signal.signal_type)
+        if order is None and rule is not None and rule[0] != 0 and self.current_positions[signal.symbol] == 0:
+            return OrderEvent.acquire(signal.symbol, CXL, signal.price, 0, rule[1], signal.signal_type)
+        return order
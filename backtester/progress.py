@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import csv
+import logging
+import sys
+import time
+
+from backtester.event import SIGNAL_TYPE_NAMES
+
+
+logger = logging.getLogger('backtester')
+
+
+def setup_logging(level=logging.INFO, stream=None):
+    '''
+    Attaches a stream handler to the 'backtester' logger. Nothing of the backtester is written anywhere
+    unless this (or any other logging configuration) is called.
+    :param level: Logging level, i.e. logging.INFO for progress or logging.DEBUG for every signal.
+    :param stream: Stream to write to, stderr by default.
+    '''
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+
+class ProgressReporter(object):
+    '''
+    Rate limited progress of the event loop. update() is called on every bar but only reads the clock,
+    at most every interval seconds one line with bars/sec and ETA is logged on INFO level.
+    '''
+
+    def __init__(self, total=None, interval=5.0, log=None, first=0):
+        '''
+        :param total: Total number of bars if known, needed for the ETA.
+        :param interval: Seconds between two progress lines.
+        :param log: Logger to write to, 'backtester.progress' by default.
+        :param first: Number of bars processed before, i.e. when resumed from a checkpoint.
+        '''
+        self.total = total
+        self.interval = interval
+        self.log = log or logging.getLogger('backtester.progress')
+        self.start = time.monotonic()
+        self._next = self.start + interval
+        self.first = first
+        self.bars = first
+
+    def update(self, bars):
+        '''
+        :param bars: Number of bars processed so far.
+        '''
+        self.bars = bars
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self.interval
+            self.report(now)
+
+    def report(self, now=None):
+        '''
+        Logs the current progress.
+        '''
+        if now is None:
+            now = time.monotonic()
+        elapsed = now - self.start
+        rate = (self.bars - self.first) / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            eta = (self.total - self.bars) / rate if rate > 0 else float('nan')
+            self.log.info('bar %d/%d (%.1f%%), %.0f bars/s, ETA %.0fs',
+                          self.bars, self.total, 100.0 * self.bars / self.total, rate, eta)
+        else:
+            self.log.info('bar %d, %.0f bars/s', self.bars, rate)
+
+
+class SignalLog(object):
+    '''
+    Buffered, structured (CSV) log of all signals of a backtest. Rows are kept in memory and written
+    buffer_size at a time, thus the event loop does not do I/O per signal.
+    '''
+
+    columns = ['datetime', 'strategy_id', 'symbol', 'signal_type', 'price', 'strength']
+
+    def __init__(self, path, buffer_size=1000):
+        '''
+        :param path: Path of the CSV file, overwritten.
+        :param buffer_size: Number of signals kept before they are written.
+        '''
+        self.path = path
+        self.buffer_size = buffer_size
+        self._rows = []
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def append(self, bar_datetime, signal):
+        '''
+        :param bar_datetime: Datetime of the bar the signal was generated on.
+        :param signal: SignalEvent
+        '''
+        self._rows.append((bar_datetime, signal.strategy_id, signal.symbol,
+                           SIGNAL_TYPE_NAMES[signal.signal_type], signal.price, signal.strength))
+        if len(self._rows) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self._writer.writerows(self._rows)
+        self._rows = []
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
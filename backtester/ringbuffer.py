@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import numpy as np
+
+
+class BarRingBuffer(object):
+    '''
+    BarRingBuffer is a fixed-size circular buffer holding the latest bars of all symbols, so the bar history
+    of a data handler uses constant memory no matter how long a backtest or a live process runs.
+
+    The values are kept in a float64 array of shape (symbols, fields, 2 * capacity). Every bar is written
+    twice, at position p and p + capacity, thus the latest N <= capacity bars of any symbol and field are
+    always a contiguous slice and can be handed out as a read-only view without copying.
+    '''
+
+    def __init__(self, capacity, shape):
+        '''
+        Allocates the buffer.
+        :param capacity: Maximum number of bars kept (the max lookback).
+        :param shape: Shape of one bar, i.e. (number of symbols, number of fields).
+        '''
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+
+        self.capacity = int(capacity)
+        self.shape = tuple(shape)
+        self.values = np.full(self.shape + (2 * self.capacity,), np.nan, dtype=np.float64)
+        self.datetimes = np.empty(2 * self.capacity, dtype=object)
+        self.count = 0
+        self.end = self.capacity
+        self._pos = 0
+
+        # Read-only alias handed out by window()
+        self._view = self.values.view()
+        self._view.setflags(write=False)
+
+    def __len__(self):
+        return self.count
+
+    def __getstate__(self):
+        # The read-only alias is rebuilt on unpickling, else it would be pickled as a separate copy
+        state = self.__dict__.copy()
+        del state['_view']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._view = self.values.view()
+        self._view.setflags(write=False)
+
+    def append(self, dt, bar):
+        '''
+        Writes one bar, overwriting the oldest one once the buffer is full.
+        :param dt: The datetime of the bar.
+        :param bar: Array like of shape self.shape with the bar values.
+        '''
+        p = self._pos
+        c = self.capacity
+        self.values[..., p] = bar
+        self.values[..., p + c] = bar
+        self.datetimes[p] = dt
+        self.datetimes[p + c] = dt
+
+        self._pos = p + 1 if p + 1 < c else 0
+        self.end = self._pos + c
+        if self.count < c:
+            self.count += 1
+
+    def last(self, index):
+        '''
+        :param index: Tuple indexing one bar, i.e. (symbol position, field position).
+        :return: The latest value at index.
+        '''
+        return self.values[index + (self.end - 1,)]
+
+    def last_datetime(self):
+        '''
+        :return: The datetime of the latest bar.
+        '''
+        return self.datetimes[self.end - 1]
+
+    def window(self, index, N=1):
+        '''
+        :param index: Tuple indexing one bar, i.e. (symbol position, field position).
+        :param N: takes N latest bars, at most capacity.
+        :return: A read-only view over the latest N values, or N-k if less available. The view is only
+        valid until the buffer wrapped around it, i.e. it should be consumed before the next append.
+        '''
+        if N > self.capacity:
+            raise ValueError(f'Window of {N} bars exceeds the capacity of {self.capacity} bars, raise the '
+                             f'max lookback of the data handler')
+        N = min(N, self.count)
+        return self._view[index + (slice(self.end - N, self.end),)]
+
+    def window_datetimes(self, N=1):
+        '''
+        :param N: takes N latest bars, at most capacity.
+        :return: The datetimes of the latest N bars, or N-k if less available.
+        '''
+        if N > self.capacity:
+            raise ValueError(f'Window of {N} bars exceeds the capacity of {self.capacity} bars, raise the '
+                             f'max lookback of the data handler')
+        N = min(N, self.count)
+        return self.datetimes[self.end - N:self.end]
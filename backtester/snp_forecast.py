@@ -8,7 +8,7 @@ import pandas as pd
 from sklearn.discriminant_analysis import QuadraticDiscriminantAnalysis as QDA
 
 from backtester.strategy import Strategy
-from backtester.event import SignalEvent
+from backtester.event import SignalEvent, MARKET, LONG, EXIT
 from backtester.backtest import Backtest
 from backtester.data import HistoricCSVDataHandler
 from backtester.execution import SimulatedExecutionHandler
@@ -72,7 +72,7 @@ class SPYDailyForecastStrategy():
         sym = list(self.symbol_dict.keys())[0]
         dt = self.datetime_now
 
-        if event.type == 'MARKET':
+        if event.type == MARKET:
             self.bar_index += 1
             if self.bar_index > 5:
                 lags = self.bars.get_latest_bars_values(
@@ -87,12 +87,12 @@ class SPYDailyForecastStrategy():
                 pred = self.model.predict(pred_series)
                 if pred > 0 and not self.long_market:
                     self.long_market = True
-                    signal = SignalEvent(1, sym, dt, 'LONG', 1.0)
+                    signal = SignalEvent(1, sym, dt, LONG, 1.0)
                     self.events.put(signal)
 
                 if pred < 0 and self.long_market:
                     self.long_market = False
-                    signal = SignalEvent(1, sym, dt, 'EXIT', 1.0)
+                    signal = SignalEvent(1, sym, dt, EXIT, 1.0)
                     self.events.put(signal)
 
 
@@ -24,6 +24,16 @@ class Strategy(object):
 
     __metaclass__ = ABCMeta
 
+    @staticmethod
+    def lookback(**params):
+        '''
+        Largest window the strategy asks from the data handler, known before the strategy is created, thus
+        the Backtest sizes the bar history of the data handler once.
+        :param params: The keyword arguments of the strategy.
+        :return: Number of bars or None if unknown.
+        '''
+        return None
+
     @abstractmethod
     def calculate_signals(self, event):
         '''
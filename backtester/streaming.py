@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from backtester.cache import source_key, write_npz
+
+
+def _to_int64_dates(df, datetime_cols):
+    '''
+    :param df: DataFrame chunk with the datetime columns.
+    :param datetime_cols: One column holding the timestamp or several, i.e. ('Date', 'Time'), joined by a blank.
+    :return: Nanoseconds since epoch as int64 numpy array.
+    '''
+    stamps = df[datetime_cols[0]].astype(str)
+    for c in datetime_cols[1:]:
+        stamps = stamps + ' ' + df[c].astype(str)
+    return pd.to_datetime(stamps).values.astype('datetime64[ns]').astype(np.int64)
+
+
+def csv_chunks(path, fields, chunksize=10000, datetime_cols=('Date',)):
+    '''
+    Reads a Quandl style CSV file in chunks, forward filling missing values across chunk borders.
+    The file has to be sorted by date in ascending order.
+    :param path: Path of the CSV file.
+    :param fields: Columns to read.
+    :param chunksize: Number of rows per chunk.
+    :param datetime_cols: Column(s) holding the timestamp of a bar, i.e. ('Date', 'Time') for intraday files.
+    :return: Generator of (int64 dates, float64 values of shape (fields, rows))
+    '''
+    datetime_cols = list(datetime_cols)
+    carry = None
+    reader = pd.read_csv(path, usecols=datetime_cols + list(fields), chunksize=chunksize)
+    for df in reader:
+        if df.empty:
+            continue
+        values = df[list(fields)].values.astype(np.float64)
+        if carry is not None:
+            values = np.vstack([carry, values])
+        values = pd.DataFrame(values).ffill().values
+        if carry is not None:
+            values = values[1:]
+        carry = values[-1:]
+        yield _to_int64_dates(df, datetime_cols), np.ascontiguousarray(values.T)
+
+
+def binary_paths(prefix):
+    '''
+    :param prefix: Path prefix of a binary bar file set.
+    :return: Paths of the values file, the dates file and the meta file.
+    '''
+    return f'{prefix}.values.bin', f'{prefix}.dates.bin', f'{prefix}.meta.npz'
+
+
+def convert_csv_to_binary(path, prefix, fields, chunksize=100000, datetime_cols=('Date',)):
+    '''
+    Converts a (large) CSV file chunk by chunk into raw binary files: float64 values of shape
+    [rows, fields] and int64 dates. Memory use is bounded by the chunk size. The meta file keeps the
+    fields and the key (mtime and size) of the CSV to detect stale conversions.
+    :param path: Path of the CSV file.
+    :param prefix: Path prefix of the binary files.
+    :param fields: Columns to convert.
+    :param chunksize: Number of rows per chunk.
+    :param datetime_cols: Column(s) holding the timestamp of a bar.
+    '''
+    values_path, dates_path, meta_path = binary_paths(prefix)
+    os.makedirs(os.path.dirname(values_path) or '.', exist_ok=True)
+    tmp_values, tmp_dates = f'{values_path}.{os.getpid()}.tmp', f'{dates_path}.{os.getpid()}.tmp'
+    with open(tmp_values, 'wb') as fv, open(tmp_dates, 'wb') as fd:
+        for dates, values in csv_chunks(path, fields, chunksize, datetime_cols):
+            np.ascontiguousarray(values.T, dtype='<f8').tofile(fv)
+            dates.astype('<i8').tofile(fd)
+    os.replace(tmp_values, values_path)
+    os.replace(tmp_dates, dates_path)
+    write_npz(meta_path, key=source_key(path), fields=np.array(fields, dtype=str))
+
+
+def binary_is_current(path, prefix, fields):
+    '''
+    :return: True if the binary files of prefix exist, hold fields and were converted from the current path.
+    '''
+    values_path, dates_path, meta_path = binary_paths(prefix)
+    if not (os.path.exists(values_path) and os.path.exists(dates_path) and os.path.exists(meta_path)):
+        return False
+    with np.load(meta_path, allow_pickle=False) as meta:
+        return list(meta['fields']) == list(fields) and np.array_equal(meta['key'], source_key(path))
+
+
+def binary_chunks(prefix, n_fields, chunksize=100000):
+    '''
+    Streams binary bar files in chunks. The files are memory mapped and every chunk is copied out,
+    thus only the current chunks are resident no matter how many bars the files hold.
+    :param prefix: Path prefix of the binary files.
+    :param n_fields: Number of fields per bar.
+    :param chunksize: Number of rows per chunk.
+    :return: Generator of (int64 dates, float64 values of shape (fields, rows))
+    '''
+    values_path, dates_path, _ = binary_paths(prefix)
+    dates = np.memmap(dates_path, dtype='<i8', mode='r')
+    if not len(dates):
+        return
+    values = np.memmap(values_path, dtype='<f8', mode='r', shape=(len(dates), n_fields))
+    for start in range(0, len(dates), chunksize):
+        yield (np.array(dates[start:start + chunksize], dtype=np.int64),
+               np.ascontiguousarray(values[start:start + chunksize].T, dtype=np.float64))
+
+
+class SymbolStream(object):
+    '''
+    SymbolStream walks through the chunks of one symbol. A background thread prefetches the next chunks
+    into a bounded queue while the backtest works on the current one, thus only a few chunks per symbol
+    are held in memory at any time.
+    '''
+
+    def __init__(self, chunks, n_fields, prefetch=2):
+        '''
+        Starts the prefetch thread and waits for the first chunk.
+        :param chunks: Iterable of (int64 dates, float64 values of shape (fields, rows)).
+        :param n_fields: Number of fields per bar.
+        :param prefetch: Number of chunks read ahead.
+        '''
+        self.last = np.full(n_fields, np.nan)
+        self.exhausted = False
+        self._dates = np.empty(0, dtype=np.int64)
+        self._values = None
+        self._pos = 0
+
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, args=(chunks,))
+        self._thread.daemon = True
+        self._thread.start()
+        self._load_next()
+
+    def _produce(self, chunks):
+        '''
+        Runs in the prefetch thread. Errors are handed over to the consumer.
+        '''
+        try:
+            for chunk in chunks:
+                if self._stop.is_set():
+                    return
+                self._queue.put(chunk)
+        except Exception as e:
+            self._queue.put(e)
+        else:
+            self._queue.put(None)
+
+    def _load_next(self):
+        '''
+        Swaps in the next non-empty chunk from the prefetch queue.
+        '''
+        while True:
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                self.exhausted = True
+                return
+            if len(item[0]):
+                self._dates, self._values = item
+                self._pos = 0
+                return
+
+    def next_date(self):
+        '''
+        :return: The int64 date of the next bar or None if the stream is exhausted.
+        '''
+        if self.exhausted:
+            return None
+        return self._dates[self._pos]
+
+    def advance(self, date):
+        '''
+        Consumes the next bar if it belongs to date, else the last bar is kept (pad forward).
+        :param date: The int64 date of the current calendar bar.
+        :return: The values of the symbol at date, NaN before its first bar.
+        '''
+        if not self.exhausted and self._dates[self._pos] == date:
+            self.last = self._values[:, self._pos]
+            self._pos += 1
+            if self._pos == len(self._dates):
+                self._load_next()
+        return self.last
+
+    def skip_to(self, date):
+        '''
+        Consumes all bars at or before date without handing them out, i.e. to continue behind a checkpoint.
+        Whole chunks are skipped by their last date.
+        :param date: The int64 date of the last bar that was already handled.
+        '''
+        while not self.exhausted and self._dates[-1] <= date:
+            self.last = self._values[:, -1]
+            self._load_next()
+        if not self.exhausted:
+            pos = int(np.searchsorted(self._dates, date, side='right'))
+            if pos > self._pos:
+                self.last = self._values[:, pos - 1]
+                self._pos = pos
+
+    def close(self):
+        '''
+        Stops the prefetch thread.
+        '''
+        self._stop.set()
+        while self._thread.is_alive():
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                self._thread.join(0.01)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import itertools
+import os
+
+import pandas as pd
+
+from backtester.backtest import Backtest
+from backtester.data import MMapPanelDataHandler
+from backtester.execution import SimulatedExecutionHandler
+from backtester.panel import open_panel
+from backtester.portfolio import Portfolio
+
+
+def parameter_grid(grid):
+    '''
+    Expands a grid into all its configurations, e.g.
+    parameter_grid({'sma_window': [10, 18], 'cross_bar': [5]})
+    gives [{'sma_window': 10, 'cross_bar': 5}, {'sma_window': 18, 'cross_bar': 5}]
+    :param grid: Dictionary of parameter name -> list of values.
+    :return: List of dictionaries, one per configuration.
+    '''
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def run_configuration(csv_dir, symbol_dict, strategy, strategy_params, data_handler=MMapPanelDataHandler,
+                      initial_capital=100000.0, start_date=datetime.datetime(1990, 1, 1)):
+    '''
+    Runs one Backtest without any output, i.e. the equity curve is not written to disk.
+    :param csv_dir: The hard root to the CSV data directory.
+    :param symbol_dict: Dictionary of symbol strings.
+    :param strategy: (Class) The strategy.
+    :param strategy_params: Dict of keyword arguments of the strategy.
+    :param data_handler: (Class) Handles the market data feed.
+    :param initial_capital: The starting capital for the portfolio.
+    :param start_date: The start datetime of the strategy.
+    :return: Dictionary of the parameters, the summary statistics of the Portfolio and the event counts.
+    '''
+    backtest = Backtest(
+        csv_dir, symbol_dict, initial_capital, 0.0, start_date,
+        data_handler, SimulatedExecutionHandler, Portfolio, strategy,
+        strategy_params=strategy_params
+    )
+    backtest._run_backtest()
+    result = dict(strategy_params)
+    result.update(backtest.portfolio.summary_stats())
+    result.update(Signals=backtest.signals, Orders=backtest.orders, Fills=backtest.fills)
+    return result
+
+
+def _run_configuration(args):
+    return run_configuration(*args)
+
+
+def sweep(csv_dir, symbol_dict, strategy, grid, data_handler=MMapPanelDataHandler, max_workers=None,
+          initial_capital=100000.0, start_date=datetime.datetime(1990, 1, 1)):
+    '''
+    Runs one Backtest per configuration of the grid across a process pool.
+
+    With the MMapPanelDataHandler the panel is (re)built once up front, thus every worker only maps the
+    same read-only file and the market data is shared through the page cache instead of being parsed
+    per process.
+    :param csv_dir: The hard root to the CSV data directory.
+    :param symbol_dict: Dictionary of symbol strings.
+    :param strategy: (Class) The strategy, i.e. COTAndPriceTriggerSrategy or MovingAvarageCrossStrategy.
+    :param grid: Dictionary of parameter name -> list of values, or a list of parameter dictionaries.
+    :param data_handler: (Class) Handles the market data feed.
+    :param max_workers: Number of processes, the number of CPUs by default.
+    :param initial_capital: The starting capital for the portfolio.
+    :param start_date: The start datetime of the strategy.
+    :return: DataFrame with one row per configuration: its parameters, the summary statistics of the
+    Portfolio as numbers and the signal/order/fill counts.
+    '''
+    configurations = parameter_grid(grid) if isinstance(grid, dict) else list(grid)
+    if issubclass(data_handler, MMapPanelDataHandler):
+        open_panel(csv_dir, list(symbol_dict.keys()), fields=data_handler.fields)
+
+    args = [(csv_dir, symbol_dict, strategy, params, data_handler, initial_capital, start_date)
+            for params in configurations]
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(args), 1))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_run_configuration, args))
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+    csv_dir = 'data\\'
+    symbol_dict = {'ES': 'ES'}
+    grid = {
+        'sma_window': [10, 18, 30],
+        'bars_momentum': [2, 3],
+        'cross_bar': [5, 8],
+    }
+    results = sweep(csv_dir, symbol_dict, COTAndPriceTriggerSrategy, grid)
+    print(results.sort_values('Sharpe Ratio', ascending=False).to_string())
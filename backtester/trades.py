@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+
+from backtester.event import SIGNAL_TYPE_NAMES
+
+
+# One round trip: the symbol position, the direction of the position (1 long, -1 short), the closed quantity,
+# the bar number and datetime of the entry and the exit, the average entry price and the exit price, the
+# profit per contract in ticks, the profit in USD and the signal type codes of the entry and the exit fill
+TRADE_DTYPE = np.dtype([
+    ('symbol', np.int32),
+    ('direction', np.int8),
+    ('quantity', np.float64),
+    ('entry_bar', np.int64),
+    ('exit_bar', np.int64),
+    ('entry_datetime', 'datetime64[ns]'),
+    ('exit_datetime', 'datetime64[ns]'),
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),
+    ('ticks', np.float64),
+    ('pnl', np.float64),
+    ('entry_type', np.int8),
+    ('exit_type', np.int8),
+])
+
+# Signal type code of fills without a signal, i.e. from a live broker
+UNKNOWN = -1
+
+
+class TradeLedger(object):
+    '''
+    TradeLedger records the round trips of a Portfolio as its fills arrive. A fill that reduces a position
+    closes a trade for its quantity against the average entry price, a fill that opens a position from flat
+    or reverses it starts the next one.
+
+    The trades are rows of one preallocated structured array, which doubles its capacity once it is
+    exhausted, thus recording a trade allocates nothing and the statistics per symbol or per exit type are
+    computed over the trades only.
+    '''
+
+    def __init__(self, symbols, tick_amount, tick_value, capacity=256):
+        '''
+        :param symbols: The symbols in the order of the positions of the Portfolio.
+        :param tick_amount: Price increment of one tick per symbol, i.e. s_tick_amount.
+        :param tick_value: USD value of one tick per symbol, i.e. s_tick_value.
+        :param capacity: Number of trades allocated up front.
+        '''
+        self.symbols = list(symbols)
+        self.tick_amount = np.array([tick_amount[s] for s in self.symbols], dtype=np.float64)
+        self.tick_value = np.array([tick_value[s] for s in self.symbols], dtype=np.float64)
+        self.trades = np.zeros(max(int(capacity), 1), dtype=TRADE_DTYPE)
+        self.rows = 0
+
+        # The entry of the open trade of every symbol
+        self.entry_bar = np.zeros(len(self.symbols), dtype=np.int64)
+        self.entry_datetime = np.zeros(len(self.symbols), dtype='datetime64[ns]')
+        self.entry_type = np.full(len(self.symbols), UNKNOWN, dtype=np.int8)
+
+    def __len__(self):
+        return self.rows
+
+    def __getstate__(self):
+        # Only the recorded trades are pickled, i.e. into a checkpoint
+        state = self.__dict__.copy()
+        state['trades'] = self.trades[:max(self.rows, 1)].copy()
+        return state
+
+    def open(self, k, dt, bar, signal_type=None):
+        '''
+        Starts the trade of a symbol.
+        :param k: Position of the symbol.
+        :param dt: Datetime of the bar of the entry fill.
+        :param bar: Number of the bar of the entry fill.
+        :param signal_type: Signal type code of the entry fill.
+        '''
+        self.entry_bar[k] = bar
+        self.entry_datetime[k] = np.datetime64(dt, 'ns')
+        self.entry_type[k] = UNKNOWN if signal_type is None else signal_type
+
+    def close(self, k, direction, quantity, entry_price, exit_price, dt, bar, signal_type=None):
+        '''
+        Records a round trip for the closed quantity of the open trade of a symbol.
+        :param k: Position of the symbol.
+        :param direction: 1 for a long, -1 for a short position.
+        :param quantity: The closed quantity.
+        :param entry_price: Average entry price of the position.
+        :param exit_price: Price of the exit fill.
+        :param dt: Datetime of the bar of the exit fill.
+        :param bar: Number of the bar of the exit fill.
+        :param signal_type: Signal type code of the exit fill, i.e. LONG_STOP_EXIT.
+        '''
+        row = self.rows
+        if row == len(self.trades):
+            trades = np.zeros(2 * row, dtype=TRADE_DTYPE)
+            trades[:row] = self.trades
+            self.trades = trades
+        ticks = direction * (exit_price - entry_price) / self.tick_amount[k]
+        self.trades[row] = (k, direction, quantity, self.entry_bar[k], bar, self.entry_datetime[k],
+                            np.datetime64(dt, 'ns'), entry_price, exit_price, ticks,
+                            ticks * self.tick_value[k] * quantity, self.entry_type[k],
+                            UNKNOWN if signal_type is None else signal_type)
+        self.rows = row + 1
+
+    def frame(self):
+        '''
+        :return: A DataFrame with one row per trade, with the symbol names, the signal type names and the
+        bars held.
+        '''
+        trades = self.trades[:self.rows]
+        names = np.array(SIGNAL_TYPE_NAMES + ('UNKNOWN',), dtype=object)
+        frame = pd.DataFrame(trades)
+        frame['symbol'] = np.array(self.symbols, dtype=object)[trades['symbol']]
+        frame['entry_type'] = names[trades['entry_type']]
+        frame['exit_type'] = names[trades['exit_type']]
+        frame['bars_held'] = trades['exit_bar'] - trades['entry_bar']
+        return frame
+
+    def stats(self, by='symbol'):
+        '''
+        Statistics of the trades per group, computed with one bincount per column.
+        :param by: 'symbol' or 'exit_type'.
+        :return: DataFrame with one row per group with trades: the number of trades, the share of winning
+        trades, the total and average profit in USD, the average profit per contract in ticks and the average
+        bars held.
+        '''
+        trades = self.trades[:self.rows]
+        if by == 'symbol':
+            group, labels = trades['symbol'], self.symbols
+        elif by == 'exit_type':
+            # UNKNOWN is the last group
+            group, labels = trades['exit_type'].astype(np.int64) % (len(SIGNAL_TYPE_NAMES) + 1), \
+                            list(SIGNAL_TYPE_NAMES) + ['UNKNOWN']
+        else:
+            raise ValueError(f'Unknown grouping {by}, use symbol or exit_type')
+
+        n = len(labels)
+        count = np.bincount(group, minlength=n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats = pd.DataFrame({
+                'Trades': count,
+                'Win Rate': np.bincount(group, weights=trades['pnl'] > 0, minlength=n) / count,
+                'Total PnL': np.bincount(group, weights=trades['pnl'], minlength=n),
+                'Average PnL': np.bincount(group, weights=trades['pnl'], minlength=n) / count,
+                'Average Ticks': np.bincount(group, weights=trades['ticks'], minlength=n) / count,
+                'Average Bars Held': np.bincount(group, weights=trades['exit_bar'] - trades['entry_bar'],
+                                                 minlength=n) / count,
+            }, index=pd.Index(labels, name=by))
+        return stats[count > 0]
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+import pprint
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtester.data import HistoricCSVDataHandler
+from backtester.event import (LONG, SHORT, EXIT, LONG_STOP_EXIT, LONG_TAKE_PROFIT_EXIT, SHORT_STOP_EXIT,
+                              SHORT_TAKE_PROFIT_EXIT, BUY)
+from backtester.eventqueue import EventDeque
+from backtester.performance import create_sharpe_ratio, create_drawdowns
+from backtester.portfolio import ORDER_RULES
+from backtester.TICKER_VALUE import s_tick_amount, s_tick_value
+
+DAY_NS = 86400 * 10**9
+
+
+class VectorizedBacktest(object):
+    '''
+    Runs the rules of COTAndPriceTriggerSrategy on whole arrays instead of one event per bar.
+
+    The indicators (SMA, cross bars, momentum, entry candidates) only depend on past bars, thus they are
+    computed for all bars at once. The remaining state (in the market or not, stop and take profit) is
+    resolved by a state machine that jumps from one entry candidate to the first bar that hits the stop or
+    the take profit. Signals are turned into orders and fills with the rules of Portfolio and
+    SimulatedExecutionHandler, i.e. all signals of a bar are sized on the position at the start of the bar
+    and an order only fills if the bar trades through its price.
+
+    The fills are the same as the ones of the event-driven Backtest, including its replay of the last bar
+    once the data is exhausted.
+    '''
+
+    default_params = dict(sma_window=18, cot_ubound=75.0, cot_lbound=25.0, bars_momentum=3, cross_bar=5)
+
+    def __init__(self, csv_dir, symbol_dict, initial_capital, start_date,
+                 data_handler=HistoricCSVDataHandler, strategy_params=None):
+        '''
+        Initialises the vectorized backtest.
+        :param csv_dir: The hard root to the CSV data directory.
+        :param symbol_dict: Dictionary of symbol strings.
+        :param initial_capital: The starting capital for the portfolio.
+        :param start_date: The start datetime of the strategy.
+        :param data_handler: (Class) Loads the bars, it has to provide the whole history in symbol_data.
+        :param strategy_params: Optional dict overriding default_params, the keyword arguments of
+        COTAndPriceTriggerSrategy.
+        '''
+        self.csv_dir = csv_dir
+        self.symbol_dict = symbol_dict
+        self.initial_capital = initial_capital
+        self.start_date = start_date
+        self.params = dict(self.default_params, **(strategy_params or {}))
+        self.slippage = 2
+
+        self.data_handler = data_handler(EventDeque(), csv_dir, symbol_dict)
+        n = len(self.data_handler.dates)
+        # The event loop handles the last bar once more after the data is exhausted, so every step is a bar
+        self.steps = np.append(np.arange(n), n - 1) if n else np.arange(0)
+        self._bars = {}
+        self._indicator_cache = {}
+        self.fills = None
+        self.equity_curve = None
+        self.cash = initial_capital
+        self.total = initial_capital
+
+    def _symbol_bars(self, s):
+        '''
+        The parameter independent arrays of one symbol per step, computed once.
+        :param s: takes symbol as string.
+        :return: Dictionary of arrays with one value per step.
+        '''
+        bars = self._bars.get(s)
+        if bars is None:
+            data = self.data_handler.symbol_data[s]
+            high, low, cot = (data[f][self.steps] for f in ('High', 'Low', 'Commercial Index'))
+            # The strategy only looks at bars with a Commercial Index
+            valid = ~np.isnan(cot)
+            bars = self._bars[s] = dict(
+                high=high,
+                low=low,
+                valid=valid,
+                valid_high=np.where(valid, high, np.nan),
+                valid_low=np.where(valid, low, np.nan),
+            )
+        return bars
+
+    def _indicators(self, s, params):
+        '''
+        Computes the state independent part of the strategy over the whole history of one symbol. Since it
+        only depends on past bars, every window of a walk-forward or sweep reuses the same arrays, thus they
+        are cached per symbol and parameters. Only the entry candidates are kept, i.e. a few percent of the steps.
+        :param s: takes symbol as string.
+        :param params: The strategy parameters.
+        :return: Dictionary of the candidate steps and their flags and prices.
+        '''
+        key = (s,) + tuple(sorted(params.items()))
+        ind = self._indicator_cache.get(key)
+        if ind is not None:
+            return ind
+
+        data = self.data_handler.symbol_data[s]
+        opn, high, low, settle, cot = (data[f] for f in ('Open', 'High', 'Low', 'Settle', 'Commercial Index'))
+        n = len(settle)
+        w = params['sma_window']
+        m = params['bars_momentum'] + 1
+
+        # Mean over the last sma_window bars, or over all bars while fewer are available
+        sma = np.empty(n)
+        head = min(w - 1, n)
+        for i in range(head):
+            sma[i] = np.mean(settle[:i + 1])
+        if n >= w:
+            sma[w - 1:] = np.mean(sliding_window_view(settle, w), axis=1)
+
+        # Momentum over the m-1 bars before the current one
+        mom_long = np.ones(n, dtype=bool)
+        mom_short = np.ones(n, dtype=bool)
+        highest = np.full(n, -np.inf)
+        lowest = np.full(n, np.inf)
+        for lag in range(1, m):
+            mom_long[lag:] &= settle[:-lag] > sma[lag:]
+            mom_short[lag:] &= settle[:-lag] < sma[lag:]
+            highest[lag:] = np.maximum(highest[lag:], high[:-lag])
+            lowest[lag:] = np.minimum(lowest[lag:], low[:-lag])
+
+        steps = self.steps
+        opn, high, low, cot, sma = opn[steps], high[steps], low[steps], cot[steps], sma[steps]
+        dates = self.data_handler.dates[steps]
+        valid = self._symbol_bars(s)['valid']
+
+        # The last cross bar sets the stops
+        cross = valid & (((opn < sma) & (sma < high)) | ((opn > sma) & (sma > low)))
+        last_cross = np.maximum.accumulate(np.where(cross, np.arange(len(steps)), -1))
+        crossed = last_cross >= 0
+        last_cross = np.where(crossed, last_cross, 0)
+        days = (dates - dates[last_cross]) // DAY_NS
+        window_cond = crossed & (m <= days) & (days <= params['cross_bar'])
+
+        entry = valid & window_cond
+        long_cand = entry & mom_long[steps] & (cot > params['cot_ubound'])
+        short_cand = entry & mom_short[steps] & (cot < params['cot_ubound'])
+        candidates = np.flatnonzero(long_cand | short_cand)
+        ind = self._indicator_cache[key] = dict(
+            candidates=candidates,
+            long=long_cand[candidates],
+            short=short_cand[candidates],
+            highest=highest[steps[candidates]],
+            lowest=lowest[steps[candidates]],
+            cross_high=high[last_cross[candidates]],
+            cross_low=low[last_cross[candidates]],
+        )
+        return ind
+
+    @staticmethod
+    def _first_hit(low, high, start, end, below, above):
+        '''
+        Searches forward in growing blocks for the first step before end whose low is at or below `below`
+        or whose high is at or above `above`.
+        :return: The step or -1.
+        '''
+        size = 64
+        while start < end:
+            stop = min(end, start + size)
+            hit = (low[start:stop] <= below) | (high[start:stop] >= above)
+            if hit.any():
+                return start + int(hit.argmax())
+            start = stop
+            size *= 4
+        return -1
+
+    def _symbol_signals(self, s, ind, start, end):
+        '''
+        The state machine of the strategy for one symbol, starting out of the market at step start.
+        :param s: takes symbol as string.
+        :param ind: The indicators of the symbol.
+        :param start: First step.
+        :param end: Step after the last one.
+        :return: List of (step, signal type, price) in the order the strategy generates them.
+        '''
+        tick = s_tick_amount[s]
+        bars = self._symbol_bars(s)
+        low, high = bars['valid_low'], bars['valid_high']
+        candidates = ind['candidates']
+        last = np.searchsorted(candidates, end)
+        signals = []
+        t = start
+        while True:
+            pos = np.searchsorted(candidates, t)
+            if pos >= last:
+                break
+            i = candidates[pos]
+
+            if ind['long'][pos]:
+                price = ind['highest'][pos]
+                stop = ind['cross_low'][pos]
+                take_profit = price + (price / tick - stop / tick) * tick
+                signals.append((i, LONG, price))
+                j = self._first_hit(low, high, i, end, stop, take_profit)
+                if j < 0:
+                    break
+                if low[j] <= stop:
+                    signals.append((j, LONG_STOP_EXIT, stop))
+                else:
+                    signals.append((j, LONG_TAKE_PROFIT_EXIT, take_profit))
+                # The short entry is checked after the long exits of the same bar
+                i = j
+                pos = np.searchsorted(candidates, j)
+                if pos >= last or candidates[pos] != j or not ind['short'][pos]:
+                    t = j + 1
+                    continue
+
+            if ind['short'][pos]:
+                price = ind['lowest'][pos]
+                stop = ind['cross_high'][pos]
+                take_profit = price + (price / tick - stop / tick) * tick
+                signals.append((i, SHORT, price))
+                j = self._first_hit(low, high, i, end, take_profit, stop)
+                if j < 0:
+                    break
+                if high[j] >= stop:
+                    signals.append((j, SHORT_STOP_EXIT, stop))
+                else:
+                    signals.append((j, SHORT_TAKE_PROFIT_EXIT, take_profit))
+                t = j + 1
+            else:
+                t = i + 1
+        return signals
+
+    def _symbol_fills(self, signals, bars):
+        '''
+        Sizes the signals as Portfolio.generate_naive_order does and fills them as SimulatedExecutionHandler.
+        :param signals: The signals of _symbol_signals.
+        :param bars: The bars of the symbol.
+        :return: List of (step, signal type, direction, quantity, price).
+        '''
+        fills = []
+        position = 0
+        step = -1
+        start_position = 0
+        for i, signal_type, price in signals:
+            if i != step:
+                step = i
+                start_position = position
+            position_sign, direction = ORDER_RULES[signal_type]
+            if position_sign == 0:
+                if start_position != 0:
+                    continue
+                quantity = 1
+            elif start_position * position_sign > 0:
+                quantity = abs(start_position)
+            else:
+                continue
+            if (bars['high'][i] >= price) if direction == BUY else (bars['low'][i] <= price):
+                fills.append((i, signal_type, direction, quantity, price))
+                position += direction * quantity
+        return fills
+
+    def run(self, strategy_params=None, start=0, end=None, close_out=False):
+        '''
+        Computes the fills of all symbols and the equity curve, optionally only for a window of steps that
+        starts out of the market.
+        :param strategy_params: Optional dict overriding the parameters of this run.
+        :param start: First step, i.e. bar position.
+        :param end: Step after the last one, all steps by default.
+        :param close_out: If True, the positions still open after the last step are closed by EXIT fills at
+        the Settle of the last step, thus the window also ends out of the market.
+        :return: DataFrame of the fills, in the order of the event-driven backtest.
+        '''
+        params = dict(self.params, **(strategy_params or {}))
+        steps = self.steps
+        end = len(steps) if end is None else end
+
+        rows = []
+        for k, s in enumerate(self.symbol_dict.keys()):
+            bars = self._symbol_bars(s)
+            signals = self._symbol_signals(s, self._indicators(s, params), start, end)
+            for i, signal_type, direction, quantity, price in self._symbol_fills(signals, bars):
+                rows.append((i, k, len(rows), s, signal_type, direction, quantity, price))
+        rows.sort()
+
+        if close_out and end > start:
+            positions = dict.fromkeys(self.symbol_dict, 0)
+            for row in rows:
+                positions[row[3]] += row[5] * row[6]
+            for k, s in enumerate(self.symbol_dict.keys()):
+                if positions[s] != 0:
+                    rows.append((end - 1, k, len(rows), s, EXIT, -int(np.sign(positions[s])), abs(positions[s]),
+                                 self.data_handler.symbol_data[s]['Settle'][steps[end - 1]]))
+
+        fills = pd.DataFrame(
+            [row[3:] for row in rows], columns=['symbol', 'signal_type', 'direction', 'quantity', 'price']
+        )
+        step = np.array([row[0] for row in rows], dtype=np.int64)
+        fills.insert(0, 'datetime', pd.DatetimeIndex(self.data_handler.dates[steps[step]].view('datetime64[ns]')))
+        fills['step'] = step
+        self.fills = fills
+        self._create_equity_curve(start, end)
+        return fills
+
+    def _create_equity_curve(self, start, end):
+        '''
+        Cash, commission and total per step as the holdings of Portfolio, i.e. recorded before the fills
+        of the step and with the fill cost of 2 ticks slippage and the commission of FillEvent. Closed
+        quantities book their profit or loss into cash and the total marks the open positions to the Settle.
+        A run from the first step starts with a row at start_date like Portfolio. The cash and total after the
+        fills of the last step are kept in cash and total.
+        :param start: First step.
+        :param end: Step after the last one.
+        '''
+        fills = self.fills
+        steps = self.steps
+        settle = np.array([
+            self.data_handler.symbol_data[s]['Settle'][steps[i]] for s, i in zip(fills['symbol'], fills['step'])
+        ], dtype=np.float64)
+        tick = fills['symbol'].map(s_tick_amount).values.astype(np.float64)
+        quantity = fills['quantity'].values.astype(np.float64)
+        cost = fills['direction'].values * (settle - fills['price'].values) / tick * self.slippage * quantity
+        commission = np.where(quantity <= 500, np.maximum(1.3, 0.013 * quantity), np.maximum(1.3, 0.008 * quantity))
+
+        # Realised profit or loss and the position and average entry price after every fill, as
+        # Portfolio.update_holdings_from_fill
+        symbols = fills['symbol'].values
+        signed = fills['direction'].values * quantity
+        price = fills['price'].values.astype(np.float64)
+        position = np.zeros(len(fills))
+        entry = np.zeros(len(fills))
+        realised = np.zeros(len(fills))
+        current = dict((s, (0.0, 0.0)) for s in self.symbol_dict)
+        for k, s in enumerate(symbols):
+            previous, entry_price = current[s]
+            q = signed[k]
+            after = previous + q
+            if previous * q < 0:
+                realised[k] = np.sign(previous) * min(abs(previous), abs(q)) * (price[k] - entry_price) * \
+                              s_tick_value[s] / s_tick_amount[s]
+            if after == 0:
+                entry_price = 0.0
+            elif previous * after <= 0:
+                entry_price = price[k]
+            elif abs(after) > abs(previous):
+                entry_price = (entry_price * abs(previous) + price[k] * abs(q)) / abs(after)
+            current[s] = (after, entry_price)
+            position[k], entry[k] = after, entry_price
+
+        step = fills['step'].values - start
+        n = end - start
+        step_cost = np.bincount(step, weights=cost + commission - realised, minlength=n)
+        step_commission = np.bincount(step, weights=commission, minlength=n)
+        # Row k holds the state before the fills of step start + k
+        cash = self.initial_capital - np.concatenate(([0.0], np.cumsum(step_cost)[:-1]))
+        commission = np.concatenate(([0.0], np.cumsum(step_commission)[:-1]))
+        # Cash after the fills of the last step
+        self.cash = self.initial_capital - step_cost.sum()
+
+        # Mark to market: the state of a symbol at row k is the one after its last fill before step start + k
+        market_value = np.zeros(n)
+        final_value = 0.0
+        rows = np.arange(start, end)
+        for s in np.unique(symbols):
+            mask = symbols == s
+            # Positions still open after the fills of the last step
+            if position[mask][-1] != 0:
+                final_value += position[mask][-1] * \
+                               (self.data_handler.symbol_data[s]['Settle'][steps[end - 1]] - entry[mask][-1]) * \
+                               s_tick_value[s] / s_tick_amount[s]
+            last = np.searchsorted(fills['step'].values[mask], rows, side='left') - 1
+            held = last >= 0
+            pos = np.where(held, position[mask][last], 0.0)
+            settle = self.data_handler.symbol_data[s]['Settle'][steps[start:end]]
+            value = pos * (settle - np.where(held, entry[mask][last], 0.0)) * s_tick_value[s] / s_tick_amount[s]
+            market_value += np.where(pos != 0, value, 0.0)
+        total = cash + market_value
+        self.total = self.cash + final_value
+
+        index = self.data_handler.dates[steps[start:end]].view('datetime64[ns]')
+        if start == 0:
+            # Same index as the equity curve of Portfolio, the start date followed by the bar dates
+            cash = np.concatenate(([self.initial_capital], cash))
+            commission = np.concatenate(([0.0], commission))
+            total = np.concatenate(([self.initial_capital], total))
+            index = np.concatenate(([np.datetime64(self.start_date, 'ns')], index))
+
+        curve = pd.DataFrame({'cash': cash, 'commission': commission, 'total': total},
+                             index=pd.DatetimeIndex(index, name='datetime'))
+        curve['returns'] = curve['total'].pct_change()
+        curve['equity_curve'] = (1.0 + curve['returns']).cumprod()
+        self.equity_curve = curve
+
+    def summary_stats(self):
+        '''
+        :return: the summary statistics as numbers, as Portfolio.summary_stats.
+        '''
+        total_return = self.equity_curve['equity_curve'].iloc[-1]
+        returns = self.equity_curve['returns']
+        pnl = self.equity_curve['equity_curve']
+
+        sharpe_ratio = create_sharpe_ratio(returns, periods=getattr(self.data_handler, 'periods', 252))
+        drawdown, max_dd, dd_duration = create_drawdowns(pnl)
+        self.equity_curve['drawdown'] = drawdown
+
+        return [
+            ('Total Return', total_return - 1.0),
+            ('Sharpe Ratio', sharpe_ratio),
+            ('Max Drawdown', max_dd),
+            ('Drawdown', dd_duration)
+        ]
+
+    def output_summary_stats(self):
+        '''
+        :return: a list of summary statistics as Portfolio.output_summary_stats.
+        '''
+        (_, total_return), (_, sharpe_ratio), (_, max_dd), (_, dd_duration) = self.summary_stats()
+        return [
+            ('Total Return', f'{round(total_return * 100.0,2)}%'),
+            ('Sharpe Ratio', f'{round(sharpe_ratio,2)}'),
+            ('Max Drawdown', f'{round(max_dd * 100.0,2)}%'),
+            ('Drawdown', f'{dd_duration}')
+        ]
+
+    def simulate_trading(self):
+        '''
+        Runs the backtest and outputs the performance like Backtest.simulate_trading.
+        '''
+        self.run()
+        stats = self.output_summary_stats()
+        print(self.equity_curve.tail(10))
+        pprint.pprint(stats)
+        print(f'Fills: {len(self.fills)}')
+
+
+if __name__ == "__main__":
+    csv_dir = 'data\\'
+    import backtester.TICKER_SYMBOLS as symbols
+    symbol_dict = {**symbols.quandl_cme_futures_map, **symbols.quandl_ice_futures_map}
+    backtest = VectorizedBacktest(csv_dir, symbol_dict, 100000.0, datetime.datetime(1990, 1, 1))
+    backtest.simulate_trading()
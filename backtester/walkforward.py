@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester.data import HistoricCSVDataHandler
+from backtester.performance import create_sharpe_ratio, create_drawdowns
+from backtester.sweep import parameter_grid
+from backtester.vectorized import VectorizedBacktest
+
+
+def walk_forward_windows(n, in_sample, out_of_sample, step=None):
+    '''
+    Splits n steps into rolling folds of in_sample steps followed by out_of_sample steps.
+    :param n: Number of steps.
+    :param in_sample: Steps of the in-sample window.
+    :param out_of_sample: Steps of the out-of-sample window.
+    :param step: Steps the windows are moved forward by, out_of_sample by default, i.e. the
+    out-of-sample windows are adjacent. A smaller step raises a ValueError, since overlapping out-of-sample
+    windows can not be stitched into one equity curve.
+    :return: List of (in-sample start, out-of-sample start, out-of-sample end) steps.
+    '''
+    step = step or out_of_sample
+    if step < out_of_sample:
+        raise ValueError(f'step {step} is smaller than out_of_sample {out_of_sample}, the out-of-sample '
+                         f'windows would overlap')
+    windows = []
+    start = 0
+    while start + in_sample < n:
+        windows.append((start, start + in_sample, min(start + in_sample + out_of_sample, n)))
+        start += step
+    return windows
+
+
+# The backtest of a worker process, its data is loaded once and its indicators are cached across folds
+_engine = None
+
+
+def _init_worker(csv_dir, symbol_dict, initial_capital, start_date, data_handler):
+    global _engine
+    _engine = VectorizedBacktest(csv_dir, symbol_dict, initial_capital, start_date, data_handler)
+
+
+def sharpe_objective(engine):
+    '''
+    Default objective of the in-sample fit.
+    :param engine: The VectorizedBacktest after a run.
+    :return: The Sharpe ratio of its equity curve.
+    '''
+    return create_sharpe_ratio(engine.equity_curve['returns'], periods=getattr(engine.data_handler, 'periods', 252))
+
+
+def _fit_fold(args):
+    '''
+    Runs all configurations on the in-sample window, then the best one on the out-of-sample window, whose
+    open positions are closed at the Settle of its last bar.
+    :return: Best parameters, their in-sample score, the out-of-sample equity curve, fills and final total.
+    '''
+    (is_start, oos_start, oos_end), configurations, objective = args
+    best_params, best_score = None, -np.inf
+    for params in configurations:
+        _engine.run(params, is_start, oos_start)
+        # Windows without any fill have no defined Sharpe ratio, they rank last
+        with np.errstate(invalid='ignore', divide='ignore'):
+            score = objective(_engine)
+        if np.isnan(score):
+            score = -np.inf
+        if best_params is None or score > best_score:
+            best_params, best_score = params, score
+
+    fills = _engine.run(best_params, oos_start, oos_end, close_out=True)
+    return best_params, best_score, _engine.equity_curve[['cash', 'commission', 'total']], fills, _engine.total
+
+
+class WalkForward(object):
+    '''
+    Walk-forward evaluation of COTAndPriceTriggerSrategy. Every fold optimises the parameters of the grid on
+    a rolling in-sample window and trades the best configuration on the following out-of-sample window,
+    starting out of the market. The positions still open at the end of a window are closed at the Settle of
+    its last bar, thus every fold ends flat and the out-of-sample equity curves are stitched on their total
+    into one curve.
+
+    The folds are simulated by VectorizedBacktest, i.e. with the fills and holdings of Backtest and
+    Portfolio. They run in parallel worker processes, every worker loads the data once and keeps the
+    indicator arrays of each symbol and configuration, which all overlapping windows share.
+    '''
+
+    def __init__(self, csv_dir, symbol_dict, initial_capital, start_date, grid, in_sample=252 * 4,
+                 out_of_sample=252, step=None, data_handler=HistoricCSVDataHandler, objective=sharpe_objective,
+                 max_workers=None):
+        '''
+        Initialises the walk-forward.
+        :param csv_dir: The hard root to the CSV data directory.
+        :param symbol_dict: Dictionary of symbol strings.
+        :param initial_capital: The starting capital for the portfolio.
+        :param start_date: The start datetime of the strategy.
+        :param grid: Dictionary of parameter name -> list of values, or a list of parameter dictionaries.
+        :param in_sample: Bars of the in-sample window.
+        :param out_of_sample: Bars of the out-of-sample window.
+        :param step: Bars the windows move forward by, out_of_sample by default, at least out_of_sample.
+        :param data_handler: (Class) Loads the bars, it has to provide the whole history in symbol_data.
+        :param objective: Function of a VectorizedBacktest after a run, the in-sample fit maximises it.
+        It has to be picklable, i.e. a module level function.
+        :param max_workers: Number of processes, the number of CPUs by default. 1 runs in this process.
+        '''
+        self.csv_dir = csv_dir
+        self.symbol_dict = symbol_dict
+        self.initial_capital = initial_capital
+        self.start_date = start_date
+        self.configurations = parameter_grid(grid) if isinstance(grid, dict) else list(grid)
+        self.in_sample = in_sample
+        self.out_of_sample = out_of_sample
+        self.step = step
+        self.data_handler = data_handler
+        self.objective = objective
+        self.max_workers = max_workers
+
+        self.folds = None
+        self.fills = None
+        self.equity_curve = None
+
+    def run(self):
+        '''
+        Fits and trades all folds.
+        :return: DataFrame with one row per fold: the window dates, the best parameters, their in-sample
+        score and the number of out-of-sample fills.
+        '''
+        initargs = (self.csv_dir, self.symbol_dict, self.initial_capital, self.start_date, self.data_handler)
+        _init_worker(*initargs)
+        engine = _engine
+        windows = walk_forward_windows(len(engine.steps), self.in_sample, self.out_of_sample, self.step)
+        args = [(window, self.configurations, self.objective) for window in windows]
+
+        max_workers = min(self.max_workers or os.cpu_count() or 1, max(len(args), 1))
+        if max_workers == 1:
+            results = list(map(_fit_fold, args))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=initargs) as executor:
+                results = list(executor.map(_fit_fold, args))
+
+        datetimes = engine.data_handler._datetimes[engine.steps]
+        rows = []
+        curves = []
+        fills = []
+        offset = 0.0
+        for (is_start, oos_start, oos_end), (params, score, curve, oos_fills, total) in zip(windows, results):
+            rows.append(dict(
+                in_sample_start=datetimes[is_start],
+                out_of_sample_start=datetimes[oos_start],
+                out_of_sample_end=datetimes[oos_end - 1],
+                in_sample_score=score,
+                fills=len(oos_fills),
+                **params
+            ))
+            # Every fold starts with the initial capital, carry the equity of the preceding folds over
+            curve = curve.copy()
+            curve[['cash', 'total']] += offset
+            curves.append(curve)
+            fills.append(oos_fills)
+            offset += total - self.initial_capital
+
+        self.folds = pd.DataFrame(rows)
+        self.fills = pd.concat(fills, ignore_index=True) if fills else None
+        if curves:
+            curve = pd.concat(curves)
+            curve['returns'] = curve['total'].pct_change()
+            curve['equity_curve'] = (1.0 + curve['returns']).cumprod()
+            self.equity_curve = curve
+        return self.folds
+
+    def summary_stats(self):
+        '''
+        :return: the summary statistics of the stitched out-of-sample equity curve as numbers.
+        '''
+        total_return = self.equity_curve['equity_curve'].iloc[-1]
+        returns = self.equity_curve['returns']
+        pnl = self.equity_curve['equity_curve']
+
+        sharpe_ratio = create_sharpe_ratio(returns, periods=getattr(self.data_handler, 'periods', 252))
+        drawdown, max_dd, dd_duration = create_drawdowns(pnl)
+        self.equity_curve['drawdown'] = drawdown
+
+        return [
+            ('Total Return', total_return - 1.0),
+            ('Sharpe Ratio', sharpe_ratio),
+            ('Max Drawdown', max_dd),
+            ('Drawdown', dd_duration)
+        ]
+
+
+if __name__ == "__main__":
+    csv_dir = 'data\\'
+    import backtester.TICKER_SYMBOLS as symbols
+    symbol_dict = {**symbols.quandl_cme_futures_map, **symbols.quandl_ice_futures_map}
+    grid = {
+        'sma_window': [10, 18, 30],
+        'bars_momentum': [2, 3],
+        'cross_bar': [5, 8],
+    }
+    walk_forward = WalkForward(csv_dir, symbol_dict, 100000.0, datetime.datetime(1990, 1, 1), grid)
+    print(walk_forward.run().to_string())
+    print(walk_forward.summary_stats())
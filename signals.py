@@ -4,6 +4,8 @@ import datetime
 import os
 import sys
 
+from backtester.cache import read_csv_cached
+
 # The Idea is to generate Signals from different sources and combine them to create stable trading workframe.
 data_dir = 'data\\'
 sma_period = 18
@@ -16,7 +18,9 @@ def path_generator(cot=None, market=None, weekly=None, daily=None):
     if market is True:
         if daily is True:
             for file in os.scandir(data_dir):
-                if not file.name.endswith('cot.csv') and \
+                # data_dir also holds the binary cache folder, thus only pick csv files
+                if file.name.endswith('.csv') and \
+                        not file.name.endswith('cot.csv') and \
                         not file.name.endswith('weekly.csv'):
                     yield file.path, file.name
         if weekly is True:
@@ -29,7 +33,7 @@ def cot_signal():
     df_cot_signal = pd.DataFrame(columns=columns)
     i = 0
     for path, name in path_generator(cot=True):
-        cot_idx = pd.read_csv(path, index_col='Date', parse_dates=True)
+        cot_idx = read_csv_cached(path)
         if cot_idx['Commercial Index'].iloc[-1] > 75:
             df_cot_signal.append(df_cot_signal.set_value(i, ['Market', 'COT Signal'], [name.split('_')[0],'Long']))
             i+=1
@@ -43,7 +47,7 @@ def daily_price_trigger():
     df_price_trigger = pd.DataFrame(columns=columns)
     i = 0
     for path, name in path_generator(market=True, daily=True):
-        df = pd.read_csv(path, index_col='Date', parse_dates=True)
+        df = read_csv_cached(path)
         df['SMA18'] = df['Settle'].rolling(sma_period).mean()
         df = df[df['SMA18'].notnull()]
         df['long_sma_cross'] = (df['Open'] < df['SMA18']) & (df['SMA18'] < df['High'])
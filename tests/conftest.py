@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+
+import pandas as pd
+import pytest
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+SYMBOLS = ('ES', 'CL', 'GC', 'ZN', 'ZC')
+
+
+@pytest.fixture(scope='session')
+def csv_dir(tmp_path_factory):
+    '''
+    The price files of data/ with the Commercial Index merged in, as get_data.py writes them: the COT
+    report of a Tuesday is known from the Friday on and padded forward to the next report.
+    :return: Directory path with a trailing separator, as the data handlers expect it.
+    '''
+    path = tmp_path_factory.mktemp('data')
+    for s in SYMBOLS:
+        prices = pd.read_csv(os.path.join(DATA_DIR, f'{s}.csv'), index_col='Date', parse_dates=True)
+        cot = pd.read_csv(os.path.join(DATA_DIR, f'{s}_cot.csv'), index_col='Date', parse_dates=True)
+        cot.index = cot.index + pd.Timedelta(days=3)
+        prices = prices.join(cot[['Commercial Index']].reindex(prices.index, method='ffill'))
+        prices.to_csv(path / f'{s}.csv')
+    return str(path) + os.sep
@@ -12,6 +12,8 @@ from sklearn.metrics import confusion_matrix
 from sklearn.discriminant_analysis import QuadraticDiscriminantAnalysis as QDA
 from sklearn.svm import LinearSVC, SVC
 
+from backtester.cache import read_csv_cached
+
 dir_path = 'C:\\Users\\Xetra\\PycharmProjects\\first_trading_algo\\data\\'
 
 def create_lagged_series(symbol, start_date=None, end_date=None, lags=5):
@@ -29,7 +31,7 @@ def create_lagged_series(symbol, start_date=None, end_date=None, lags=5):
 
     # Read to ts
     path = f'{dir_path}{symbol}.csv'
-    ts = pd.read_csv(path, index_col='Date', parse_dates=True).loc[start_date:end_date]
+    ts = read_csv_cached(path).loc[start_date:end_date]
 
     # Create the new lagged DataFrame
     tslag = pd.DataFrame(index=ts.index)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester.alignment import (align_values, cached_index_maps, ffill_index_maps, resolve_calendar,
+                                  to_int64_dates)
+
+
+def random_frames(seed=0, n_symbols=4):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range('2000-01-01', periods=400, freq='D')
+    frames = []
+    for _ in range(n_symbols):
+        # Every symbol starts at its own date and misses some days
+        start = rng.integers(0, 100)
+        index = days[start:][rng.random(len(days) - start) < 0.8]
+        frames.append(pd.DataFrame(rng.normal(size=(len(index), 2)), index=index, columns=['Open', 'Settle']))
+    return frames
+
+
+def test_alignment_matches_pandas_forward_fill():
+    frames = random_frames()
+    dates_list = [to_int64_dates(df.index) for df in frames]
+    calendar = resolve_calendar(dates_list)
+    union = frames[0].index
+    for df in frames[1:]:
+        union = union.union(df.index)
+    np.testing.assert_array_equal(calendar, to_int64_dates(union))
+
+    aligned = align_values([df.values.T for df in frames], ffill_index_maps(calendar, dates_list))
+    for k, df in enumerate(frames):
+        np.testing.assert_array_equal(aligned[k], df.reindex(union, method='ffill').values.T)
+
+
+def test_symbol_and_explicit_calendars():
+    frames = random_frames(1)
+    dates_list = [to_int64_dates(df.index) for df in frames]
+    np.testing.assert_array_equal(resolve_calendar(dates_list, 'B', ['A', 'B', 'C', 'D']), dates_list[1])
+
+    # An exchange calendar, unsorted, with duplicates and a date after all bars
+    exchange = pd.DatetimeIndex(['2000-03-05', '2000-01-02', '2000-03-05', '2001-01-01'])
+    unique = exchange.unique().sort_values()
+    calendar = resolve_calendar(dates_list, exchange)
+    np.testing.assert_array_equal(calendar, to_int64_dates(unique))
+    aligned = align_values([df.values.T for df in frames], ffill_index_maps(calendar, dates_list))
+    for k, df in enumerate(frames):
+        expected = df.reindex(df.index.union(unique)).ffill().reindex(unique)
+        np.testing.assert_array_equal(aligned[k], expected.values.T)
+
+
+def test_cached_maps_follow_their_sources(tmp_path):
+    frames = random_frames(2, n_symbols=2)
+    paths = [str(tmp_path / f'{s}.csv') for s in ('A', 'B')]
+    for path, df in zip(paths, frames):
+        df.to_csv(path)
+    dates_list = [to_int64_dates(df.index) for df in frames]
+
+    calendar, maps = cached_index_maps(paths, dates_list)
+    np.testing.assert_array_equal(maps, ffill_index_maps(resolve_calendar(dates_list), dates_list))
+    cached_calendar, cached_maps = cached_index_maps(paths, [])
+    np.testing.assert_array_equal(cached_calendar, calendar)
+    np.testing.assert_array_equal(cached_maps, maps)
+
+    # Another calendar is another cache entry
+    calendar_b, _ = cached_index_maps(paths, dates_list, 'B', ['A', 'B'])
+    np.testing.assert_array_equal(calendar_b, dates_list[1])
+
+    # A rewritten source invalidates the maps
+    frames[1] = frames[1].iloc[:-10]
+    frames[1].to_csv(paths[1])
+    st = os.stat(paths[1])
+    os.utime(paths[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    dates_list = [to_int64_dates(df.index) for df in frames]
+    calendar, maps = cached_index_maps(paths, dates_list)
+    np.testing.assert_array_equal(calendar, resolve_calendar(dates_list))
+    np.testing.assert_array_equal(maps, ffill_index_maps(calendar, dates_list))
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import cache
+from backtester.cache import cache_path, read_csv_cached
+from backtester.data import HistoricCSVDataHandler
+from backtester.eventqueue import EventDeque
+
+
+def write_prices(path, settle):
+    dates = pd.date_range('2020-01-01', periods=len(settle), freq='D', name='Date')
+    pd.DataFrame({'Open': 1.0, 'Settle': settle}, index=dates).to_csv(path)
+
+
+def no_csv(*args, **kwargs):
+    raise AssertionError('the CSV file was parsed')
+
+
+def test_second_read_comes_from_the_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / 'ES.csv')
+    write_prices(path, [1.0, 2.0, 3.0])
+    first = read_csv_cached(path)
+    assert os.path.exists(cache_path(path))
+
+    monkeypatch.setattr(cache.pd, 'read_csv', no_csv)
+    pd.testing.assert_frame_equal(read_csv_cached(path), first)
+    pd.testing.assert_frame_equal(read_csv_cached(path, usecols=['Date', 'Settle']), first[['Settle']])
+
+
+def test_changed_mtime_invalidates_the_cache(tmp_path):
+    path = str(tmp_path / 'ES.csv')
+    write_prices(path, [1.0, 2.0, 3.0])
+    read_csv_cached(path)
+    st = os.stat(path)
+
+    # Same size, other content and a later modification time
+    write_prices(path, [1.0, 2.0, 4.0])
+    assert os.stat(path).st_size == st.st_size
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert read_csv_cached(path)['Settle'].tolist() == [1.0, 2.0, 4.0]
+
+
+def test_changed_size_invalidates_the_cache(tmp_path):
+    path = str(tmp_path / 'ES.csv')
+    write_prices(path, [1.0, 2.0, 3.0])
+    read_csv_cached(path)
+    st = os.stat(path)
+
+    # Other size with the same modification time
+    write_prices(path, [1.0, 2.0, 3.0, 5.0])
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert read_csv_cached(path)['Settle'].tolist() == [1.0, 2.0, 3.0, 5.0]
+
+
+def test_broken_cache_file_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'ES.csv')
+    write_prices(path, [1.0, 2.0])
+    read_csv_cached(path)
+    with open(cache_path(path), 'wb') as f:
+        f.write(b'broken')
+    assert read_csv_cached(path)['Settle'].tolist() == [1.0, 2.0]
+    with np.load(cache_path(path)) as npz:
+        assert list(npz['columns']) == ['Open', 'Settle']
+
+
+def test_missing_column_raises(tmp_path):
+    path = str(tmp_path / 'ES.csv')
+    write_prices(path, [1.0, 2.0])
+    with pytest.raises(ValueError, match='Commercial Index'):
+        read_csv_cached(path, usecols=['Settle', 'Commercial Index'])
+
+
+def test_failed_write_returns_the_parsed_frame(tmp_path, monkeypatch):
+    path = str(tmp_path / 'ES.csv')
+    write_prices(path, [1.0, 2.0])
+
+    def disk_full(f, **arrays):
+        f.write(b'half')
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(cache.np, 'savez', disk_full)
+    df = read_csv_cached(path)
+    assert df['Settle'].tolist() == [1.0, 2.0] and df.index.dtype == 'datetime64[ns]'
+    # Neither the cache nor the temporary file is left behind
+    assert os.listdir(os.path.dirname(cache_path(path))) == []
+
+
+def test_unwritable_cache_directory(csv_dir, tmp_path):
+    # The cache folder can not be created, the handler reads the CSV files uncached
+    for s in ('ES', 'CL'):
+        with open(os.path.join(csv_dir, f'{s}.csv')) as src, open(tmp_path / f'{s}.csv', 'w') as dst:
+            dst.write(src.read())
+    (tmp_path / cache.CACHE_DIR).write_text('not a directory')
+    handler = HistoricCSVDataHandler(EventDeque(), str(tmp_path) + os.sep, {'ES': 'ES', 'CL': 'CL'})
+    expected = HistoricCSVDataHandler(EventDeque(), csv_dir, {'ES': 'ES', 'CL': 'CL'})
+    np.testing.assert_array_equal(handler.dates, expected.dates)
+    np.testing.assert_array_equal(handler.symbol_data['CL']['Settle'], expected.symbol_data['CL']['Settle'])
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+import os
+
+import pandas as pd
+import pytest
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler, StreamingCSVDataHandler
+from backtester.execution import SimulatedExecutionHandler
+from backtester.portfolio import Portfolio
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+
+from conftest import SYMBOLS
+
+
+class Interrupt(Exception):
+    pass
+
+
+def make_backtest(csv_dir, data_handler, **kwargs):
+    return Backtest(csv_dir, dict((s, s) for s in SYMBOLS), 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+                    data_handler, SimulatedExecutionHandler, Portfolio, COTAndPriceTriggerSrategy, **kwargs)
+
+
+@pytest.mark.parametrize('data_handler', [HistoricCSVDataHandler, StreamingCSVDataHandler])
+def test_resume_matches_uninterrupted_run(csv_dir, tmp_path, data_handler):
+    full = make_backtest(csv_dir, data_handler)
+    full._run_backtest()
+
+    # Stop the run in between two checkpoints
+    path = str(tmp_path / 'checkpoint.pkl')
+    interrupted = make_backtest(csv_dir, data_handler, checkpoint=path, checkpoint_interval=1000)
+    update_bars = interrupted.data_handler.update_bars
+
+    def stop_at_bar():
+        if interrupted.bars == 7100:
+            raise Interrupt()
+        update_bars()
+
+    interrupted.data_handler.update_bars = stop_at_bar
+    with pytest.raises(Interrupt):
+        interrupted._run_backtest()
+
+    resumed = make_backtest(csv_dir, data_handler)
+    resumed.load_checkpoint(path)
+    assert resumed.bars == 7000
+    resumed._run_backtest()
+
+    assert (resumed.signals, resumed.orders, resumed.fills, resumed.bars) == \
+           (full.signals, full.orders, full.fills, full.bars)
+    full.portfolio.create_equity_curve_dataframe()
+    resumed.portfolio.create_equity_curve_dataframe()
+    pd.testing.assert_frame_equal(resumed.portfolio.equity_curve, full.portfolio.equity_curve)
+
+
+def test_run_incremental_with_streaming_handler(csv_dir, tmp_path):
+    # The first run only knows the bars before 2015, the second one all of them
+    for s in SYMBOLS:
+        prices = pd.read_csv(os.path.join(csv_dir, f'{s}.csv'), index_col='Date', parse_dates=True)
+        prices[prices.index < '2015-01-01'].to_csv(tmp_path / f'{s}.csv')
+    path = str(tmp_path / 'state.pkl')
+    make_backtest(str(tmp_path) + os.sep, StreamingCSVDataHandler).run_incremental(path)
+    signals, orders = make_backtest(csv_dir, StreamingCSVDataHandler).run_incremental(path)
+
+    all_signals, _ = make_backtest(csv_dir, HistoricCSVDataHandler).run_incremental(str(tmp_path / 'full.pkl'))
+    assert len(signals) > 0
+    assert signals == [signal for signal in all_signals if signal[0] >= pd.Timestamp('2015-01-01')]
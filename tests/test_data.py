@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.data import HistoricCSVDataHandler
+from backtester.event import MARKET_EVENT
+from backtester.eventqueue import EventDeque
+
+from conftest import SYMBOLS
+
+
+def load_union(csv_dir):
+    '''
+    The bars of all symbols the way the handler used to build them: read with pandas, padded forward on
+    the union of their dates.
+    '''
+    frames = dict((s, pd.read_csv(f'{csv_dir}{s}.csv', index_col='Date', parse_dates=True)
+                   [list(HistoricCSVDataHandler.fields)].sort_index().ffill()) for s in SYMBOLS)
+    union = None
+    for df in frames.values():
+        union = df.index if union is None else union.union(df.index)
+    return union, dict((s, df.reindex(union, method='pad')) for s, df in frames.items())
+
+
+def test_columnar_store_matches_pandas(csv_dir):
+    handler = HistoricCSVDataHandler(EventDeque(), csv_dir, dict((s, s) for s in SYMBOLS))
+    union, frames = load_union(csv_dir)
+    np.testing.assert_array_equal(handler.dates, union.values.astype('datetime64[ns]').astype(np.int64))
+    for s, df in frames.items():
+        for f in handler.fields:
+            column = handler.symbol_data[s][f]
+            assert column.dtype == np.float64 and column.flags.c_contiguous and not column.flags.writeable
+            np.testing.assert_array_equal(column, df[f].values)
+
+
+def test_latest_bars_follow_the_cursor(csv_dir):
+    events = EventDeque()
+    handler = HistoricCSVDataHandler(events, csv_dir, dict((s, s) for s in SYMBOLS), max_lookback=10)
+    union, frames = load_union(csv_dir)
+    es = frames['ES']
+    for i in range(25):
+        handler.update_bars()
+        assert events.get() is MARKET_EVENT
+    assert handler.bar_index == 25
+    assert handler.get_latest_bar_datetime('ES') == union[24]
+    assert handler.get_latest_bar_value('ES', 'Settle') == pytest.approx(es['Settle'].iloc[24], nan_ok=True)
+    np.testing.assert_array_equal(handler.get_latest_bars_values('ES', 'High', N=4), es['High'].values[21:25])
+    # At most max_lookback bars are kept, a longer window is an error instead of a short one
+    assert len(handler.window('ES', 'Low', N=10)) == 10
+    with pytest.raises(ValueError, match='max lookback'):
+        handler.window('ES', 'Low', N=11)
+    with pytest.raises(ValueError, match='max lookback'):
+        handler.get_latest_bars_datetime('ES', N=11)
+    settle, low = handler.window('CL', ('Settle', 'Low'), N=3)
+    np.testing.assert_array_equal(settle, frames['CL']['Settle'].values[22:25])
+    np.testing.assert_array_equal(low, frames['CL']['Low'].values[22:25])
+    np.testing.assert_array_equal(handler.get_latest_bar_vector('Open'),
+                                  [frames[s]['Open'].iloc[24] for s in SYMBOLS])
+    bar = handler.get_latest_bar('GC')
+    assert bar[0] == union[24]
+    np.testing.assert_array_equal(bar[1:], frames['GC'].iloc[24].values)
+
+
+def test_unknown_lookback_keeps_the_default(csv_dir):
+    handler = HistoricCSVDataHandler(EventDeque(), csv_dir, {'ES': 'ES'})
+    assert handler.latest_symbol_data.capacity == HistoricCSVDataHandler.default_max_lookback
+    assert len(handler.dates) > handler.default_max_lookback
+
+
+def test_exhausted_handler_stops(csv_dir):
+    events = EventDeque()
+    handler = HistoricCSVDataHandler(events, csv_dir, {'ES': 'ES'}, max_lookback=3)
+    n = len(handler.dates)
+    for i in range(n + 1):
+        assert handler.continue_backtest
+        handler.update_bars()
+    assert not handler.continue_backtest
+    assert handler.bar_index == n
+    assert len(events) == n + 1
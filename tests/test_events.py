@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+
+import pytest
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler
+from backtester.event import (BUY, LONG, MARKET, MARKET_EVENT, SELL, FillEvent, MarketEvent, OrderEvent,
+                              SignalEvent)
+from backtester.execution import SimulatedExecutionHandler
+from backtester.portfolio import Portfolio
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+
+from conftest import SYMBOLS
+
+
+@pytest.fixture
+def empty_pools():
+    pools = [SignalEvent._pool, OrderEvent._pool, FillEvent._pool]
+    saved = [list(pool) for pool in pools]
+    for pool in pools:
+        del pool[:]
+    yield
+    for pool, items in zip(pools, saved):
+        pool[:] = items
+
+
+def test_market_event_is_a_payload_free_singleton():
+    assert MARKET_EVENT.type == MARKET
+    assert isinstance(MARKET_EVENT, MarketEvent)
+    with pytest.raises(AttributeError):
+        MARKET_EVENT.symbol = 'ES'
+    MARKET_EVENT.release()
+
+
+def test_released_events_are_reinitialised(empty_pools):
+    signal = SignalEvent.acquire(1, 'ES', None, 'LONG', 100.0, 1.0)
+    assert signal.signal_type == LONG
+    signal.release()
+    again = SignalEvent.acquire(1, 'CL', None, 'SHORT', 50.0, 2.0)
+    assert again is signal
+    assert (again.symbol, again.price, again.strength) == ('CL', 50.0, 2.0)
+
+    # Every class has its own pool
+    order = OrderEvent.acquire('ES', 'MKT', 100.0, 1, 'SELL')
+    assert order.direction == SELL and order is not signal
+    order.release()
+    assert OrderEvent.acquire('ES', 'MKT', 100.0, 1, BUY) is order
+
+
+def test_pool_is_bounded(empty_pools, monkeypatch):
+    monkeypatch.setattr(OrderEvent, 'pool_size', 2)
+    orders = [OrderEvent.acquire('ES', 'MKT', 100.0, 1, BUY) for _ in range(5)]
+    for order in orders:
+        order.release()
+    assert len(OrderEvent._pool) == 2
+
+
+def test_backtest_recycles_its_events(csv_dir, empty_pools):
+    backtest = Backtest(csv_dir, dict((s, s) for s in SYMBOLS), 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+                        HistoricCSVDataHandler, SimulatedExecutionHandler, Portfolio, COTAndPriceTriggerSrategy)
+    backtest._run_backtest()
+    assert backtest.signals > 1000 and backtest.fills > 500
+    # Only the events of the busiest bar were ever allocated, all of them are back in the pools
+    for cls in (SignalEvent, OrderEvent, FillEvent):
+        assert 0 < len(cls._pool) <= 2 * len(SYMBOLS)
+        assert len(set(map(id, cls._pool))) == len(cls._pool)
+    assert len(backtest.events) == 0
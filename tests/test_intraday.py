@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import data
+from backtester.cache import cache_path
+from backtester.data import HistoricCSVDataHandler, IntradayDataHandler
+from backtester.eventqueue import EventDeque
+from backtester.streaming import binary_paths
+
+
+@pytest.fixture
+def minute_dir(tmp_path):
+    '''
+    Two symbols of minute bars over two sessions, the second one starts later and misses some minutes
+    and values.
+    '''
+    rng = np.random.default_rng(0)
+    sessions = [pd.date_range(f'2020-01-0{d} 09:30', periods=120, freq='min') for d in (2, 3)]
+    minutes = sessions[0].append(sessions[1])
+    for s, index in (('ES', minutes), ('NQ', minutes[37:][rng.random(len(minutes) - 37) < 0.7])):
+        settle = 3000.0 + np.cumsum(rng.normal(0.0, 1.0, len(index)))
+        df = pd.DataFrame({'Open': settle, 'High': settle + 1.0, 'Low': settle - 1.0, 'Settle': settle,
+                           'Volume': rng.integers(1, 100, len(index)).astype(float), 'Commercial Index': 50.0},
+                          index=pd.DatetimeIndex(index, name='Date'))
+        df.iloc[rng.random(len(df)) < 0.05, 1] = np.nan
+        df.to_csv(tmp_path / f'{s}.csv')
+    return str(tmp_path) + os.sep
+
+
+def stream(handler):
+    bars = []
+    while True:
+        handler.update_bars()
+        if not handler.continue_backtest:
+            return bars
+        ring = handler.latest_symbol_data
+        bars.append((ring.last_datetime(), ring.values[..., ring.end - 1].copy()))
+
+
+def test_binary_stream_matches_the_historic_handler(minute_dir, monkeypatch):
+    symbols = {'ES': 'ES', 'NQ': 'NQ'}
+    expected = stream(HistoricCSVDataHandler(EventDeque(), minute_dir, symbols))
+    assert len(expected) == 240
+
+    # A small chunk size, thus the forward fill crosses the chunk borders
+    intraday = IntradayDataHandler(EventDeque(), minute_dir, symbols, chunksize=7, bar_minutes=1,
+                                   datetime_cols=('Date',))
+    assert intraday.periods == 252 * 6.5 * 60
+    for s in symbols:
+        assert all(os.path.exists(p) for p in binary_paths(cache_path(f'{minute_dir}{s}.csv', suffix='')))
+    bars = stream(intraday)
+    assert [dt for dt, _ in bars] == [dt for dt, _ in expected]
+    np.testing.assert_array_equal(np.array([bar for _, bar in bars]), np.array([bar for _, bar in expected]))
+
+    # The second handler streams the current conversion without parsing the CSV files
+    def no_conversion(*args, **kwargs):
+        raise AssertionError('the CSV file was converted again')
+
+    monkeypatch.setattr(data, 'convert_csv_to_binary', no_conversion)
+    again = IntradayDataHandler(EventDeque(), minute_dir, symbols, chunksize=50, datetime_cols=('Date',))
+    assert again.periods == 252 * 6.5 * 60 / 5
+    np.testing.assert_array_equal(np.array([bar for _, bar in stream(again)]),
+                                  np.array([bar for _, bar in expected]))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from backtester.ledger import Ledger
+
+
+def fill(ledger, n):
+    dates = pd.date_range('2020-01-01', periods=n, freq='D')
+    for i, dt in enumerate(dates):
+        row = ledger.append(dt)
+        assert row == i
+        ledger.values[row] = (i, -i, 2 * i)
+    return dates
+
+
+def test_rows_grow_past_the_capacity():
+    ledger = Ledger(['ES', 'cash', 'total'], capacity=3)
+    dates = fill(ledger, 1500)
+    assert len(ledger) == 1500 and len(ledger.values) == 2048
+    df = ledger.frame()
+    assert list(df.columns) == ['ES', 'cash', 'total']
+    assert (df.index == dates).all() and df.index.name == 'datetime'
+    np.testing.assert_array_equal(df['total'].values, 2 * np.arange(1500.0))
+    # The rows after the last append are zeroed
+    assert not ledger.values[1500:].any()
+
+
+def test_frame_shares_the_memory_of_the_ledger():
+    ledger = Ledger(['ES', 'cash', 'total'], capacity=10)
+    fill(ledger, 5)
+    df = ledger.frame()
+    ledger.values[4, ledger.column_index['cash']] = 123.0
+    assert df['cash'].iloc[4] == 123.0
+    # A snapshot, it is not extended by later rows
+    ledger.append(pd.Timestamp('2020-01-06'))
+    assert len(df) == 5 and len(ledger.frame()) == 6
+
+
+def test_pickle_keeps_the_filled_rows():
+    ledger = Ledger(['ES', 'cash', 'total'], capacity=1000)
+    dates = fill(ledger, 7)
+    restored = pickle.loads(pickle.dumps(ledger))
+    assert restored.values.shape == (7, 3) and len(ledger.values) == 1000
+    pd.testing.assert_frame_equal(restored.frame(), ledger.frame())
+
+    # The restored ledger grows on the next append
+    row = restored.append(dates[-1] + pd.Timedelta(days=1))
+    assert row == 7 and len(restored.values) == 1024
+    np.testing.assert_array_equal(restored.values[:7], ledger.values[:7])
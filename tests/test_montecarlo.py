@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.montecarlo import RETURNS, TRADES, MonteCarlo, _resample_paths
+
+
+@pytest.fixture
+def returns():
+    return np.random.default_rng(0).normal(0.0005, 0.01, 300)
+
+
+def test_seed_fixes_the_bands(returns):
+    bands = []
+    for max_workers, chunk in ((1, 500), (1, 64), (2, 37)):
+        monte_carlo = MonteCarlo(100000.0, n_paths=500, chunk=chunk, max_workers=max_workers, seed=7)
+        monte_carlo.bootstrap_returns(returns, block_size=10)
+        bands.append(monte_carlo.percentile_bands())
+    for other in bands[1:]:
+        pd.testing.assert_frame_equal(other, bands[0])
+
+    other = MonteCarlo(100000.0, n_paths=500, chunk=500, max_workers=1, seed=8)
+    other.bootstrap_returns(returns, block_size=10)
+    assert not other.percentile_bands().equals(bands[0])
+
+
+def test_percentiles_are_ordered(returns):
+    monte_carlo = MonteCarlo(100000.0, n_paths=400, chunk=100, max_workers=1, seed=1)
+    stats = monte_carlo.resample_trades(returns * 100000.0)
+    assert len(stats) == 400
+    bands = monte_carlo.percentile_bands((5, 25, 50, 75, 95))
+    assert list(bands.index) == [5, 25, 50, 75, 95]
+    assert (bands.diff().iloc[1:] >= 0).all().all()
+
+
+def test_resampling_draws_from_the_data(returns):
+    seeds = np.random.SeedSequence(3).spawn(20)
+    # Single trades drawn with replacement, every step of a path is one of the trades
+    pnl = np.round(returns * 100000.0, 2)
+    equity = _resample_paths(TRADES, pnl, 100000.0, 50, 1, seeds)
+    assert (equity[0] == 100000.0).all()
+    assert np.isin(np.round(np.diff(equity, axis=0), 2), pnl).all()
+
+    # Blocks of length 1 draw single returns
+    equity = _resample_paths(RETURNS, returns, 1.0, 50, 1, seeds)
+    assert np.isin(np.round(equity[1:] / equity[:-1] - 1.0, 12), np.round(returns, 12)).all()
+
+    # One block over all returns is a rotation of them, thus every path keeps the multiset of the returns
+    equity = _resample_paths(RETURNS, returns, 1.0, len(returns), len(returns), seeds)
+    drawn = equity[1:] / equity[:-1] - 1.0
+    for p in range(len(seeds)):
+        np.testing.assert_allclose(np.sort(drawn[:, p]), np.sort(returns), atol=1e-12)
+    monte_carlo = MonteCarlo(1.0, n_paths=20, max_workers=1, seed=3)
+    stats = monte_carlo.bootstrap_returns(returns, block_size=len(returns))
+    np.testing.assert_allclose(stats['Total Return'], np.prod(1.0 + returns) - 1.0, rtol=1e-9)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester.data import HistoricCSVDataHandler
+from backtester.event import BUY, FILL, LONG, MARKET_EVENT, SELL, SHORT, OrderEvent
+from backtester.eventqueue import EventDeque
+from backtester.execution import SimulatedExecutionHandler
+from backtester.orderbook import CXL, LMT, STP, OrderBook
+
+
+def prices(fills):
+    return [(order[3], price) for order, price in fills]
+
+
+def test_stops_that_gap_through_fill_at_the_open():
+    book = OrderBook()
+    book.add('ES', STP, 100.0, 1, BUY, LONG)
+    book.add('ES', STP, 90.0, 1, SELL, SHORT)
+    # Neither level is reached
+    assert book.match('ES', 95.0, 99.0, 91.0) == []
+    # The bar opens above the buy stop
+    assert prices(book.match('ES', 102.0, 104.0, 101.0)) == [(100.0, 102.0)]
+    # The bar opens below the sell stop
+    fills = book.match('ES', 88.0, 89.0, 87.0)
+    assert prices(fills) == [(90.0, 88.0)]
+    assert fills[0][0][1:] == ('ES', STP, 90.0, 1, SELL, SHORT)
+    assert len(book) == 0 and book.symbols() == []
+
+
+def test_stops_and_limits_reached_within_the_bar_fill_at_their_price():
+    book = OrderBook()
+    book.add('CL', STP, 51.0, 1, BUY)
+    book.add('CL', LMT, 49.0, 1, BUY)
+    book.add('CL', LMT, 52.0, 1, SELL)
+    fills = book.match('CL', 50.0, 52.5, 48.5)
+    assert sorted(prices(fills)) == [(49.0, 49.0), (51.0, 51.0), (52.0, 52.0)]
+
+
+def test_heaps_pop_the_triggered_orders_only():
+    book = OrderBook()
+    for price in (103.0, 101.0, 102.0):
+        book.add('ES', STP, price, 1, BUY)
+    for price in (97.0, 99.0, 98.0):
+        book.add('ES', STP, price, 1, SELL)
+    fills = book.match('ES', 100.0, 102.0, 98.0)
+    assert prices(fills) == [(101.0, 101.0), (102.0, 102.0), (99.0, 99.0), (98.0, 98.0)]
+    assert len(book) == 2
+
+
+def test_missing_bar_triggers_nothing():
+    book = OrderBook()
+    book.add('ES', STP, 100.0, 1, BUY)
+    book.add('ES', STP, 90.0, 1, SELL)
+    assert book.match('ES', np.nan, np.nan, np.nan) == []
+    assert book.match('GC', 1.0, 2.0, 0.5) == []
+    assert len(book) == 2
+
+
+def test_cancel():
+    book = OrderBook()
+    first = book.add('ES', STP, 100.0, 1, BUY)
+    book.add('ES', STP, 101.0, 2, BUY)
+    book.add('CL', STP, 50.0, 1, SELL)
+    book.cancel(first)
+    book.cancel(first)
+    assert len(book) == 2
+    assert prices(book.match('ES', 100.0, 105.0, 99.0)) == [(101.0, 101.0)]
+    assert book.cancelled == set()
+
+    book.add('ES', LMT, 95.0, 1, BUY)
+    book.cancel_symbol('ES')
+    assert book.symbols() == ['CL'] and len(book) == 1
+    assert book.match('ES', 90.0, 91.0, 89.0) == []
+    assert prices(book.match('CL', 49.0, 49.5, 48.0)) == [(50.0, 49.0)]
+
+
+def test_resting_order_gaps_through_on_the_next_bar(tmp_path):
+    dates = pd.date_range('2020-01-06', periods=3, freq='D', name='Date')
+    pd.DataFrame({'Open': [100.0, 106.0, 100.0], 'High': [101.0, 107.0, 101.0], 'Low': [99.0, 105.0, 95.0],
+                  'Settle': [100.0, 106.0, 96.0], 'Volume': 1.0, 'Commercial Index': 50.0},
+                 index=dates).to_csv(tmp_path / 'ES.csv')
+    events = EventDeque()
+    bars = HistoricCSVDataHandler(events, str(tmp_path) + os.sep, {'ES': 'ES'})
+    execution = SimulatedExecutionHandler(events, bars)
+
+    bars.update_bars()
+    execution.on_market(MARKET_EVENT)
+    # Not triggered by the first bar, the orders rest
+    execution.execute_order(OrderEvent('ES', STP, 103.0, 1, BUY, LONG))
+    execution.execute_order(OrderEvent('ES', LMT, 97.0, 2, BUY, LONG))
+    assert len(execution.book) == 2
+
+    events.get()
+    bars.update_bars()
+    execution.on_market(events.get())
+    fill = events.get()
+    assert fill.type == FILL
+    assert (fill.symbol, fill.quantity, fill.direction, fill.price) == ('ES', 1, BUY, 106.0)
+    assert len(events) == 0
+
+    # A cancel order removes the rest of the book
+    execution.execute_order(OrderEvent('ES', CXL, 0.0, 0, BUY, LONG))
+    bars.update_bars()
+    execution.on_market(events.get())
+    assert len(events) == 0 and len(execution.book) == 0
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+import os
+
+import pandas as pd
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler
+from backtester.execution import SimulatedExecutionHandler
+from backtester.parallel import ParallelBacktest
+from backtester.portfolio import RestingOrderPortfolio
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+
+from conftest import SYMBOLS
+
+
+class LoggingPortfolio(RestingOrderPortfolio):
+    '''
+    Keeps the fills in the order the Portfolio receives them.
+    '''
+
+    def update_fill(self, event):
+        self.__dict__.setdefault('fill_log', []).append(
+            (self.performance.bars, event.symbol, event.quantity, event.direction, event.price, event.signal_type))
+        super().update_fill(event)
+
+
+def make_backtest(csv_dir, parallel=False):
+    args = (csv_dir, dict((s, s) for s in SYMBOLS), 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+            HistoricCSVDataHandler, SimulatedExecutionHandler, LoggingPortfolio, COTAndPriceTriggerSrategy)
+    return ParallelBacktest(*args, max_workers=2) if parallel else Backtest(*args)
+
+
+def test_parallel_matches_serial(csv_dir):
+    serial = make_backtest(csv_dir)
+    serial._run_backtest()
+    parallel = make_backtest(csv_dir, parallel=True)
+    parallel._run_backtest()
+
+    assert (parallel.signals, parallel.orders, parallel.fills, parallel.bars) == \
+           (serial.signals, serial.orders, serial.fills, serial.bars)
+    # The resting orders of several symbols fill in the order of the OrderBook, not of the symbols
+    assert parallel.portfolio.fill_log == serial.portfolio.fill_log
+    serial.portfolio.create_equity_curve_dataframe()
+    parallel.portfolio.create_equity_curve_dataframe()
+    pd.testing.assert_frame_equal(parallel.portfolio.equity_curve, serial.portfolio.equity_curve)
+    pd.testing.assert_frame_equal(parallel.portfolio.trades.frame(), serial.portfolio.trades.frame())
+
+
+def test_parallel_run_incremental_matches_serial(csv_dir, tmp_path):
+    results = []
+    for parallel in (False, True):
+        # The first run only knows the bars before 2015, the second one all of them
+        partial_dir = tmp_path / f'partial{int(parallel)}'
+        partial_dir.mkdir()
+        for s in SYMBOLS:
+            prices = pd.read_csv(os.path.join(csv_dir, f'{s}.csv'), index_col='Date', parse_dates=True)
+            prices[prices.index < '2015-01-01'].to_csv(partial_dir / f'{s}.csv')
+        path = str(tmp_path / f'state{int(parallel)}.pkl')
+        first = make_backtest(str(partial_dir) + os.sep, parallel).run_incremental(path)
+        backtest = make_backtest(csv_dir, parallel)
+        second = backtest.run_incremental(path)
+        backtest.portfolio.create_equity_curve_dataframe()
+        results.append((first, second, backtest.signals, backtest.portfolio.equity_curve))
+
+    (first, second, signals, curve), (parallel_first, parallel_second, parallel_signals, parallel_curve) = results
+    assert len(second[0]) > 0
+    assert (parallel_first, parallel_second, parallel_signals) == (first, second, signals)
+    pd.testing.assert_frame_equal(parallel_curve, curve)
+
+
+def test_parallel_workers_continue_from_their_checkpoints(csv_dir, tmp_path):
+    partial_dir = tmp_path / 'partial'
+    partial_dir.mkdir()
+    for s in SYMBOLS:
+        prices = pd.read_csv(os.path.join(csv_dir, f'{s}.csv'), index_col='Date', parse_dates=True)
+        prices[prices.index < '2015-01-01'].to_csv(partial_dir / f'{s}.csv')
+    path = str(tmp_path / 'state.pkl')
+    make_backtest(str(partial_dir) + os.sep, parallel=True).run_incremental(path)
+    assert sorted(os.listdir(tmp_path)) == ['partial', 'state.pkl', 'state.pkl.0', 'state.pkl.1']
+
+    backtest = make_backtest(csv_dir, parallel=True)
+    backtest.load_checkpoint(path)
+    backtest.data_handler.continue_backtest = True
+    step = backtest.data_handler.bar_index
+    fills, signals, orders = backtest._simulate(replay_last_bar=False, checkpoint=path)
+    # The workers only simulated the bars after the checkpoint
+    assert len(fills) > 0 and min(fill[0] for fill in fills) > step
+    assert min(signal[0] for signal in signals) > step and min(order[0] for order in orders) > step
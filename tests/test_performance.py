@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler
+from backtester.execution import SimulatedExecutionHandler
+from backtester.performance import (BATCH_SUMMARY_STATS, PerformanceTracker, create_batch_summary_stats,
+                                    create_drawdowns, create_sharpe_ratio)
+from backtester.portfolio import Portfolio
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+
+from conftest import SYMBOLS
+
+
+def batch_stats(total, periods=252):
+    '''
+    :return: Sharpe ratio, max drawdown and duration of an equity curve, computed after the fact.
+    '''
+    returns = total.pct_change()
+    _, max_dd, duration = create_drawdowns((1.0 + returns).cumprod())
+    return create_sharpe_ratio(returns, periods), max_dd, duration
+
+
+def test_tracker_matches_the_batch_statistics():
+    rng = np.random.default_rng(0)
+    total = pd.Series(100000.0 * np.cumprod(1.0 + rng.normal(0.0002, 0.01, 2000)))
+    total = pd.concat([pd.Series([100000.0]), total], ignore_index=True)
+    in_market = rng.random(len(total)) < 0.3
+
+    tracker = PerformanceTracker(total.iloc[0], periods=252)
+    for value, held in zip(total.values[1:], in_market[1:]):
+        tracker.update(value, held)
+
+    sharpe, max_dd, duration = batch_stats(total)
+    assert tracker.sharpe_ratio == pytest.approx(sharpe, rel=1e-9)
+    assert tracker.max_drawdown == pytest.approx(max_dd, rel=1e-9)
+    assert tracker.max_duration == duration
+    assert tracker.total_return == pytest.approx(total.iloc[-1] / total.iloc[0] - 1.0, rel=1e-9)
+    assert tracker.exposure == pytest.approx(in_market[1:].mean())
+    assert [name for name, _ in tracker.summary_stats()] == ['Total Return', 'Sharpe Ratio', 'Max Drawdown',
+                                                             'Drawdown']
+
+
+def test_tracker_skips_a_missing_total():
+    rng = np.random.default_rng(1)
+    total = pd.Series(100000.0 * np.cumprod(1.0 + rng.normal(0.0, 0.01, 500)))
+    total.iloc[0] = 100000.0
+    total.iloc[[100, 300, 301]] = np.nan
+
+    tracker = PerformanceTracker(total.iloc[0])
+    for value in total.values[1:]:
+        tracker.update(value)
+
+    # The returns span the missing bars, the drawdown counts them as bars below the High Water Mark
+    _, max_dd, duration = create_drawdowns(total / total.iloc[0])
+    assert tracker.sharpe_ratio == pytest.approx(create_sharpe_ratio(total.dropna().pct_change()), rel=1e-9)
+    assert tracker.total_return == pytest.approx(total.iloc[-1] / total.iloc[0] - 1.0, rel=1e-9)
+    assert tracker.max_drawdown == pytest.approx(max_dd, rel=1e-9)
+    assert tracker.max_duration == duration
+    assert tracker.count == 496
+
+
+def curve_stats(total, periods=252):
+    '''
+    :return: The columns of create_batch_summary_stats for one equity curve, from the per-curve functions.
+    '''
+    returns = total.dropna().pct_change()
+    _, max_dd, duration = create_drawdowns(total / total.iloc[0])
+    end = total.dropna().iloc[-1] / total.iloc[0]
+    cagr = end ** (periods / (len(total) - 1)) - 1.0
+    r = returns.dropna().values
+    sortino = np.sqrt(periods) * r.mean() / np.sqrt(np.mean(np.minimum(r, 0.0) ** 2))
+    return [end - 1.0, cagr, create_sharpe_ratio(returns, periods), sortino, max_dd, duration, cagr / max_dd,
+            (r > 0).sum() / (r != 0).sum()]
+
+
+def test_batch_statistics_match_every_curve():
+    rng = np.random.default_rng(2)
+    equity = pd.DataFrame(100000.0 * np.cumprod(1.0 + rng.normal(0.0003, 0.01, (800, 5)), axis=0),
+                          columns=list('abcde'))
+    equity.iloc[0] = 100000.0
+    # Flat bars, a missing stretch in the middle and a missing last total
+    equity.iloc[200:220, 1] = equity.iloc[199, 1]
+    equity.iloc[400:403, 2] = np.nan
+    equity.iloc[-1, 3] = np.nan
+
+    stats = create_batch_summary_stats(equity, block=2)
+    assert list(stats.columns) == BATCH_SUMMARY_STATS and list(stats.index) == list('abcde')
+    for run in equity.columns:
+        np.testing.assert_allclose(stats.loc[run].values, curve_stats(equity[run]), rtol=1e-9, err_msg=run)
+
+    # The missing totals are handled as by PerformanceTracker
+    tracker = PerformanceTracker(100000.0)
+    for value in equity['c'].values[1:]:
+        tracker.update(value)
+    assert stats.loc['c', 'Sharpe Ratio'] == pytest.approx(tracker.sharpe_ratio, rel=1e-9)
+    assert stats.loc['c', 'Drawdown'] == tracker.max_duration
+
+    # A single curve as an array
+    np.testing.assert_allclose(create_batch_summary_stats(equity['a'].values).values[0], stats.loc['a'].values)
+
+
+def test_empty_tracker():
+    tracker = PerformanceTracker(100000.0)
+    assert np.isnan(tracker.sharpe_ratio)
+    assert tracker.exposure == 0.0 and tracker.total_return == 0.0 and tracker.max_drawdown == 0.0
+
+
+def test_portfolio_statistics_match_its_equity_curve(csv_dir):
+    backtest = Backtest(csv_dir, dict((s, s) for s in SYMBOLS), 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+                        HistoricCSVDataHandler, SimulatedExecutionHandler, Portfolio, COTAndPriceTriggerSrategy)
+    backtest._run_backtest()
+    portfolio = backtest.portfolio
+    portfolio.create_equity_curve_dataframe()
+    curve = portfolio.equity_curve
+
+    (_, total_return), (_, sharpe), (_, max_dd), (_, duration) = portfolio.summary_stats()
+    expected_sharpe, expected_dd, expected_duration = batch_stats(curve['total'])
+    assert total_return == pytest.approx(curve['equity_curve'].iloc[-1] - 1.0, rel=1e-9)
+    assert sharpe == pytest.approx(expected_sharpe, rel=1e-9)
+    assert max_dd == pytest.approx(expected_dd, rel=1e-9)
+    assert duration == expected_duration
+    # The drawdown column is the running drawdown of the equity curve
+    drawdown, _, _ = create_drawdowns(curve['equity_curve'])
+    np.testing.assert_allclose(curve['drawdown'].values[1:], drawdown.values[1:], rtol=1e-9, atol=1e-12)
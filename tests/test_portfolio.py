@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.data import HistoricCSVDataHandler
+from backtester.event import BUY, EXIT, LONG, MARKET_EVENT, SELL, SHORT, FillEvent
+from backtester.eventqueue import EventDeque
+from backtester.portfolio import Portfolio
+
+ES_SETTLE = [100.0, 103.0, 101.0, 105.0, 104.0]
+COMMISSION = 1.3
+
+
+@pytest.fixture
+def bars(tmp_path):
+    dates = pd.date_range('2020-01-06', periods=len(ES_SETTLE), freq='D', name='Date')
+    for s, settle in (('ES', ES_SETTLE), ('CL', [np.nan, np.nan, 50.0, 51.0, 52.0])):
+        df = pd.DataFrame({'Open': settle, 'High': settle, 'Low': settle, 'Settle': settle, 'Volume': 1.0,
+                           'Commercial Index': 50.0}, index=dates)
+        df.dropna().to_csv(tmp_path / f'{s}.csv')
+    return HistoricCSVDataHandler(EventDeque(), str(tmp_path) + os.sep, {'ES': 'ES', 'CL': 'CL'})
+
+
+def run(bars, fills):
+    '''
+    Moves through the bars like Backtest: the holdings row of a bar is written before its fills.
+    :param fills: Dictionary of bar number -> list of (quantity, direction, signal_type) of ES, filled at the Settle.
+    '''
+    portfolio = Portfolio(bars, bars.events, datetime.datetime(2020, 1, 1), 100000.0)
+    for i in range(len(ES_SETTLE)):
+        bars.update_bars()
+        portfolio.update_timeindex(MARKET_EVENT)
+        for quantity, direction, signal_type in fills.get(i, []):
+            portfolio.update_fill(FillEvent(None, 'ES', 'CME', quantity, direction, ES_SETTLE[i], None,
+                                            COMMISSION, signal_type))
+    portfolio.create_equity_curve_dataframe()
+    return portfolio
+
+
+def test_mark_to_market_against_the_entry_price(bars):
+    portfolio = run(bars, {
+        0: [(2, BUY, LONG)],
+        1: [(1, SELL, EXIT)],
+        2: [(2, SELL, SHORT)],
+        4: [(1, BUY, EXIT)],
+    })
+    curve = portfolio.equity_curve
+    # ES is worth 50 USD per point. Realised: 1 * 3 points, 1 * 1 point, -1 * 3 points
+    commission = COMMISSION * np.array([0, 0, 1, 2, 3, 3])
+    np.testing.assert_allclose(curve['total'].values,
+                               [100000.0, 100000.0, 100300.0, 100200.0, 100000.0, 100050.0] - commission)
+    np.testing.assert_allclose(curve['cash'].values,
+                               [100000.0, 100000.0, 100000.0, 100150.0, 100200.0, 100200.0] - commission)
+    np.testing.assert_allclose(curve['ES'].values, [0.0, 0.0, 300.0, 50.0, -200.0, -150.0])
+    # CL has no bars before the third date and is never held, it does not poison the total
+    assert (curve['CL'] == 0.0).all()
+    assert curve['commission'].iloc[-1] == pytest.approx(3 * COMMISSION)
+
+    assert portfolio.current_positions == {'ES': 0, 'CL': 0}
+    assert portfolio.current_holdings['cash'] == pytest.approx(100050.0 - 4 * COMMISSION)
+    np.testing.assert_array_equal(portfolio.entry_price, [0.0, 0.0])
+
+
+def test_average_entry_price_of_added_quantity(bars):
+    portfolio = run(bars, {0: [(1, BUY, LONG)], 1: [(1, BUY, LONG)]})
+    assert portfolio.entry_price[portfolio.symbol_index['ES']] == pytest.approx(101.5)
+    # 2 contracts at 101.5 marked to 104 on the last bar
+    assert portfolio.equity_curve['ES'].iloc[-1] == pytest.approx(2 * 2.5 * 50.0)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+import logging
+
+import pandas as pd
+import pytest
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler
+from backtester.execution import SimulatedExecutionHandler
+from backtester.portfolio import Portfolio
+from backtester.progress import ProgressReporter, SignalLog
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+
+from conftest import SYMBOLS
+
+
+class FailingPortfolio(Portfolio):
+    '''
+    Raises on the 7000th bar.
+    '''
+
+    def update_timeindex(self, event):
+        if self.performance.bars == 7000:
+            raise RuntimeError('broken bar')
+        super().update_timeindex(event)
+
+
+def make_backtest(csv_dir, path, portfolio=Portfolio):
+    return Backtest(csv_dir, dict((s, s) for s in SYMBOLS), 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+                    HistoricCSVDataHandler, SimulatedExecutionHandler, portfolio, COTAndPriceTriggerSrategy,
+                    signal_log=path)
+
+
+def test_signal_log_has_one_row_per_signal(csv_dir, tmp_path):
+    path = str(tmp_path / 'signals.csv')
+    backtest = make_backtest(csv_dir, path)
+    backtest._run_backtest()
+    log = pd.read_csv(path, parse_dates=['datetime'])
+    assert list(log.columns) == SignalLog.columns
+    # More signals than one buffer, all of them are written on close
+    assert len(log) == backtest.signals > 1000
+    assert set(log['symbol']) == set(SYMBOLS)
+    assert log['datetime'].is_monotonic_increasing
+    assert backtest.signal_log._file.closed
+
+
+def test_signal_log_is_flushed_when_the_run_raises(csv_dir, tmp_path):
+    path = str(tmp_path / 'signals.csv')
+    backtest = make_backtest(csv_dir, path, FailingPortfolio)
+    with pytest.raises(RuntimeError, match='broken bar'):
+        backtest._run_backtest()
+    log = pd.read_csv(path)
+    assert 0 < len(log) == backtest.signals
+    assert len(log) % backtest.signal_log.buffer_size != 0
+
+
+def test_progress_is_rate_limited(caplog):
+    with caplog.at_level(logging.INFO, logger='backtester.progress'):
+        progress = ProgressReporter(total=100, interval=3600.0)
+        for bars in range(1, 101):
+            progress.update(bars)
+        assert caplog.records == []
+        progress.report()
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().startswith('bar 100/100 (100.0%)')
+
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger='backtester.progress'):
+        progress = ProgressReporter(interval=0.0, first=10)
+        progress.update(11)
+        progress.update(12)
+    assert [r.getMessage().split(',')[0] for r in caplog.records] == ['bar 11', 'bar 12']
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+import pickle
+
+import numpy as np
+import pytest
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler
+from backtester.execution import SimulatedExecutionHandler
+from backtester.portfolio import Portfolio
+from backtester.ringbuffer import BarRingBuffer
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+
+
+def test_windows_across_wrap_around():
+    capacity = 5
+    ring = BarRingBuffer(capacity, (2, 3))
+    bars = np.arange(17 * 6, dtype=np.float64).reshape(17, 2, 3)
+    for i, bar in enumerate(bars):
+        ring.append(i, bar)
+        assert len(ring) == min(i + 1, capacity)
+        assert ring.last((1, 2)) == bar[1, 2]
+        assert ring.last_datetime() == i
+        for N in range(1, capacity + 1):
+            first = max(i + 1 - N, 0)
+            np.testing.assert_array_equal(ring.window((0, 1), N), bars[first:i + 1, 0, 1])
+            assert list(ring.window_datetimes(N)) == list(range(first, i + 1))
+
+
+def test_window_longer_than_the_capacity_raises():
+    ring = BarRingBuffer(3, (1, 1))
+    ring.append(0, [[1.0]])
+    with pytest.raises(ValueError, match='capacity of 3 bars'):
+        ring.window((0, 0), 4)
+    with pytest.raises(ValueError, match='capacity of 3 bars'):
+        ring.window_datetimes(4)
+
+
+def test_window_is_a_read_only_view():
+    ring = BarRingBuffer(4, (1, 1))
+    for i in range(6):
+        ring.append(i, [[float(i)]])
+    window = ring.window((0, 0), 3)
+    assert np.shares_memory(window, ring.values)
+    with pytest.raises(ValueError):
+        window[0] = 1.0
+
+
+def test_pickle_keeps_the_latest_bars():
+    ring = BarRingBuffer(3, (1, 2))
+    for i in range(7):
+        ring.append(i, [[i, -i]])
+    restored = pickle.loads(pickle.dumps(ring))
+    restored.append(7, [[7, -7]])
+    ring.append(7, [[7, -7]])
+    np.testing.assert_array_equal(restored.window((0, 1), 3), ring.window((0, 1), 3))
+    assert not restored.window((0, 1), 3).flags.writeable
+
+
+def test_backtest_sizes_the_ring_once(csv_dir, monkeypatch):
+    calls = []
+    set_max_lookback = HistoricCSVDataHandler.set_max_lookback
+
+    def record(self, max_lookback):
+        calls.append(max_lookback)
+        set_max_lookback(self, max_lookback)
+
+    monkeypatch.setattr(HistoricCSVDataHandler, 'set_max_lookback', record)
+    backtest = Backtest(csv_dir, {'ES': 'ES'}, 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+                        HistoricCSVDataHandler, SimulatedExecutionHandler, Portfolio, COTAndPriceTriggerSrategy,
+                        strategy_params=dict(sma_window=30))
+    assert calls == [30]
+    assert backtest.data_handler.latest_symbol_data.capacity == backtest.strategy.max_lookback == 30
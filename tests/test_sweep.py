@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from backtester.data import HistoricCSVDataHandler, MMapPanelDataHandler
+from backtester.eventqueue import EventDeque
+from backtester.panel import open_panel
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+from backtester.sweep import parameter_grid, run_configuration, sweep
+
+from conftest import DATA_DIR, SYMBOLS
+
+
+def test_panel_handler_matches_csv_handler(csv_dir):
+    # The panel holds more symbols than requested, their dates must not leak into the calendar
+    open_panel(csv_dir, SYMBOLS)
+    for calendar in (None, 'CL'):
+        panel = MMapPanelDataHandler(EventDeque(), csv_dir, {'ES': 'ES', 'CL': 'CL'}, calendar=calendar)
+        csv = HistoricCSVDataHandler(EventDeque(), csv_dir, {'ES': 'ES', 'CL': 'CL'}, calendar=calendar)
+        np.testing.assert_array_equal(panel.dates, csv.dates)
+        # On a calendar of their own the fields are only gathered from the memory map once they are read
+        assert not panel.symbol_data['ES'].columns
+        for _ in range(300):
+            panel.update_bars()
+            csv.update_bars()
+        np.testing.assert_array_equal(panel.window('ES', ('Open', 'Settle'), N=100),
+                                      csv.window('ES', ('Open', 'Settle'), N=100))
+        assert not panel.symbol_data['ES'].columns
+        for s in ('ES', 'CL'):
+            for f in csv.fields:
+                np.testing.assert_array_equal(panel.symbol_data[s][f], csv.symbol_data[s][f])
+
+
+def test_panel_handler_raises_on_missing_field(tmp_path):
+    shutil.copy(os.path.join(DATA_DIR, 'ES.csv'), tmp_path / 'ES.csv')
+    csv_dir = str(tmp_path) + os.sep
+    with pytest.raises(ValueError, match='Commercial Index'):
+        HistoricCSVDataHandler(EventDeque(), csv_dir, {'ES': 'ES'})
+    with pytest.raises(ValueError, match='Commercial Index'):
+        MMapPanelDataHandler(EventDeque(), csv_dir, {'ES': 'ES'})
+
+
+def test_sweep_matches_serial_backtest(csv_dir):
+    open_panel(csv_dir, SYMBOLS)
+    grid = {'sma_window': [10, 18], 'cross_bar': [8]}
+    results = sweep(csv_dir, {'ES': 'ES'}, COTAndPriceTriggerSrategy, grid, max_workers=2)
+    assert len(results) == 2
+    for params, (_, row) in zip(parameter_grid(grid), results.iterrows()):
+        serial = run_configuration(csv_dir, {'ES': 'ES'}, COTAndPriceTriggerSrategy, params,
+                                   HistoricCSVDataHandler)
+        for name, value in serial.items():
+            assert row[name] == pytest.approx(value, nan_ok=True), name
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler
+from backtester.event import LONG, LONG_STOP_EXIT, SHORT
+from backtester.execution import SimulatedExecutionHandler
+from backtester.portfolio import Portfolio
+from backtester.TICKER_VALUE import s_tick_amount
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+from backtester.trades import TradeLedger
+
+from conftest import SYMBOLS
+
+TICK_AMOUNT = {'ES': 0.25, 'CL': 0.01}
+TICK_VALUE = {'ES': 12.5, 'CL': 10.0}
+
+
+def day(n):
+    return datetime.datetime(2020, 1, n)
+
+
+def test_round_trips():
+    trades = TradeLedger(['ES', 'CL'], TICK_AMOUNT, TICK_VALUE, capacity=1)
+    trades.open(0, day(1), 1, LONG)
+    trades.close(0, 1, 2, 100.0, 102.0, day(3), 3, LONG_STOP_EXIT)
+    # A reversal closes the short and opens the next trade on the same bar
+    trades.open(1, day(2), 2, SHORT)
+    trades.close(1, -1, 1, 50.0, 50.5, day(4), 4, LONG)
+    trades.open(1, day(4), 4, LONG)
+    trades.close(1, 1, 1, 50.5, 51.0, day(6), 6)
+    assert len(trades) == 3 and len(trades.trades) == 4
+
+    frame = trades.frame()
+    assert list(frame['symbol']) == ['ES', 'CL', 'CL']
+    assert list(frame['entry_type']) == ['LONG', 'SHORT', 'LONG']
+    assert list(frame['exit_type']) == ['LONG STOP EXIT', 'LONG', 'UNKNOWN']
+    np.testing.assert_allclose(frame['ticks'], [8.0, -50.0, 50.0])
+    np.testing.assert_allclose(frame['pnl'], [2 * 8 * 12.5, -500.0, 500.0])
+    assert list(frame['bars_held']) == [2, 2, 2]
+    assert list(frame['entry_datetime']) == [pd.Timestamp(day(1)), pd.Timestamp(day(2)), pd.Timestamp(day(4))]
+
+    by_symbol = trades.stats()
+    assert list(by_symbol.index) == ['ES', 'CL']
+    assert list(by_symbol['Trades']) == [1, 2]
+    assert list(by_symbol['Win Rate']) == [1.0, 0.5]
+    assert list(by_symbol['Total PnL']) == [200.0, 0.0]
+
+    by_exit = trades.stats('exit_type')
+    assert list(by_exit.index) == ['LONG', 'LONG STOP EXIT', 'UNKNOWN']
+    assert list(by_exit['Average Ticks']) == [-50.0, 8.0, 50.0]
+    with pytest.raises(ValueError):
+        trades.stats('entry_type')
+
+    restored = pickle.loads(pickle.dumps(trades))
+    assert len(restored.trades) == 3
+    pd.testing.assert_frame_equal(restored.frame(), frame)
+
+
+class SlippagePortfolio(Portfolio):
+    '''
+    Sums the slippage charged on the fills away from the Settle, i.e. of the stops.
+    '''
+    slippage_cost = 0.0
+
+    def update_fill(self, event):
+        settle = self.bars.get_latest_bar_value(event.symbol, 'Settle')
+        self.slippage_cost += event.direction * (settle - event.price) / s_tick_amount[event.symbol] * \
+                              self.slippage * event.quantity
+        super().update_fill(event)
+
+
+def test_trades_book_the_realised_cash(csv_dir):
+    backtest = Backtest(csv_dir, dict((s, s) for s in SYMBOLS), 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+                        HistoricCSVDataHandler, SimulatedExecutionHandler, SlippagePortfolio, COTAndPriceTriggerSrategy)
+    backtest._run_backtest()
+    portfolio = backtest.portfolio
+    frame = portfolio.trades.frame()
+    assert len(frame) > 100 and (frame['bars_held'] >= 0).all()
+    # The strategy leaves its positions by its stops and take profits only
+    assert set(frame['exit_type']) == {'LONG STOP EXIT', 'LONG TAKE PROFIT EXIT', 'SHORT STOP EXIT',
+                                       'SHORT TAKE PROFIT EXIT'}
+
+    # The cash is the profit of the trades less the commission and the slippage
+    holdings = portfolio.current_holdings
+    assert portfolio.slippage_cost != 0.0
+    assert holdings['cash'] == pytest.approx(
+        100000.0 + frame['pnl'].sum() - holdings['commission'] - portfolio.slippage_cost, abs=1e-6)
+    stats = portfolio.trades.stats()
+    assert stats['Trades'].sum() == len(frame)
+    assert stats['Total PnL'].sum() == pytest.approx(frame['pnl'].sum())
+    assert set(stats.index) <= set(SYMBOLS)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+
+import numpy as np
+import pytest
+
+from backtester.backtest import Backtest
+from backtester.data import HistoricCSVDataHandler
+from backtester.execution import SimulatedExecutionHandler
+from backtester.portfolio import Portfolio
+from backtester.STRAT_cot_and_trigger import COTAndPriceTriggerSrategy
+from backtester.vectorized import VectorizedBacktest
+
+from conftest import SYMBOLS
+
+
+class LoggingPortfolio(Portfolio):
+    '''
+    Keeps the fills in the order the Portfolio receives them.
+    '''
+
+    def update_fill(self, event):
+        self.__dict__.setdefault('fill_log', []).append(
+            (self.bars.get_latest_bar_datetime(event.symbol), event.symbol, event.signal_type, event.direction,
+             event.quantity, event.price))
+        super().update_fill(event)
+
+
+def event_driven(csv_dir, symbol_dict, strategy_params=None):
+    backtest = Backtest(csv_dir, symbol_dict, 100000.0, 0.0, datetime.datetime(1990, 1, 1),
+                        HistoricCSVDataHandler, SimulatedExecutionHandler, LoggingPortfolio,
+                        COTAndPriceTriggerSrategy, strategy_params=strategy_params)
+    backtest._run_backtest()
+    backtest.portfolio.create_equity_curve_dataframe()
+    return backtest
+
+
+def vectorized_fills(fills):
+    return [tuple(row) for row in fills[['datetime', 'symbol', 'signal_type', 'direction', 'quantity', 'price']]
+            .itertuples(index=False)]
+
+
+def test_es_fills_match_the_event_loop(csv_dir):
+    backtest = event_driven(csv_dir, {'ES': 'ES'})
+    vectorized = VectorizedBacktest(csv_dir, {'ES': 'ES'}, 100000.0, datetime.datetime(1990, 1, 1))
+    fills = vectorized.run()
+    assert len(fills) == backtest.fills == 108
+    assert vectorized_fills(fills) == backtest.portfolio.fill_log
+
+
+@pytest.mark.parametrize('strategy_params', [None, dict(sma_window=10, bars_momentum=2, cross_bar=8)])
+def test_universe_matches_the_event_loop(csv_dir, strategy_params):
+    symbol_dict = dict((s, s) for s in SYMBOLS)
+    backtest = event_driven(csv_dir, symbol_dict, strategy_params)
+    vectorized = VectorizedBacktest(csv_dir, symbol_dict, 100000.0, datetime.datetime(1990, 1, 1),
+                                    strategy_params=strategy_params)
+    fills = vectorized.run()
+    assert vectorized_fills(fills) == backtest.portfolio.fill_log
+
+    expected = backtest.portfolio.equity_curve
+    curve = vectorized.equity_curve
+    assert (curve.index == expected.index).all()
+    np.testing.assert_allclose(curve['total'].values, expected['total'].values, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(curve['commission'].values, expected['commission'].values, rtol=0, atol=1e-6)
+
+    # The cash and total after the fills of the last bar
+    portfolio = backtest.portfolio
+    settle = backtest.data_handler.get_latest_bar_vector('Settle')
+    open_value = np.where(portfolio.positions != 0,
+                          portfolio.positions * (settle - portfolio.entry_price) * portfolio.multiplier, 0.0).sum()
+    assert vectorized.cash == pytest.approx(portfolio.current_holdings['cash'], abs=1e-6)
+    assert vectorized.total == pytest.approx(portfolio.current_holdings['cash'] + open_value, abs=1e-6)
+
+
+def test_window_close_out_ends_flat(csv_dir):
+    vectorized = VectorizedBacktest(csv_dir, {'ES': 'ES', 'CL': 'CL'}, 100000.0, datetime.datetime(1990, 1, 1))
+    fills = vectorized.run(start=2000, end=4000, close_out=True)
+    assert fills['step'].between(2000, 3999).all()
+    assert (fills['direction'] * fills['quantity']).groupby(fills['symbol']).sum().eq(0).all()
+    assert vectorized.total == pytest.approx(vectorized.cash)
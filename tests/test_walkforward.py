@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.event import EXIT
+from backtester.walkforward import WalkForward, walk_forward_windows
+
+
+def test_folds_end_flat_and_stitch_on_total(csv_dir):
+    grid = {'sma_window': [10, 18], 'cross_bar': [5, 8]}
+    walk_forward = WalkForward(csv_dir, {'ES': 'ES', 'CL': 'CL'}, 100000.0, datetime.datetime(1990, 1, 1), grid,
+                               in_sample=1000, out_of_sample=252, max_workers=1)
+    folds = walk_forward.run()
+    assert len(folds) > 1
+
+    # Every position opened in a fold is closed in it
+    fills = walk_forward.fills
+    assert (fills['direction'] * fills['quantity']).groupby(fills['symbol']).sum().eq(0).all()
+
+    # The open positions are closed at the Settle of the last bar, thus only the commission of the closing
+    # fills separates a fold from the next one, unless the strategy itself traded on that bar
+    total = walk_forward.equity_curve['total']
+    starts = pd.DatetimeIndex(folds['out_of_sample_start'])
+    jumps = total.diff()[total.index.isin(starts[1:])]
+    traded = pd.DatetimeIndex(fills.loc[fills['signal_type'] != EXIT, 'datetime'])
+    quiet = ~pd.DatetimeIndex(folds['out_of_sample_end'][:-1]).isin(traded)
+    assert len(jumps) == len(folds) - 1 and quiet.sum() > len(folds) // 2
+    assert np.all(np.abs(jumps.values[quiet]) <= 2 * 1.3 + 1e-6)
+
+
+def test_windows_do_not_overlap():
+    assert walk_forward_windows(10, 4, 2) == [(0, 4, 6), (2, 6, 8), (4, 8, 10)]
+    # A larger step leaves gaps between the out-of-sample windows
+    assert walk_forward_windows(10, 4, 2, step=3) == [(0, 4, 6), (3, 7, 9)]
+    with pytest.raises(ValueError, match='overlap'):
+        walk_forward_windows(10, 4, 2, step=1)